@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+background - Run a batch on a workstation's idle capacity
+
+`batch --background` is for machines people work on during the day:
+
+  - the process is pinned to a CPU set (`--cpus 2-7`; default all), lowered
+    to nice BACKGROUND_NICE and to the lowest best-effort I/O priority;
+    worker threads and the ffmpeg children they spawn inherit all three,
+    because everything is set before the first worker starts
+  - a LoadGovernor lets a job start only while the 1-minute load average
+    leaves idle CPUs for it, so concurrency drops while someone compiles or
+    renders and climbs back up (to --concurrency) when the machine is idle
+
+Running jobs are never paused; the nice level keeps them out of the way
+and scaling down happens as they finish. At least one job always runs.
+
+Usage:
+    cpus = enter_background(parse_cpu_set("2-7"))
+    governor = LoadGovernor(max_jobs=concurrency, cpus=len(cpus), threads_per_job=1)
+    governor.acquire(job_id)
+    try:
+        ...
+    finally:
+        governor.release(job_id)
+"""
+
+import os
+import subprocess
+import threading
+from typing import List, Optional, Set
+
+BACKGROUND_NICE = 19
+# Best-effort class, lowest priority (the idle class can stall writes indefinitely)
+IOPRIO_CLASS_BE = 2
+IOPRIO_LOWEST = 7
+
+POLL_SECONDS = 5.0
+
+
+def parse_cpu_set(value: str) -> Set[int]:
+    """Parse a CPU list like '0-3,6' into {0, 1, 2, 3, 6}."""
+    cpus = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                lo, hi = part.split('-', 1)
+                cpus.update(range(int(lo), int(hi) + 1))
+            else:
+                cpus.add(int(part))
+        except ValueError:
+            raise ValueError(f"Invalid CPU list: {value!r} (use e.g. 0-3,6)")
+    if not cpus:
+        raise ValueError(f"Invalid CPU list: {value!r} (use e.g. 0-3,6)")
+    return cpus
+
+
+def _set_io_priority() -> bool:
+    try:
+        import psutil
+        psutil.Process().ionice(IOPRIO_CLASS_BE, value=IOPRIO_LOWEST)
+        return True
+    except ImportError:
+        pass
+    except (AttributeError, OSError, ValueError):
+        return False
+    try:
+        result = subprocess.run(["ionice", "-c", str(IOPRIO_CLASS_BE), "-n", str(IOPRIO_LOWEST),
+                                 "-p", str(os.getpid())], capture_output=True)
+        return result.returncode == 0
+    except OSError:
+        return False
+
+
+def enter_background(cpus: Optional[Set[int]] = None, log=print) -> List[int]:
+    """
+    Lower this process's CPU and I/O priority and pin it to cpus.
+
+    Call from the main thread before any worker thread or child process is
+    started. Returns the CPUs the batch may use. Settings the platform does
+    not support are skipped with a warning.
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        if cpus:
+            available = os.sched_getaffinity(0)
+            if not cpus <= available:
+                raise ValueError(f"CPUs {sorted(cpus - available)} are not available "
+                                 f"(this process may use {sorted(available)})")
+            os.sched_setaffinity(0, cpus)
+        allowed = sorted(os.sched_getaffinity(0))
+    else:
+        if cpus:
+            log("Warning: CPU pinning is not supported on this platform, using all CPUs")
+        allowed = list(range(os.cpu_count() or 1))
+
+    current = os.nice(0)
+    if current < BACKGROUND_NICE:
+        os.nice(BACKGROUND_NICE - current)
+    if not _set_io_priority():
+        log("Warning: could not lower I/O priority (needs psutil or ionice)")
+    return allowed
+
+
+def load_average() -> Optional[float]:
+    """1-minute load average (None where the platform has none)."""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+class LoadGovernor:
+    """Start jobs only while the load average leaves idle CPUs (shared by all worker threads)."""
+
+    def __init__(self, max_jobs: int, cpus: int, threads_per_job: int = 1, log=print):
+        self.max_jobs = max(1, max_jobs)
+        self.cpus = max(1, cpus)
+        self.threads_per_job = max(1, threads_per_job)
+        self.system_cpus = os.cpu_count() or self.cpus
+        self.log = log
+        self.running: Set[str] = set()
+        self.limit = self.max_jobs
+        self.cond = threading.Condition()
+
+    def allowed(self) -> int:
+        """Jobs that fit in the CPUs other programs leave idle right now."""
+        load = load_average()
+        if load is None:
+            return self.max_jobs
+        # The load average counts our own running jobs too
+        foreign = max(0.0, load - len(self.running) * self.threads_per_job)
+        idle = min(self.cpus, self.system_cpus - foreign)
+        return max(1, min(self.max_jobs, int(idle // self.threads_per_job)))
+
+    def acquire(self, job_id: str):
+        """Block until another job may start."""
+        with self.cond:
+            while True:
+                allowed = self.allowed()
+                if allowed != self.limit:
+                    self.log(f"System load {load_average():.1f}: running up to {allowed} jobs")
+                    self.limit = allowed
+                if len(self.running) < allowed:
+                    break
+                self.cond.wait(timeout=POLL_SECONDS)
+            self.running.add(job_id)
+
+    def release(self, job_id: str):
+        with self.cond:
+            self.running.discard(job_id)
+            self.cond.notify_all()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+batch_plan - Estimate a batch's wall time, CPU time and peak memory before running it
+
+`transcribe_enhanced.py plan` answers "3 hours or 3 days, and does it fit in
+RAM?" for a folder without transcribing anything:
+
+  - durations come from ffmpeg input listings (100 files per call, see
+    clip_concat), with ffprobe for files whose length ffmpeg only estimates
+  - speed is the real-time factor (RTF) of the engine/model on this host:
+    `evaluate` results first (measured end to end, model loading included),
+    then Whisper `calibrate` results, then rough laptop defaults
+  - each concurrency level is simulated: jobs share the cores the way
+    `batch` splits them (Whisper threads capped at cores / concurrency),
+    files are handed to free workers longest first, and peak memory is the
+    sum of the largest jobs that can run at once (memory_budget estimates)
+
+Estimates are only as good as the calibration: run `evaluate` or
+`calibrate` on this host first for numbers worth planning a weekend around.
+
+Usage:
+    speed = engine_speed("whisper", "small")
+    row = simulate(durations, concurrency, speed, cores)   # {wall, cpu_hours, peak_mb, ...}
+"""
+
+import heapq
+import os
+from pathlib import Path
+from typing import List, Optional
+
+# Single-job RTFs on a laptop CPU (int8 Whisper) when the host was never calibrated
+DEFAULT_RTF = {'vosk': 0.4, 'tiny': 0.08, 'base': 0.15, 'small': 0.4, 'medium': 1.0, 'large': 2.0}
+# Hybrid re-decodes the unsure spans, typically about this share of the audio
+HYBRID_WHISPER_SHARE = 0.25
+# Per-file model loading when the RTF does not already include it (seconds)
+DEFAULT_LOAD_SECONDS = {'vosk': 10.0, 'whisper': 3.0}
+# faster-whisper's thread count when none is calibrated
+DEFAULT_WHISPER_THREADS = 4
+# Speed grows with threads ** THREAD_SCALING (decoding does not scale linearly)
+THREAD_SCALING = 0.7
+
+
+def _evaluated(engine: str, model: Optional[str]) -> Optional[dict]:
+    """`evaluate` result for this engine/model on this host, if any."""
+    from calibration import load_section
+    from evaluation import parse_config
+
+    default_vosk = Path.home() / ".cache" / "vosk-model-en-us-0.22"
+    for name, result in load_section('transcription').items():
+        config = parse_config(name)
+        if config['engine'] != engine:
+            continue
+        if engine == 'vosk':
+            path = Path(config['model']) if config['model'] else default_vosk
+            if path.resolve() == (Path(model).expanduser() if model else default_vosk).resolve():
+                return result
+        elif config['model'] == model:
+            return result
+    return None
+
+
+def engine_speed(engine: str, model: Optional[str]) -> dict:
+    """
+    How fast one job of engine/model runs on this host.
+
+    Returns {rtf, threads, load_seconds, peak_mb, source}: rtf at `threads`
+    CPU threads, per-file loading not included in rtf, the measured peak
+    memory of one job (None if never measured) and where the numbers came from.
+    """
+    from calibration import load_section
+
+    cores = os.cpu_count() or 1
+    threads = 1
+    if engine in ('whisper', 'hybrid'):
+        whisper_cal = load_section('whisper').get(model, {})
+        threads = whisper_cal.get('cpu_threads') or min(DEFAULT_WHISPER_THREADS, cores)
+
+    evaluated = _evaluated(engine, model)
+    if evaluated and evaluated.get('rtf'):
+        return {'rtf': evaluated['rtf'], 'threads': threads, 'load_seconds': 0.0,
+                'peak_mb': evaluated.get('peak_mb'), 'source': 'evaluate results'}
+
+    if engine == 'vosk':
+        return {'rtf': DEFAULT_RTF['vosk'], 'threads': 1, 'load_seconds': DEFAULT_LOAD_SECONDS['vosk'],
+                'peak_mb': None, 'source': 'default guess'}
+
+    if whisper_cal.get('rtf'):
+        whisper_rtf, load, source = whisper_cal['rtf'], whisper_cal.get('load_seconds', 0.0), 'Whisper calibration'
+    else:
+        size = 'large' if (model or '').startswith('large') else model
+        whisper_rtf, load, source = DEFAULT_RTF.get(size, DEFAULT_RTF['large']), DEFAULT_LOAD_SECONDS['whisper'], 'default guess'
+    if engine == 'whisper':
+        return {'rtf': whisper_rtf, 'threads': threads, 'load_seconds': load, 'peak_mb': None, 'source': source}
+    # Hybrid: a Vosk pass over everything plus Whisper on part of it
+    return {'rtf': DEFAULT_RTF['vosk'] + HYBRID_WHISPER_SHARE * whisper_rtf, 'threads': threads,
+            'load_seconds': DEFAULT_LOAD_SECONDS['vosk'] + load, 'peak_mb': None,
+            'source': f"default guess + {source}" if source != 'default guess' else source}
+
+
+def simulate(durations: List[float], concurrency: int, speed: dict, cores: int, job_mb) -> dict:
+    """
+    Run the batch on paper with `concurrency` workers.
+
+    job_mb(duration) is one job's memory estimate. Returns {concurrency,
+    threads, wall, cpu_hours, peak_mb}: wall-clock seconds until the last
+    file finishes, CPU-hours spent, and peak memory of the jobs running at once.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, not {concurrency}")
+    # Whisper threads per job as batch caps them; more busy threads than cores slows everyone
+    threads = speed['threads'] if concurrency == 1 else max(1, min(speed['threads'], cores // concurrency))
+    oversubscribed = max(1.0, concurrency * threads / cores)
+    rtf = speed['rtf'] * (speed['threads'] / threads) ** THREAD_SCALING
+
+    workers = [0.0] * concurrency
+    cpu_seconds = 0.0
+    for duration in sorted(durations, reverse=True):
+        cost = speed['load_seconds'] + duration * rtf
+        cpu_seconds += cost * threads
+        heapq.heappush(workers, heapq.heappop(workers) + cost * oversubscribed)
+
+    largest = sorted(durations, reverse=True)[:concurrency]
+    return {
+        'concurrency': concurrency,
+        'threads': threads,
+        'wall': max(workers),
+        'cpu_hours': cpu_seconds / 3600,
+        'peak_mb': sum(job_mb(d) for d in largest),
+    }
+
+
+def recommend(rows: List[dict], memory_mb: Optional[float], tolerance: float = 0.05) -> Optional[dict]:
+    """Fewest workers within tolerance of the fastest plan that fits in memory_mb (None if none fits)."""
+    fitting = [r for r in rows if memory_mb is None or r['peak_mb'] <= memory_mb]
+    if not fitting:
+        return None
+    fastest = min(r['wall'] for r in fitting)
+    return min((r for r in fitting if r['wall'] <= fastest * (1 + tolerance)), key=lambda r: r['concurrency'])
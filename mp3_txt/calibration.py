@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+calibration - Per-host store for benchmark results
+
+Calibration runs (Ollama model throughput, Whisper compute settings, RTFs)
+are machine-specific, so results are stored per hostname in one JSON file:
+
+    ~/.cache/mp3_txt/calibration.json
+    {"<hostname>": {"<section>": {"<key>": {...result...}}}}
+
+Usage:
+    from calibration import load_section, save_result
+    save_result('ollama', 'llama3.2:1b', {'tokens_per_sec': 21.4})
+    results = load_section('ollama')   # {'llama3.2:1b': {...}}
+"""
+
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Optional
+
+CALIBRATION_PATH = Path.home() / ".cache" / "mp3_txt" / "calibration.json"
+
+
+def host_id() -> str:
+    """Identifier for this machine (override with MP3_TXT_HOST)."""
+    return os.environ.get('MP3_TXT_HOST') or socket.gethostname()
+
+
+def _load_all(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def load_section(section: str, host: Optional[str] = None, path: Path = CALIBRATION_PATH) -> dict:
+    """Return {key: result} stored for section on this host."""
+    return _load_all(path).get(host or host_id(), {}).get(section, {})
+
+
+def save_result(section: str, key: str, result: dict, host: Optional[str] = None,
+                path: Path = CALIBRATION_PATH):
+    """Store one result (timestamped) under section/key for this host."""
+    data = _load_all(path)
+    entry = dict(result, calibrated_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    data.setdefault(host or host_id(), {}).setdefault(section, {})[key] = entry
+
+    # Write atomically so a crash never leaves a truncated file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True))
+    os.replace(tmp, path)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+chrome_trace - Opt-in timeline tracing in Chrome Trace Event format
+
+Records spans (name, start, duration, process and thread id, args) while a
+batch runs and writes them as JSON that chrome://tracing or
+https://ui.perfetto.dev can open. Each worker thread gets its own track, so
+idle gaps, pipe waits and contention between threads are visible directly.
+
+Tracing is off unless enable() is called; span() is then a no-op costing one
+flag check. Timestamps are wall-clock microseconds so traces written by
+several processes (batch --worker) line up and can be merged:
+
+    python3 chrome_trace.py merge combined.json host1.json host2.json
+
+Usage:
+    import chrome_trace
+    chrome_trace.enable()
+    with chrome_trace.span("probe", "io", path=str(path)):
+        ...
+    chrome_trace.write("batch.trace.json")
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+
+_enabled = False
+_events: List[dict] = []
+_named_threads = set()
+_lock = threading.Lock()
+
+
+def enable():
+    """Start recording spans."""
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def now_us() -> int:
+    """Current wall-clock time in microseconds (the trace time base)."""
+    return time.time_ns() // 1000
+
+
+def _record(event: dict):
+    tid = threading.get_ident()
+    with _lock:
+        if tid not in _named_threads:
+            _named_threads.add(tid)
+            _events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                            'args': {'name': threading.current_thread().name}})
+        _events.append(dict(event, pid=os.getpid(), tid=tid))
+
+
+def complete(name: str, start_us: int, end_us: int, cat: str = '', **args):
+    """Record a span that has already finished (start/end from now_us())."""
+    if _enabled:
+        _record({'name': name, 'cat': cat, 'ph': 'X', 'ts': start_us,
+                 'dur': max(0, end_us - start_us), 'args': args})
+
+
+@contextmanager
+def span(name: str, cat: str = '', **args):
+    """Record the enclosed block as one span."""
+    if not _enabled:
+        yield
+        return
+    start = now_us()
+    try:
+        yield
+    finally:
+        complete(name, start, now_us(), cat, **args)
+
+
+def write(path: Path):
+    """Write everything recorded so far as a Chrome trace JSON file."""
+    with _lock:
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0,
+                   'args': {'name': f"{Path(sys.argv[0]).name} ({os.getpid()})"}}] + list(_events)
+    Path(path).write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+    print(f"Trace with {len(events)} events written to {path} (open in https://ui.perfetto.dev)")
+
+
+def merge(output: Path, inputs: List[Path]):
+    """Combine traces from several processes into one file."""
+    events = []
+    for path in inputs:
+        events.extend(json.loads(Path(path).read_text())['traceEvents'])
+    Path(output).write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+    print(f"Merged {len(inputs)} traces ({len(events)} events) into {output}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4 or sys.argv[1] != 'merge':
+        print("Usage: python3 chrome_trace.py merge OUTPUT INPUT [INPUT ...]")
+        sys.exit(1)
+    merge(Path(sys.argv[2]), [Path(p) for p in sys.argv[3:]])
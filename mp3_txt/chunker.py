@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+chunker - Token-aware, sentence-boundary chunking for the mdclean tools
+
+Splits a transcript body into evenly sized chunks for LLM cleaning:
+
+  1. Paragraphs (blank-line separated) and lines are the natural units. In a
+     timestamped transcript every line is one pause-delimited window.
+  2. Units over the size limit are split at sentence ends (. ! ?), and if a
+     sentence is still too long (unpunctuated Vosk output) at word boundaries.
+  3. Small units are packed together toward target_tokens without ever
+     exceeding max_tokens.
+  4. Optionally, the tail of the previous chunk is attached as read-only
+     context so the model can stitch sentences across chunk boundaries.
+
+Token counts are estimated (about 4 characters or 0.75 words per token) unless
+a tokenizer callable is given.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+@dataclass
+class Chunk:
+    """One unit of LLM work: text to clean plus optional read-only context."""
+    text: str
+    context: str = ''
+
+    @property
+    def key(self) -> str:
+        """Text identifying this chunk for caching (context changes the output)."""
+        return f"{self.context}\0{self.text}" if self.context else self.text
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text without loading a tokenizer."""
+    return max(len(text) // 4, int(len(text.split()) * 4 / 3))
+
+
+def _split_long(text: str, max_tokens: int, count: Callable[[str], int]) -> List[str]:
+    """Split text at sentence ends, then word boundaries, so no piece exceeds max_tokens."""
+    if count(text) <= max_tokens:
+        return [text]
+
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        if count(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # No usable sentence boundary: cut at word boundaries into even pieces
+        words = sentence.split()
+        n_pieces = -(-count(sentence) // max_tokens)
+        per_piece = -(-len(words) // n_pieces)
+        for i in range(0, len(words), per_piece):
+            pieces.append(' '.join(words[i:i + per_piece]))
+    return pieces
+
+
+def _units(text: str, max_tokens: int, count: Callable[[str], int]) -> List[Tuple[str, str]]:
+    """Break text into (separator, unit) pairs no larger than max_tokens."""
+    units = []
+    for p, paragraph in enumerate(re.split(r'\n\s*\n', text.strip())):
+        for l, line in enumerate(paragraph.split('\n')):
+            line = line.strip()
+            if not line:
+                continue
+            sep = '\n\n' if p and not l else '\n'
+            for s, piece in enumerate(_split_long(line, max_tokens, count)):
+                units.append((sep if not s else ' ', piece))
+    return units
+
+
+def tail_context(text: str, tokens: int, tokenizer: Optional[Callable[[str], int]] = None) -> str:
+    """Last whole words of text amounting to at most `tokens` tokens (a following chunk's context)."""
+    count = tokenizer or estimate_tokens
+    words = text.split()
+    tail = []
+    for word in reversed(words):
+        if count(' '.join([word] + tail)) > tokens:
+            break
+        tail.insert(0, word)
+    return ' '.join(tail)
+
+
+def chunk_text(
+    text: str,
+    target_tokens: int = 500,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: int = 0,
+    tokenizer: Optional[Callable[[str], int]] = None,
+) -> List[Chunk]:
+    """
+    Split text into chunks of roughly target_tokens.
+
+    Args:
+        target_tokens: size to pack chunks toward
+        max_tokens: hard limit per chunk (default 1.5 x target_tokens)
+        overlap_tokens: tokens of the previous chunk to attach as context
+        tokenizer: callable returning a token count (default estimate_tokens)
+
+    Returns list of Chunk. Joining the chunk texts with '\\n\\n' preserves all
+    content. Raises ValueError when target_tokens or max_tokens is below 1.
+    """
+    if target_tokens < 1:
+        raise ValueError(f"target_tokens must be at least 1, not {target_tokens}")
+    if max_tokens is not None and max_tokens < 1:
+        raise ValueError(f"max_tokens must be at least 1, not {max_tokens}")
+    count = tokenizer or estimate_tokens
+    max_tokens = max_tokens or int(target_tokens * 1.5)
+
+    chunks: List[str] = []
+    current = ''
+    # Oversized lines are cut at the target so the pieces pack evenly
+    for sep, unit in _units(text, target_tokens, count):
+        if not current:
+            current = unit
+            continue
+        candidate = current + sep + unit
+        size = count(candidate)
+        # Close the chunk if adding would overflow, or would pass the target
+        # when the chunk is already at least half full
+        if size > max_tokens or (size > target_tokens and count(current) >= target_tokens // 2):
+            chunks.append(current)
+            current = unit
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+
+    result = []
+    for i, chunk in enumerate(chunks):
+        context = tail_context(chunks[i - 1], overlap_tokens, count) if i and overlap_tokens else ''
+        result.append(Chunk(text=chunk, context=context))
+    return result
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+evaluation - Word error rate, real-time factor and peak memory of transcription configs
+
+`transcribe_enhanced.py evaluate` runs every engine/model configuration over a
+folder of audio files that have reference transcripts next to them
+(`talk.mp3` + `talk.txt`, `talk.ref.txt` or `talk.md`) and reports, per config:
+
+  - WER: word-level edit distance to the reference (substitutions, deletions
+    and insertions) over the number of reference words, pooled over all files
+  - RTF: wall-clock transcription time over audio duration (lower is faster)
+  - peak memory: the largest resident set of any one transcription
+
+Each file is transcribed in a fresh process (`transcribe_enhanced.py single`),
+so model loading is counted the way a real run pays for it and the peak
+memory of one config never leaks into the next.
+
+Configurations are written engine:model[:compute_type], e.g. `vosk`,
+`vosk:~/models/vosk-model-small-en-us-0.15`, `whisper:base`,
+`whisper:small:float32`, `hybrid:small`.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+REFERENCE_SUFFIXES = ('.ref.txt', '.txt', '.ref.md', '.md')
+
+DEFAULT_CONFIGS = ['vosk', 'whisper:tiny', 'whisper:base', 'whisper:small']
+
+_FRONTMATTER = re.compile(r'\A---\n.*?\n---\n', re.DOTALL)
+_TIMESTAMP = re.compile(r'\[\d{1,2}:\d{2}(?::\d{2})?\]')
+_NON_WORD = re.compile(r"[^\w']+")
+
+
+def parse_config(spec: str) -> dict:
+    """Split 'engine:model[:compute_type]' into its parts (model and compute_type may be None)."""
+    # Vosk model paths may contain ':' on odd setups, so only the first split is certain
+    engine, _, rest = spec.partition(':')
+    model, compute_type = rest or None, None
+    if engine in ('whisper', 'hybrid') and rest and ':' in rest:
+        model, compute_type = rest.split(':', 1)
+    if model and engine == 'vosk':
+        model = str(Path(model).expanduser())
+    return {'name': spec, 'engine': engine, 'model': model, 'compute_type': compute_type}
+
+
+def find_reference(audio: Path) -> Optional[Path]:
+    """Reference transcript stored next to the audio file, if any."""
+    for suffix in REFERENCE_SUFFIXES:
+        candidate = audio.with_name(audio.stem + suffix)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def transcript_words(text: str) -> List[str]:
+    """Normalized words of a transcript: no frontmatter, headings, timestamps, case or punctuation."""
+    text = _FRONTMATTER.sub('', text)
+    text = '\n'.join(line for line in text.splitlines() if not line.lstrip().startswith('#'))
+    text = _TIMESTAMP.sub(' ', text).lower()
+    return [w.strip("'") for w in _NON_WORD.split(text) if w.strip("'")]
+
+
+def word_errors(reference: List[str], hypothesis: List[str]) -> int:
+    """Minimum substitutions + deletions + insertions turning reference into hypothesis."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1,                            # deletion
+                               current[j - 1] + 1,                         # insertion
+                               previous[j - 1] + (ref_word != hyp_word)))  # substitution
+        previous = current
+    return previous[-1]
+
+
+def _max_rss_mb(ru_maxrss: int) -> float:
+    # Linux reports kilobytes, macOS bytes
+    return ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else ru_maxrss / 1024
+
+
+def run_config(script: Path, config: dict, audio: Path, outdir: Path, language: Optional[str] = None):
+    """
+    Transcribe one file with one config in a child process.
+
+    Returns (output markdown path, wall seconds, peak RSS in MB); raises
+    RuntimeError with the tail of the child's output if it fails.
+    """
+    cmd = [sys.executable, str(script), 'single', str(audio), '--outdir', str(outdir),
+           '--engine', config['engine']]
+    if config['model']:
+        cmd += ['--model', config['model']]
+    if config['compute_type']:
+        cmd += ['--compute-type', config['compute_type']]
+    if language:
+        cmd += ['--language', language]
+
+    # Errors are printed to the console (stdout), so both streams are kept
+    with tempfile.TemporaryFile() as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives this child's own peak RSS (getrusage(RUSAGE_CHILDREN)
+        # would only report the maximum over all children so far)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            log.seek(0)
+            tail = log.read().decode('utf-8', 'replace').strip().splitlines()[-3:]
+            raise RuntimeError(' / '.join(tail) or f"exit code {proc.returncode}")
+
+    return outdir / f"{audio.stem}.md", elapsed, _max_rss_mb(usage.ru_maxrss)
+
+
+def pareto_front(results: List[dict], keys=('wer', 'rtf', 'peak_mb')) -> List[dict]:
+    """Results no other result beats or equals on every key (lower is better)."""
+    def dominates(a, b):
+        return all(a[k] <= b[k] for k in keys) and any(a[k] < b[k] for k in keys)
+
+    return [r for r in results if not any(dominates(other, r) for other in results if other is not r)]
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+fingerprint - Acoustic fingerprints to spot the same recording under another name
+
+Inbox copies of one recording ("talk.mp3", "talk - 002.mp3", a re-encode at
+another bitrate) have different bytes but the same sound. Before a batch
+transcribes a file it is fingerprinted, and if an already transcribed file
+matches, that transcript is reused instead of recognizing the speech again.
+
+Fingerprints are spectral peak pairs (the approach of Shazam-style audio ID):
+
+  - the audio is decoded by ffmpeg to 8 kHz mono and read in blocks
+  - each 128 ms frame (64 ms hop) has a candidate peak, the strongest bin,
+    in each of a few frequency bands if it stands out from the block's
+    average level; a candidate is a landmark when it is also the strongest
+    in its band for PEAK_NEIGHBORHOOD frames either side
+  - every landmark is paired with the landmarks in its target zone, up to
+    MAX_DT frames (2 s) later; a pair's (f1, f2, dt) at full frequency
+    resolution is a 23-bit hash that survives re-encoding, volume changes
+    and trimming
+  - a fixed 1 in HASH_SAMPLING subset of (f1, f2) values is kept, so every
+    copy keeps the same subset and the index stays small (~60k hashes per
+    hour) while over 500k distinct hash values remain, so a hash is rarely
+    shared by unrelated recordings
+
+A landmark in a copy may land one frame off (the copy is not frame-aligned),
+so a lookup also tries dt +-1; hashes found in more than MAX_HASH_ROWS
+indexed rows are skipped as uninformative.
+
+Two files match when many of their hashes line up at one constant time
+offset. Matches are reused only when they cover most of the new file and
+the durations agree; other overlaps are reported as near-duplicates.
+
+Usage:
+    index = FingerprintIndex(DEFAULT_FINGERPRINT_PATH)
+    hashes, duration = fingerprint_file(path)
+    match = index.find_match(hashes, duration)
+    ...
+    index.add(path, hashes, duration, transcript_path)
+"""
+
+import sqlite3
+import subprocess
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_FINGERPRINT_PATH = Path.home() / ".cache" / "mp3_txt" / "fingerprints.db"
+
+FP_SAMPLE_RATE = 8000
+FFT_SIZE = 1024
+HOP = 512
+BLOCK_FRAMES = 1024  # ~65 s of audio decoded and analysed at a time
+
+# FFT bin edges of the bands that each contribute at most one peak per frame
+BANDS = [(8, 20), (20, 40), (40, 80), (80, 160), (160, 320), (320, 512)]
+PEAK_FACTOR = 3.0       # a band peak must exceed this multiple of the block's mean magnitude
+PEAK_NEIGHBORHOOD = 3   # frames either side a landmark must be the band's strongest peak in
+DT_BITS = 5
+MAX_DT = 2 ** DT_BITS - 1  # target zone: frames after a landmark it is paired with
+HASH_SAMPLING = 16      # keep hashes whose mixed value is 0 modulo this
+# Hashes found in more indexed rows than this say nothing about which file matches
+MAX_HASH_ROWS = 1000
+# Bumped when hashes change; an index written with other hashes is emptied
+FINGERPRINT_VERSION = 2
+
+# Matching: fraction of the new file's hashes aligned with one indexed file
+DUPLICATE_COVERAGE = 0.3
+NEAR_DUPLICATE_COVERAGE = 0.05
+DURATION_TOLERANCE = 0.05  # relative; plus DURATION_SLACK seconds
+DURATION_SLACK = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    hashes INTEGER NOT NULL,
+    transcript TEXT
+);
+CREATE TABLE IF NOT EXISTS hashes (
+    hash INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    t INTEGER NOT NULL,
+    PRIMARY KEY (hash, file_id, t)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hashes_file ON hashes (file_id);
+"""
+
+
+def fingerprint_pcm(samples, frame_offset: int = 0):
+    """
+    Hashes of one block of float samples at FP_SAMPLE_RATE.
+
+    Returns an int64 array of shape (n, 2): hash, frame index (plus
+    frame_offset). Landmarks within PEAK_NEIGHBORHOOD frames of either end
+    of samples see only part of their neighborhood.
+    """
+    import numpy as np
+
+    n_frames = (len(samples) - FFT_SIZE) // HOP + 1
+    if n_frames < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    idx = np.arange(FFT_SIZE)[None, :] + HOP * np.arange(n_frames)[:, None]
+    spectrum = np.abs(np.fft.rfft(samples[idx] * np.hanning(FFT_SIZE), axis=1))
+
+    # Candidate peak per band per frame, kept where it is the band's strongest
+    # in the surrounding frames; -1 elsewhere
+    threshold = spectrum.mean() * PEAK_FACTOR
+    width = 2 * PEAK_NEIGHBORHOOD + 1
+    peaks = np.full((n_frames, len(BANDS)), -1, dtype=np.int64)
+    for b, (lo, hi) in enumerate(BANDS):
+        band = spectrum[:, lo:hi]
+        arg = band.argmax(axis=1)
+        level = band[np.arange(n_frames), arg]
+        padded = np.pad(level, PEAK_NEIGHBORHOOD, constant_values=-1.0)
+        local_max = np.lib.stride_tricks.sliding_window_view(padded, width).max(axis=1)
+        landmark = (level > threshold) & (level >= local_max)
+        peaks[landmark, b] = arg[landmark] + lo
+
+    pairs = []
+    for dt in range(1, MAX_DT + 1):
+        f1 = peaks[:-dt, :, None]   # (frames, bands, 1)
+        f2 = peaks[dt:, None, :]    # (frames, 1, bands)
+        valid = (f1 >= 0) & (f2 >= 0)
+        h = (f1 << (9 + DT_BITS)) | (f2 << DT_BITS) | dt
+        t = np.broadcast_to(np.arange(n_frames - dt)[:, None, None], h.shape)
+        pairs.append(np.stack([h[valid], t[valid]], axis=1))
+    hashes = np.concatenate(pairs)
+
+    # Keep the same subset of hash values in every file; dt is left out, so
+    # the dt +-1 variants find_match looks up are kept or dropped together
+    mixed = ((hashes[:, 0] >> DT_BITS) * 2654435761) & 0xFFFFFFFF
+    hashes = hashes[(mixed >> 8) % HASH_SAMPLING == 0]
+    hashes[:, 1] += frame_offset
+    return hashes
+
+
+def fingerprint_file(path: Path):
+    """Decode path with ffmpeg and fingerprint it block by block. Returns (hashes, duration)."""
+    import numpy as np
+
+    proc = subprocess.Popen(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(path),
+         "-ac", "1", "-ar", str(FP_SAMPLE_RATE), "-f", "s16le", "-acodec", "pcm_s16le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    block_samples = BLOCK_FRAMES * HOP
+    tail = np.zeros(0, dtype=np.float32)
+    frame_offset = 0
+    total_samples = 0
+    lead = 0  # frames at the start of the block that are only context
+    blocks = []
+    try:
+        while True:
+            data = proc.stdout.read(block_samples * 2)
+            if data:
+                total_samples += len(data) // 2
+                samples = np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0
+                tail = np.concatenate([tail, samples])
+            n_frames = (len(tail) - FFT_SIZE) // HOP + 1
+            if data and n_frames <= BLOCK_FRAMES:
+                continue
+            block = fingerprint_pcm(tail, frame_offset)
+            anchor = block[:, 1] - frame_offset
+            if not data:
+                blocks.append(block[anchor >= lead])
+                break
+            # Keep pairs anchored in frames whose partners (and the frames
+            # around them that decide if they are landmarks) are all in this
+            # block; the remaining frames are hashed again with the next one,
+            # which starts PEAK_NEIGHBORHOOD frames earlier for context
+            used = n_frames - MAX_DT - PEAK_NEIGHBORHOOD
+            blocks.append(block[(anchor >= lead) & (anchor < used)])
+            tail = tail[(used - PEAK_NEIGHBORHOOD) * HOP:]
+            frame_offset += used - PEAK_NEIGHBORHOOD
+            lead = PEAK_NEIGHBORHOOD
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    hashes = np.concatenate(blocks) if blocks else np.zeros((0, 2), dtype=np.int64)
+    return hashes, total_samples / FP_SAMPLE_RATE
+
+
+class FingerprintIndex:
+    """Persistent fingerprint store shared by the batch worker threads."""
+
+    def __init__(self, path: Path = DEFAULT_FINGERPRINT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Hashes from another fingerprint version never match: start over
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != FINGERPRINT_VERSION:
+            self.conn.execute("DELETE FROM hashes")
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute(f"PRAGMA user_version = {FINGERPRINT_VERSION}")
+            self.conn.commit()
+
+    def find_match(self, hashes, duration: float, exclude: Optional[Path] = None) -> Optional[dict]:
+        """
+        Best indexed file sharing hashes at a constant offset.
+
+        Returns {path, transcript, duration, coverage, duplicate} or None when
+        nothing reaches NEAR_DUPLICATE_COVERAGE. duplicate is True when the
+        match's transcript can stand in for this file; transcript is None
+        while the match is still being transcribed.
+        """
+        if not len(hashes):
+            return None
+        exclude_id = None
+        query = {}
+        for i, (h, t) in enumerate(hashes.tolist()):
+            dt = h & MAX_DT
+            for variant in (h - 1 if dt > 1 else None, h, h + 1 if dt < MAX_DT else None):
+                if variant is not None:
+                    query.setdefault(variant, []).append((i, t))
+        keys = list(query)
+        matches = defaultdict(list)  # file_id -> [(offset, query entry)]
+        with self.lock:
+            if exclude is not None:
+                row = self.conn.execute("SELECT id FROM files WHERE path = ?", (str(Path(exclude).resolve()),)).fetchone()
+                exclude_id = row[0] if row else None
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.conn.execute(
+                    f"""
+                    SELECT hash, file_id, t FROM hashes WHERE hash IN (
+                        SELECT hash FROM hashes WHERE hash IN ({placeholders})
+                        GROUP BY hash HAVING COUNT(*) <= ?)
+                    """,
+                    batch + [MAX_HASH_ROWS],
+                ).fetchall()
+                for h, file_id, t in rows:
+                    if file_id != exclude_id:
+                        matches[file_id].extend((t - qt, i) for i, qt in query[h])
+
+        # The copies line up at one offset (give or take a frame, when they are
+        # not frame-aligned); coverage counts query hashes matched there
+        best_id, coverage = None, 0.0
+        for file_id, pairs in matches.items():
+            votes = Counter(offset for offset, _ in pairs)
+            offset = max(votes, key=lambda o: votes[o - 1] + votes[o] + votes[o + 1])
+            matched = len({i for o, i in pairs if abs(o - offset) <= 1}) / len(hashes)
+            if matched > coverage:
+                best_id, coverage = file_id, matched
+        if coverage < NEAR_DUPLICATE_COVERAGE:
+            return None
+
+        with self.lock:
+            path, transcript, other_duration = self.conn.execute(
+                "SELECT path, transcript, duration FROM files WHERE id = ?", (best_id,)).fetchone()
+        same_length = abs((other_duration or 0) - duration) <= duration * DURATION_TOLERANCE + DURATION_SLACK
+        return {
+            'path': path,
+            'transcript': transcript,
+            'duration': other_duration,
+            'coverage': coverage,
+            'duplicate': coverage >= DUPLICATE_COVERAGE and same_length,
+        }
+
+    def add(self, path: Path, hashes, duration: float, transcript: Optional[Path] = None):
+        """Store (or replace) the fingerprint of path and the transcript made from it."""
+        path = Path(path).resolve()
+        st = path.stat()
+        transcript = str(Path(transcript).resolve()) if transcript else None
+        with self.lock:
+            row = self.conn.execute("SELECT id, size, mtime_ns, hashes FROM files WHERE path = ?",
+                                    (str(path),)).fetchone()
+            if row and tuple(row[1:]) == (st.st_size, st.st_mtime_ns, len(hashes)):
+                # Same file, fingerprinted before its transcript was written
+                self.conn.execute("UPDATE files SET transcript = ?, duration = ? WHERE id = ?",
+                                  (transcript, duration, row[0]))
+                self.conn.commit()
+                return
+            if row:
+                self.conn.execute("DELETE FROM hashes WHERE file_id = ?", (row[0],))
+                self.conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+            cur = self.conn.execute(
+                "INSERT INTO files (path, size, mtime_ns, duration, hashes, transcript) VALUES (?, ?, ?, ?, ?, ?)",
+                (str(path), st.st_size, st.st_mtime_ns, duration, len(hashes), transcript),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO hashes (hash, file_id, t) VALUES (?, ?, ?)",
+                ((h, cur.lastrowid, t) for h, t in hashes.tolist()),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+job_ledger - Durable SQLite record of batch transcription jobs
+
+Every audio file a batch discovers gets a row with its size, mtime, content
+hash, duration, engine/model, status, attempt count, timings and last error:
+
+    pending -> running -> done
+                       -> failed (retried until it runs out of attempts)
+            -> claimed (batch --worker: another worker has it)
+
+Re-running a batch against the same ledger resumes it: finished files are
+skipped, jobs left `running` by a crash go back to pending, and files that
+changed on disk since they were transcribed are queued again.
+
+Discovery walks directories with os.scandir and inserts paths in batches, and
+pending jobs are read back in pages, so a folder with millions of files is
+never held in memory as a list.
+
+Each job remembers the input directory it was found under and its path
+relative to it (the `path` key is resolved, so a symlink may point outside
+the input directory). Pending jobs are only returned for the input directory
+and recursion of the current run, so a ledger reused with another folder, or
+without --recursive after a recursive run, does not pick up foreign files.
+
+Usage:
+    ledger = JobLedger(outdir / ".batch_ledger.db")
+    ledger.discover(iter_audio_files(indir, recursive=True), indir)
+    for job in ledger.iter_pending(max_attempts=3, root=indir, recursive=True):
+        ledger.start(job['path'], engine, model)
+        ...
+        ledger.finish(job['path'], output_file, duration=..., hash=...)   # or ledger.fail(path, error)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.wav', '.flac')
+
+LEDGER_NAME = ".batch_ledger.db"
+
+DISCOVER_BATCH = 1000
+PAGE_SIZE = 500
+
+# Bytes read from each end of a file for its quick hash
+HASH_SAMPLE_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT,
+    duration REAL,
+    engine TEXT,
+    model TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    discovered_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    elapsed REAL,
+    error TEXT,
+    output TEXT,
+    root TEXT,
+    relative TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, attempts);
+"""
+
+
+def iter_audio_files(root: Path, recursive: bool = False,
+                     extensions: tuple = AUDIO_EXTENSIONS) -> Iterator[Path]:
+    """Yield audio files under root one at a time (depth-first with recursive)."""
+    stack = [Path(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not entry.name.startswith('.'):
+                            stack.append(Path(entry.path))
+                    elif entry.name.lower().endswith(extensions):
+                        yield Path(entry.path)
+        except OSError as e:
+            print(f"Warning: cannot read {directory}: {e}")
+
+
+def file_hash(path: Path) -> str:
+    """Quick content hash: size plus sha256 of the first and last MB."""
+    size = path.stat().st_size
+    h = hashlib.sha256(str(size).encode())
+    with path.open('rb') as f:
+        h.update(f.read(HASH_SAMPLE_BYTES))
+        if size > 2 * HASH_SAMPLE_BYTES:
+            f.seek(-HASH_SAMPLE_BYTES, os.SEEK_END)
+            h.update(f.read(HASH_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+class JobLedger:
+    """Thread-safe job table shared by the batch worker threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Ledgers written before jobs recorded their input directory
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column in ('root', 'relative'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        # Jobs still marked running were interrupted by a crash or Ctrl-C, and
+        # jobs another worker had claimed are checked again
+        self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+        self.conn.commit()
+        self.requeue_claimed()
+
+    def discover(self, paths: Iterable[Path], root: Path) -> int:
+        """
+        Add new files found under root as pending and re-queue files changed since they were seen.
+
+        Returns the number of paths scanned.
+        """
+        scanned = 0
+        rows = []
+        root = Path(root)
+        resolved_root = str(root.resolve())
+
+        def flush():
+            with self.lock:
+                self.conn.executemany(
+                    """
+                    INSERT INTO jobs (path, size, mtime_ns, discovered_at, root, relative) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        root = excluded.root, relative = excluded.relative
+                    WHERE jobs.size = excluded.size AND jobs.mtime_ns = excluded.mtime_ns
+                    """,
+                    rows,
+                )
+                self.conn.executemany(
+                    """
+                    UPDATE jobs SET size = ?, mtime_ns = ?, root = ?, relative = ?,
+                        status = 'pending', attempts = 0, hash = NULL, error = NULL
+                    WHERE path = ? AND (size != ? OR mtime_ns != ?)
+                    """,
+                    [(size, mtime, r, rel, path, size, mtime) for path, size, mtime, _, r, rel in rows],
+                )
+                self.conn.commit()
+            rows.clear()
+
+        now = time.time()
+        for path in paths:
+            try:
+                st = path.stat()
+                relative = Path(path).relative_to(root).as_posix()
+            except (OSError, ValueError):
+                continue
+            rows.append((str(path.resolve()), st.st_size, st.st_mtime_ns, now, resolved_root, relative))
+            scanned += 1
+            if len(rows) >= DISCOVER_BATCH:
+                flush()
+        if rows:
+            flush()
+        return scanned
+
+    def reset_failed(self) -> int:
+        """Give failed jobs a fresh set of attempts. Returns how many were reset."""
+        with self.lock:
+            cur = self.conn.execute("UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+            self.conn.commit()
+            return cur.rowcount
+
+    @staticmethod
+    def _pending_filter(root: Path, recursive: bool) -> tuple:
+        """WHERE clause and parameters for jobs to run under root (subdirectories only with recursive)."""
+        sql = "root = ? AND (status = 'pending' OR (status = 'failed' AND attempts < ?))"
+        if not recursive:
+            sql += " AND instr(relative, '/') = 0"
+        return sql, (str(Path(root).resolve()),)
+
+    def count_pending(self, max_attempts: int, root: Path, recursive: bool = False) -> int:
+        """Jobs that iter_pending would return."""
+        where, params = self._pending_filter(root, recursive)
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE {where}", params + (max_attempts,),
+            ).fetchone()[0]
+
+    def iter_pending(self, max_attempts: int, root: Path, recursive: bool = False) -> Iterator[dict]:
+        """Yield pending jobs and failed jobs under max_attempts found under root, a page at a time."""
+        where, params = self._pending_filter(root, recursive)
+        last = ''
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT * FROM jobs WHERE path > ? AND {where} ORDER BY path LIMIT ?",
+                    (last,) + params + (max_attempts, PAGE_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last = rows[-1]['path']
+
+    def _update(self, sql: str, params: tuple):
+        with self.lock:
+            self.conn.execute(sql, params)
+            self.conn.commit()
+
+    def start(self, path: str, engine: str, model: Optional[str]):
+        """Mark a job running and count the attempt."""
+        self._update(
+            """
+            UPDATE jobs SET status = 'running', engine = ?, model = ?, attempts = attempts + 1,
+                started_at = ?, finished_at = NULL, error = NULL
+            WHERE path = ?
+            """,
+            (engine, model, time.time(), path),
+        )
+
+    def finish(self, path: str, output: str, duration: Optional[float] = None,
+               hash: Optional[str] = None, model: Optional[str] = None):
+        """Mark a job done with its output file and measurements."""
+        now = time.time()
+        self._update(
+            """
+            UPDATE jobs SET status = 'done', finished_at = ?, elapsed = ? - started_at,
+                output = ?, duration = COALESCE(?, duration), hash = COALESCE(?, hash),
+                model = COALESCE(?, model), error = NULL
+            WHERE path = ?
+            """,
+            (now, now, output, duration, hash, model, path),
+        )
+
+    def fail(self, path: str, error: str):
+        """Mark a job failed with its error message."""
+        now = time.time()
+        self._update(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, elapsed = ? - started_at, error = ? WHERE path = ?",
+            (now, now, error, path),
+        )
+
+    def claimed_elsewhere(self, path: str, output: Optional[str] = None, holder: Optional[str] = None):
+        """
+        Record a job another worker owns (batch --worker).
+
+        With output the other worker has finished it and it is marked done;
+        otherwise it is 'claimed' and checked again on the next run.
+        """
+        if output is not None:
+            self._update("UPDATE jobs SET status = 'done', output = ?, error = NULL WHERE path = ?",
+                         (output, path))
+        else:
+            self._update("UPDATE jobs SET status = 'claimed', error = ? WHERE path = ?",
+                         (f"claimed by {holder}" if holder else None, path))
+
+    def requeue_claimed(self) -> int:
+        """Make jobs claimed by other workers pending again, to see if they finished or expired."""
+        with self.lock:
+            cur = self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'claimed'")
+            self.conn.commit()
+            return cur.rowcount
+
+    def summary(self) -> dict:
+        """Job counts by status."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def failures(self, limit: int = 20) -> list:
+        """Most recent failed jobs (path, attempts, error)."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, attempts, error FROM jobs WHERE status = 'failed' ORDER BY finished_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+journal - Incremental output and resume for long mdclean runs
+
+Each cleaned chunk is appended to a journal file next to the output
+(<output>.journal) as soon as it completes, and the output file is extended
+with every chunk that completes the in-order prefix, so the first pages can be
+reviewed while the rest runs.
+
+After a crash or Ctrl-C, running again with --resume reloads the journal and
+only the missing chunks are processed. The journal starts with a signature of
+the input and settings; if either changed it is discarded. On success the
+final output is written in one go (byte-identical to an uninterrupted run) and
+the journal is removed.
+
+Usage:
+    journal = ChunkJournal(output_path, signature, header, resume=args.resume)
+    for i, chunk in enumerate(chunks):
+        if i in journal.done:
+            continue
+        journal.record(i, clean(chunk))
+    ...write final output...
+    journal.finish()
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+
+def run_signature(*parts) -> str:
+    """Hash of everything that determines the chunk list and its results."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ChunkJournal:
+    """Append-only record of completed chunks for one output file."""
+
+    def __init__(self, output_path: Path, signature: str, header: str = '',
+                 separator: str = '\n\n', resume: bool = False):
+        self.output_path = Path(output_path)
+        self.path = self.output_path.with_name(self.output_path.name + '.journal')
+        self.signature = signature
+        self.header = header
+        self.separator = separator
+        self.done: Dict[int, str] = {}
+        self.written = 0  # chunks of the in-order prefix already in output_path
+        self.lock = threading.Lock()
+
+        if resume:
+            self._load()
+            if self.done:
+                print(f"Resuming: {len(self.done)} chunks already done")
+
+        # Rewrite rather than append so a line truncated by a crash is dropped
+        self.file = self.path.open('w', encoding='utf-8')
+        self._append({'signature': signature})
+        for index in sorted(self.done):
+            self._append({'index': index, 'text': self.done[index]})
+
+        # Rebuild the partial output from whatever prefix is already complete
+        self.output_path.write_text(header, encoding='utf-8')
+        self._extend_output()
+
+    def _load(self):
+        try:
+            lines = self.path.read_text(encoding='utf-8').splitlines()
+        except FileNotFoundError:
+            return
+        if not lines:
+            return
+        try:
+            meta = json.loads(lines[0])
+        except json.JSONDecodeError:
+            meta = {}
+        if meta.get('signature') != self.signature:
+            print("Journal does not match this input/settings, starting over")
+            return
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break  # Truncated last line from a crash
+            self.done[entry['index']] = entry['text']
+
+    def _append(self, entry: dict):
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _extend_output(self):
+        pieces = []
+        while self.written in self.done:
+            if self.written:
+                pieces.append(self.separator)
+            pieces.append(self.done[self.written])
+            self.written += 1
+        if pieces:
+            with self.output_path.open('a', encoding='utf-8') as f:
+                f.write(''.join(pieces))
+
+    def record(self, index: int, text: str):
+        """Mark chunk `index` as done with its cleaned text."""
+        with self.lock:
+            self.done[index] = text
+            self._append({'index': index, 'text': text})
+            self._extend_output()
+
+    def finish(self):
+        """Close and remove the journal (call after the final output is written)."""
+        self.file.close()
+        self.path.unlink(missing_ok=True)
+
+    def close(self):
+        """Close the journal but keep it for a later --resume."""
+        if not self.file.closed:
+            self.file.close()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+llm_cache - Content-addressed on-disk cache for LLM-cleaned chunks
+
+Shared by mdclean.py, mdclean_simple.py and mdclean_claude.py so re-runs only
+send new or changed chunks to the LLM. Entries are keyed by
+
+    (backend, model, prompt template version, temperature, sha256(chunk))
+
+so changing any of these produces a miss. The prompt template version is the
+tool's name plus its PROMPT_VERSION (each tool's CACHE_VERSION, e.g.
+"mdclean_simple:1"), since tools on the same backend use different prompts;
+bump a tool's PROMPT_VERSION whenever its prompt text changes.
+
+The cache is a single SQLite file. When it grows past max_bytes the least
+recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "mp3_txt" / "llm_cache.db"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+
+
+def chunk_key(backend: str, model: str, prompt_version: str, temperature: float, chunk: str) -> str:
+    """Build the cache key for one chunk."""
+    chunk_hash = hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+    ident = json.dumps([backend, model, prompt_version, float(temperature), chunk_hash])
+    return hashlib.sha256(ident.encode('utf-8')).hexdigest()
+
+
+class ChunkCache:
+    """
+    Thread-safe cache of cleaned chunks.
+
+    Usage:
+        cache = ChunkCache()
+        cleaned = cache.get('ollama', model, CACHE_VERSION, 0.2, chunk)
+        if cleaned is None:
+            cleaned = ...  # call the LLM
+            cache.put('ollama', model, CACHE_VERSION, 0.2, chunk, cleaned)
+        cache.close()  # evicts down to max_bytes
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, backend: str, model: str, prompt_version: str, temperature: float, chunk: str) -> Optional[str]:
+        """Return the cached cleaned text for chunk, or None."""
+        key = chunk_key(backend, model, prompt_version, temperature, chunk)
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE chunks SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, backend: str, model: str, prompt_version: str, temperature: float, chunk: str, cleaned: str):
+        """Store the cleaned text for chunk."""
+        key = chunk_key(backend, model, prompt_version, temperature, chunk)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO chunks (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, cleaned, len(cleaned.encode('utf-8')), time.time()),
+            )
+            self.conn.commit()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            doomed = []
+            for key, size in self.conn.execute("SELECT key, size FROM chunks ORDER BY accessed"):
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            self.conn.executemany("DELETE FROM chunks WHERE key = ?", doomed)
+            self.conn.commit()
+
+    def close(self):
+        self.evict()
+        with self.lock:
+            self.conn.close()
+
+    def summary(self) -> str:
+        return f"cache: {self.hits} hits, {self.misses} misses"
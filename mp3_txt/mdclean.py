@@ -3,20 +3,28 @@
 mdclean - Clean and structure raw transcriptions
 
 Modes:
-  fast    - Unstructured-based structure detection (paragraphs, headings)
+  fast    - Structure detection (paragraphs, headings, lists); built-in by
+            default, --structure unstructured for the Unstructured library
+  rules   - Rule-based punctuation and casing (CPU-only, no LLM, milliseconds)
   quality - Unstructured + Ollama for punctuation, grammar, error correction
 
 Usage:
     python3 mdclean.py input.md output.md --mode fast
+    python3 mdclean.py input.md output.md --mode rules
     python3 mdclean.py input.md output.md --mode quality
 """
 
 import re
 import sys
 from pathlib import Path
-from typing import Tuple
+from typing import List, Optional, Tuple
 import argparse
 
+import structure
+from chunker import chunk_text
+from journal import ChunkJournal, run_signature
+from transcript_sidecar import iter_words, sidecar_path, sidecar_text
+
 
 def extract_frontmatter(content: str) -> Tuple[str, str]:
     """
@@ -39,24 +47,36 @@ def extract_frontmatter(content: str) -> Tuple[str, str]:
     return frontmatter, body
 
 
-def clean_fast_mode(text: str) -> str:
+def partition(text: str, backend: str = 'builtin'):
     """
-    Fast mode: Structure detection using basic NLP.
+    Partition text into Title / ListItem / NarrativeText elements.
 
-    - Detect paragraph breaks (topic changes)
-    - Basic capitalization and punctuation inference
-    - Preserve content, improve readability
+    backend 'builtin' uses structure.py (no heavy imports, milliseconds);
+    'unstructured' uses unstructured.partition.text.
     """
+    if backend == 'builtin':
+        return structure.partition_text(text)
+
     # Import here to avoid loading if not needed
     try:
         from unstructured.partition.text import partition_text
-        from unstructured.staging.base import elements_to_text
     except ImportError:
         print("Error: unstructured not installed. Run: pip install 'unstructured[all-docs]'")
         sys.exit(1)
 
+    return partition_text(text=text)
+
+
+def clean_fast_mode(text: str, backend: str = 'builtin') -> str:
+    """
+    Fast mode: Structure detection using basic NLP.
+
+    - Detect paragraph breaks (topic changes, long pauses between timestamps)
+    - Basic capitalization and punctuation inference
+    - Preserve content, improve readability
+    """
     # Partition text into semantic elements
-    elements = partition_text(text=text)
+    elements = partition(text, backend)
 
     # Group elements into paragraphs
     paragraphs = []
@@ -68,8 +88,8 @@ def clean_fast_mode(text: str) -> str:
             continue
 
         # Check if this is likely a new paragraph
-        # (Unstructured detects NarrativeText, Title, ListItem, etc.)
-        elem_type = type(elem).__name__
+        # (both backends expose NarrativeText, Title, ListItem, etc. as category)
+        elem_type = getattr(elem, 'category', type(elem).__name__)
 
         if elem_type == 'Title':
             # Flush current paragraph
@@ -86,7 +106,10 @@ def clean_fast_mode(text: str) -> str:
             # Add list item
             paragraphs.append(f"- {elem_text}")
         else:
-            # NarrativeText or other - accumulate
+            # NarrativeText or other - accumulate, breaking on long pauses
+            if current_paragraph and getattr(elem, 'pause_before', 0.0) >= structure.PARAGRAPH_PAUSE:
+                paragraphs.append(' '.join(current_paragraph))
+                current_paragraph = []
             current_paragraph.append(elem_text)
 
     # Flush remaining paragraph
@@ -97,13 +120,47 @@ def clean_fast_mode(text: str) -> str:
     return '\n\n'.join(paragraphs)
 
 
-def clean_quality_mode(text: str) -> str:
+def clean_rules_mode(text: str, words: Optional[List[dict]] = None) -> str:
+    """
+    Rules mode: deterministic punctuation and casing without an LLM.
+
+    - Sentence boundaries from discourse markers and pauses (punctuate.py)
+    - Capitalization, question marks, common commas
+    - Does not correct misrecognized words
+
+    With words ({word, start, end}, from the sidecar) the pause after every
+    word is known and text is not used.
+    """
+    from punctuate import punctuate_text, punctuate_words
+
+    if words is not None:
+        return punctuate_words(words)
+    return punctuate_text(text)
+
+
+QUALITY_MODEL = 'llama3.2:3b'
+QUALITY_TEMPERATURE = 0.3  # Lower temperature for consistency
+
+# Bump when the quality-mode prompt changes so cached chunks are not reused
+PROMPT_VERSION = "2"
+# The tools share backends but not prompts, so cache entries carry the tool name
+CACHE_VERSION = f"mdclean:{PROMPT_VERSION}"
+
+
+def clean_quality_mode(text: str, cache=None, chunk_tokens: int = 500,
+                       backend: str = 'builtin', journal=None) -> str:
     """
     Quality mode: Unstructured + Ollama for best results.
 
     - Structure detection (Unstructured)
     - Punctuation, capitalization, grammar (Ollama)
     - Error correction (Ollama)
+
+    Consecutive paragraphs are packed into ~chunk_tokens chunks (see chunker).
+    If cache (an llm_cache.ChunkCache) is given, chunks cleaned in an earlier
+    run are reused instead of being sent to Ollama again. If journal (a
+    journal.ChunkJournal) is given, every finished block is recorded and
+    blocks already in it are skipped.
     """
     try:
         import ollama
@@ -111,52 +168,82 @@ def clean_quality_mode(text: str) -> str:
         print("Error: ollama not installed. Run: pip install ollama")
         sys.exit(1)
 
-    # First pass: Structure detection with Unstructured
-    structured_text = clean_fast_mode(text)
+    # First pass: Structure detection
+    structured_text = clean_fast_mode(text, backend)
 
     # Second pass: Polish with Ollama
-    # Process in chunks to avoid token limits
-    paragraphs = structured_text.split('\n\n')
+    # Narrative paragraphs between headings/list items are packed into
+    # evenly sized chunks instead of one request per paragraph
+    blocks = []  # (needs cleaning, text)
+    run = []
+    for paragraph in structured_text.split('\n\n'):
+        # Skip headings and list items (already formatted)
+        if paragraph.startswith('##') or paragraph.startswith('-') or not paragraph.strip():
+            if run:
+                blocks.extend((True, c.text) for c in chunk_text('\n\n'.join(run), target_tokens=chunk_tokens))
+                run = []
+            blocks.append((False, paragraph))
+        else:
+            run.append(paragraph)
+    if run:
+        blocks.extend((True, c.text) for c in chunk_text('\n\n'.join(run), target_tokens=chunk_tokens))
+
     cleaned_paragraphs = []
+    total = sum(1 for needs_cleaning, _ in blocks if needs_cleaning)
+    done = 0
 
-    print("Polishing with Ollama (this may take a few minutes)...")
+    print(f"Polishing {total} chunks with Ollama (this may take a few minutes)...")
 
-    for i, paragraph in enumerate(paragraphs):
-        if not paragraph.strip():
-            cleaned_paragraphs.append('')
+    for i, (needs_cleaning, chunk) in enumerate(blocks):
+        done += needs_cleaning
+        if journal is not None and i in journal.done:
+            cleaned_paragraphs.append(journal.done[i])
             continue
-
-        # Skip headings and list items (already formatted)
-        if paragraph.startswith('##') or paragraph.startswith('-'):
-            cleaned_paragraphs.append(paragraph)
+        if not needs_cleaning:
+            cleaned_paragraphs.append(chunk)
+            if journal is not None:
+                journal.record(i, chunk)
             continue
 
-        print(f"  Processing paragraph {i+1}/{len(paragraphs)}...")
+        if cache is not None:
+            cached = cache.get('ollama', QUALITY_MODEL, CACHE_VERSION, QUALITY_TEMPERATURE, chunk)
+            if cached is not None:
+                cleaned_paragraphs.append(cached)
+                if journal is not None:
+                    journal.record(i, cached)
+                continue
+
+        print(f"  Processing chunk {done}/{total}...")
 
         # Send to Ollama for cleaning
         prompt = f"""Fix this transcription by adding proper punctuation and capitalization.
 Correct obvious transcription errors (homophones, mishearings).
 Preserve ALL content - do not summarize or remove anything.
+Keep the blank lines between paragraphs.
 Output only the corrected text, nothing else.
 
 Transcript:
-{paragraph}
+{chunk}
 
 Corrected:"""
 
         try:
             response = ollama.generate(
-                model='llama3.2:3b',
+                model=QUALITY_MODEL,
                 prompt=prompt,
-                options={'temperature': 0.3}  # Lower temperature for consistency
+                options={'temperature': QUALITY_TEMPERATURE}
             )
 
             cleaned = response['response'].strip()
             cleaned_paragraphs.append(cleaned)
+            if cache is not None:
+                cache.put('ollama', QUALITY_MODEL, CACHE_VERSION, QUALITY_TEMPERATURE, chunk, cleaned)
+            if journal is not None:
+                journal.record(i, cleaned)
         except Exception as e:
-            print(f"    Warning: Ollama error for paragraph {i+1}: {e}")
-            print(f"    Keeping original paragraph")
-            cleaned_paragraphs.append(paragraph)
+            print(f"    Warning: Ollama error for chunk {done}: {e}")
+            print(f"    Keeping original text")
+            cleaned_paragraphs.append(chunk)
 
     return '\n\n'.join(cleaned_paragraphs)
 
@@ -170,6 +257,9 @@ Examples:
   # Fast mode (structure detection only)
   python3 mdclean.py input.md output.md --mode fast
 
+  # Rules mode (punctuation and casing, no LLM)
+  python3 mdclean.py input.md output.md --mode rules
+
   # Quality mode (structure + LLM polish)
   python3 mdclean.py input.md output.md --mode quality
 """
@@ -177,8 +267,17 @@ Examples:
 
     parser.add_argument('input', type=str, help='Input markdown file')
     parser.add_argument('output', type=str, help='Output markdown file')
-    parser.add_argument('--mode', type=str, choices=['fast', 'quality'],
+    parser.add_argument('--mode', type=str, choices=['fast', 'rules', 'quality'],
                         default='fast', help='Cleaning mode (default: fast)')
+    parser.add_argument('--structure', type=str, choices=['builtin', 'unstructured'],
+                        default='builtin',
+                        help='Structure detector for fast/quality mode (default: builtin)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write the cleaned-chunk cache (quality mode)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted quality-mode run from its journal')
+    parser.add_argument('--words', action='store_true',
+                        help='Take the text from the word sidecar (.words.jsonl.gz) next to the input')
 
     args = parser.parse_args()
 
@@ -194,13 +293,42 @@ Examples:
     # Extract frontmatter
     frontmatter, body = extract_frontmatter(content)
 
+    # Clean the recognizer's words instead of the rendered markdown body
+    if args.words:
+        words_path = sidecar_path(input_path)
+        if not words_path.exists():
+            print(f"Error: No word sidecar next to the input: {words_path}")
+            sys.exit(1)
+        body = sidecar_text(words_path)
+
     # Clean based on mode
     print(f"Mode: {args.mode}")
+    journal = None
 
     if args.mode == 'fast':
-        cleaned_body = clean_fast_mode(body)
+        cleaned_body = clean_fast_mode(body, args.structure)
+    elif args.mode == 'rules':
+        # Word timings give the pause after every word, not just paragraph breaks
+        words = list(iter_words(sidecar_path(input_path))) if args.words else None
+        cleaned_body = clean_rules_mode(body, words)
     elif args.mode == 'quality':
-        cleaned_body = clean_quality_mode(body)
+        cache = None
+        if not args.no_cache:
+            from llm_cache import ChunkCache
+            cache = ChunkCache()
+        signature = run_signature('mdclean', PROMPT_VERSION, QUALITY_MODEL, body, args.structure)
+        journal = ChunkJournal(Path(args.output), signature,
+                               header=frontmatter + '\n' if frontmatter else '', resume=args.resume)
+        try:
+            cleaned_body = clean_quality_mode(body, cache=cache, backend=args.structure, journal=journal)
+        except BaseException:
+            journal.close()
+            print(f"\nInterrupted - partial output in {args.output}, rerun with --resume to continue")
+            raise
+        finally:
+            if cache is not None:
+                print(cache.summary())
+                cache.close()
     else:
         print(f"Error: Unknown mode: {args.mode}")
         sys.exit(1)
@@ -211,6 +339,8 @@ Examples:
     # Write output
     output_path = Path(args.output)
     output_path.write_text(final_content)
+    if journal is not None:
+        journal.finish()
 
     print(f"✅ Cleaned transcript saved to: {args.output}")
     print(f"\nStats:")
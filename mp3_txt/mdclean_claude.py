@@ -11,15 +11,32 @@ Usage:
     # Set API key via environment variable:
     export ANTHROPIC_API_KEY="your-key-here"
     python3 mdclean_claude.py input.md output.md
+
+    # More requests in flight, higher rate limit
+    python3 mdclean_claude.py input.md output.md --concurrency 8 --rpm 200
+
+    # Large offline job through the Message Batches API
+    python3 mdclean_claude.py input.md output.md --batch
+
+    # Against a local stand-in server
+    python3 mdclean_claude.py input.md output.md --base-url http://127.0.0.1:8080
 """
 
 import re
 import sys
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Tuple
+from typing import List, Optional, Tuple
 import argparse
 
+from chunker import Chunk, chunk_text
+from journal import ChunkJournal, run_signature
+from transcript_sidecar import sidecar_path, sidecar_text
+
 
 def extract_frontmatter(content: str) -> Tuple[str, str]:
     """Extract YAML frontmatter from markdown content."""
@@ -36,13 +53,220 @@ def extract_frontmatter(content: str) -> Tuple[str, str]:
     return frontmatter, body
 
 
-def clean_with_claude(text: str, api_key: str) -> str:
+CLAUDE_MODEL = "claude-3-5-haiku-20241022"  # Fast, cost-effective
+MAX_TOKENS = 8000
+TEMPERATURE = 0.3
+
+# Bump when SYSTEM_PROMPT or build_prompt changes so cached chunks are not reused
+PROMPT_VERSION = "2"
+# The tools share backends but not prompts, so cache entries carry the tool name
+CACHE_VERSION = f"mdclean_claude:{PROMPT_VERSION}"
+
+# Sent once per request as a cache-marked system prompt, so the API can reuse
+# the processed prefix instead of reading it again for every chunk
+SYSTEM_PROMPT = """You clean up speech-to-text transcripts. For each transcript you are given:
+1. Add proper punctuation (periods, commas, question marks, etc.)
+2. Add proper capitalization
+3. Fix obvious transcription errors (homophones, mishearings)
+4. Organize into natural paragraphs (add blank lines between paragraphs)
+5. Preserve ALL content - do not summarize or remove anything
+
+Text marked as preceding context is for understanding only and must not be repeated.
+Return ONLY the cleaned transcript, no explanations or meta-commentary."""
+
+# Prompts shorter than this are processed normally even when cache-marked
+# (per-model minimum cacheable prompt length)
+MIN_CACHEABLE_TOKENS = {'haiku': 2048}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+# HTTP status codes worth retrying (rate limited, overloaded, server errors)
+RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Allows bursts of up to `capacity` requests and refills at `rate` requests
+    per second. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def build_prompt(chunk: str, context: str = '') -> str:
+    """Build the user message for one chunk (context is the end of the previous chunk)."""
+    context_block = ''
+    if context:
+        context_block = f"""Preceding text (for context only - do NOT include it in your output):
+{context}
+
+"""
+    return f"""{context_block}Transcript:
+{chunk}"""
+
+
+def message_params(chunk: Chunk) -> dict:
+    """Request parameters for one chunk (shared by the live and batch paths)."""
+    return {
+        'model': CLAUDE_MODEL,
+        'max_tokens': MAX_TOKENS,
+        'temperature': TEMPERATURE,
+        'system': [
+            {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+        ],
+        'messages': [
+            {"role": "user", "content": build_prompt(chunk.text, chunk.context)}
+        ],
+    }
+
+
+def system_prompt_cacheable() -> bool:
+    """Whether SYSTEM_PROMPT is long enough for CLAUDE_MODEL to cache it."""
+    from chunker import estimate_tokens
+
+    minimum = next((n for family, n in MIN_CACHEABLE_TOKENS.items() if family in CLAUDE_MODEL),
+                   DEFAULT_MIN_CACHEABLE_TOKENS)
+    return estimate_tokens(SYSTEM_PROMPT) >= minimum
+
+
+class UsageStats:
+    """Token usage summed over every response, including prompt-cache reads and writes."""
+
+    FIELDS = ('input_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens', 'output_tokens')
+
+    def __init__(self):
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+        self.requests = 0
+        self.cache_hits = 0
+        self.lock = threading.Lock()
+
+    def add(self, usage):
+        with self.lock:
+            self.requests += 1
+            for field in self.FIELDS:
+                self.totals[field] += getattr(usage, field, None) or 0
+            if getattr(usage, 'cache_read_input_tokens', None):
+                self.cache_hits += 1
+
+    def summary(self) -> str:
+        t = self.totals
+        prompt = t['input_tokens'] + t['cache_creation_input_tokens'] + t['cache_read_input_tokens']
+        share = t['cache_read_input_tokens'] / prompt if prompt else 0.0
+        return (f"API usage: {self.requests} requests, {self.cache_hits} prompt-cache hits; "
+                f"input {t['input_tokens']} + cache write {t['cache_creation_input_tokens']} + "
+                f"cache read {t['cache_read_input_tokens']} tokens ({share:.0%} read from cache), "
+                f"output {t['output_tokens']} tokens")
+
+
+def _retry_delay(error, attempt: int, base_delay: float) -> Optional[float]:
+    """
+    Seconds to wait before retrying after `error`, or None if not retryable.
+
+    Uses the server's retry-after header when present, otherwise exponential
+    backoff with jitter.
+    """
+    import anthropic
+
+    if isinstance(error, anthropic.APIStatusError):
+        if error.status_code not in RETRY_STATUS:
+            return None
+        retry_after = error.response.headers.get('retry-after') if error.response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    elif not isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return None
+
+    return base_delay * (2 ** attempt) * (0.5 + random.random())
+
+
+def clean_chunk(client, chunk: Chunk, limiter: Optional[TokenBucket] = None,
+                max_retries: int = 5, base_delay: float = 1.0,
+                stats: Optional[UsageStats] = None) -> str:
+    """Send one chunk to Claude, retrying with backoff on 429/5xx and connection errors."""
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            message = client.messages.create(**message_params(chunk))
+            if stats is not None:
+                stats.add(message.usage)
+            return message.content[0].text.strip()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, base_delay)
+            if delay is None or attempt >= max_retries:
+                raise
+            attempt += 1
+            time.sleep(delay)
+
+
+def _completed_chunks(chunks: List[Chunk], cache, journal) -> List[Optional[str]]:
+    """
+    Cleaned text already available for each chunk (None where it must be sent).
+
+    Chunks are taken from the resume journal first, then from the cache;
+    cache hits are recorded in the journal.
+    """
+    completed: List[Optional[str]] = []
+    for i, chunk in enumerate(chunks):
+        if journal is not None and i in journal.done:
+            completed.append(journal.done[i])
+            continue
+        cleaned = None
+        if cache is not None:
+            cleaned = cache.get('claude', CLAUDE_MODEL, CACHE_VERSION, TEMPERATURE, chunk.key)
+            if cleaned is not None and journal is not None:
+                journal.record(i, cleaned)
+        completed.append(cleaned)
+    return completed
+
+
+def _store_chunk(i: int, chunk: Chunk, cleaned: str, cache, journal):
+    """Save a freshly cleaned chunk to the cache and the resume journal."""
+    if cache is not None:
+        cache.put('claude', CLAUDE_MODEL, CACHE_VERSION, TEMPERATURE, chunk.key, cleaned)
+    if journal is not None:
+        journal.record(i, cleaned)
+
+
+def clean_with_claude(text: str, api_key: str, concurrency: int = 4,
+                      requests_per_minute: float = 50, base_url: Optional[str] = None,
+                      cache=None, chunk_tokens: int = 1000, overlap_tokens: int = 0,
+                      journal=None) -> str:
     """
     Clean transcription using Claude API.
 
     Args:
         text: Raw transcript text
         api_key: Anthropic API key
+        concurrency: Number of requests in flight at once
+        requests_per_minute: Token-bucket rate limit shared by all workers
+        base_url: Override the API endpoint (e.g. a local stand-in server)
+        cache: llm_cache.ChunkCache; only chunks missing from it are sent
+        chunk_tokens: Target chunk size (see chunker.chunk_text)
+        overlap_tokens: Tokens of the previous chunk passed as context
+        journal: journal.ChunkJournal; finished chunks are recorded and skipped on resume
 
     Returns:
         Cleaned text with proper punctuation and structure
@@ -53,67 +277,111 @@ def clean_with_claude(text: str, api_key: str) -> str:
         print("Error: anthropic package not installed. Run: pip install anthropic")
         sys.exit(1)
 
-    client = anthropic.Anthropic(api_key=api_key)
-
-    # Split into chunks (~4000 chars each to stay well under token limits)
-    lines = text.strip().split('\n')
-    chunks = []
-    current_chunk = []
-    current_length = 0
-
-    for line in lines:
-        line_length = len(line)
-        if current_length + line_length > 4000:
-            if current_chunk:
-                chunks.append('\n'.join(current_chunk))
-            current_chunk = [line]
-            current_length = line_length
-        else:
-            current_chunk.append(line)
-            current_length += line_length
+    # Retries are handled by clean_chunk so they go through the rate limiter
+    client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+    limiter = TokenBucket(requests_per_minute / 60.0, capacity=max(1, concurrency))
 
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
-
-    # Process each chunk
-    cleaned_chunks = []
+    chunks = chunk_text(text, target_tokens=chunk_tokens, overlap_tokens=overlap_tokens)
+    cleaned_chunks = _completed_chunks(chunks, cache, journal)
     total = len(chunks)
+    pending = [i for i, cleaned in enumerate(cleaned_chunks) if cleaned is None]
+
+    print(f"Processing {total} chunks with Claude API (concurrency {concurrency}, {requests_per_minute:g} req/min)...")
+    if len(pending) < total:
+        print(f"  {total - len(pending)} chunks already done (cache or journal)")
+
+    cacheable = system_prompt_cacheable()
+    if not cacheable:
+        print(f"  Note: the system prompt is below {CLAUDE_MODEL}'s minimum cacheable length, "
+              f"so the API will not cache it")
+
+    stats = UsageStats()
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+    def run(indices):
+        futures = {executor.submit(clean_chunk, client, chunks[i], limiter, stats=stats): i
+                   for i in indices}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                cleaned_chunks[i] = future.result()
+                _store_chunk(i, chunks[i], cleaned_chunks[i], cache, journal)
+                print(f"  Chunk {i+1}/{total} ✓")
+            except Exception as e:
+                print(f"  Chunk {i+1}/{total} ✗ (error: {e})")
+                cleaned_chunks[i] = chunks[i].text  # Keep original on error
 
-    print(f"Processing {total} chunks with Claude API...")
-
-    for i, chunk in enumerate(chunks):
-        print(f"  Chunk {i+1}/{total}...", end=' ', flush=True)
-
-        prompt = f"""Clean up this transcript by:
-1. Adding proper punctuation (periods, commas, question marks, etc.)
-2. Adding proper capitalization
-3. Fixing obvious transcription errors (homophones, mishearings)
-4. Organizing into natural paragraphs (add blank lines between paragraphs)
-5. Preserving ALL content - do not summarize or remove anything
+    try:
+        if cacheable and concurrency > 1 and len(pending) > 1:
+            # Parallel requests sent before the cache exists would each write
+            # it; the first chunk goes alone so the rest read it instead
+            run(pending[:1])
+            pending = pending[1:]
+        run(pending)
+    finally:
+        # On Ctrl-C, drop queued chunks instead of waiting for all of them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    if stats.requests:
+        print(stats.summary())
+    return '\n\n'.join(cleaned_chunks)
 
-Return ONLY the cleaned transcript, no explanations or meta-commentary.
 
-Transcript:
-{chunk}"""
+def clean_with_claude_batch(text: str, api_key: str, base_url: Optional[str] = None,
+                            poll_interval: float = 30.0, cache=None,
+                            chunk_tokens: int = 1000, overlap_tokens: int = 0,
+                            journal=None) -> str:
+    """
+    Clean transcription through the Message Batches API.
 
-        try:
-            message = client.messages.create(
-                model="claude-3-5-haiku-20241022",  # Fast, cost-effective
-                max_tokens=8000,
-                temperature=0.3,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-
-            cleaned = message.content[0].text.strip()
-            cleaned_chunks.append(cleaned)
-            print("✓")
+    Submits every chunk in one batch and polls until it has ended. Slower to
+    start than clean_with_claude but suited to large offline jobs.
+    """
+    try:
+        import anthropic
+    except ImportError:
+        print("Error: anthropic package not installed. Run: pip install anthropic")
+        sys.exit(1)
 
-        except Exception as e:
-            print(f"✗ (error: {e})")
-            cleaned_chunks.append(chunk)  # Keep original on error
+    client = anthropic.Anthropic(api_key=api_key, base_url=base_url)
+    chunks = chunk_text(text, target_tokens=chunk_tokens, overlap_tokens=overlap_tokens)
+    cached = _completed_chunks(chunks, cache, journal)
+    pending = [i for i, cleaned in enumerate(cached) if cleaned is None]
+    # Keep original for anything that fails
+    cleaned_chunks = [c if c is not None else chunk.text for c, chunk in zip(cached, chunks)]
+
+    if not pending:
+        print(f"All {len(chunks)} chunks already done (cache or journal)")
+        return '\n\n'.join(cleaned_chunks)
+
+    batch = client.messages.batches.create(requests=[
+        {'custom_id': f"chunk-{i}", 'params': message_params(chunks[i])}
+        for i in pending
+    ])
+    print(f"Submitted batch {batch.id} with {len(pending)} chunks "
+          f"({len(chunks) - len(pending)} already done)")
+
+    while batch.processing_status != 'ended':
+        time.sleep(poll_interval)
+        batch = client.messages.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        print(f"  {batch.processing_status}: {counts.succeeded} succeeded, "
+              f"{counts.errored} errored, {counts.processing} processing")
+
+    stats = UsageStats()
+    for entry in client.messages.batches.results(batch.id):
+        i = int(entry.custom_id.split('-', 1)[1])
+        if entry.result.type == 'succeeded':
+            stats.add(entry.result.message.usage)
+            cleaned_chunks[i] = entry.result.message.content[0].text.strip()
+            _store_chunk(i, chunks[i], cleaned_chunks[i], cache, journal)
+        else:
+            print(f"  Chunk {i+1}/{len(chunks)} ✗ ({entry.result.type})")
 
+    if stats.requests:
+        print(stats.summary())
     return '\n\n'.join(cleaned_chunks)
 
 
@@ -126,8 +394,32 @@ def main():
     parser.add_argument('output', type=str, help='Output markdown file')
     parser.add_argument('--api-key', type=str,
                         help='Anthropic API key (or set ANTHROPIC_API_KEY env var)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Requests in flight at once (default: 4)')
+    parser.add_argument('--rpm', type=float, default=50,
+                        help='Rate limit in requests per minute (default: 50)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Submit all chunks through the Message Batches API')
+    parser.add_argument('--base-url', type=str, default=os.environ.get('ANTHROPIC_BASE_URL'),
+                        help='API base URL (or set ANTHROPIC_BASE_URL env var)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write the cleaned-chunk cache')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run from its journal')
+    parser.add_argument('--chunk-tokens', type=int, default=1000,
+                        help='Target chunk size in tokens (default: 1000)')
+    parser.add_argument('--overlap', type=int, default=0,
+                        help='Tokens of the previous chunk to pass as context (default: 0)')
+    parser.add_argument('--words', action='store_true',
+                        help='Take the text from the word sidecar (.words.jsonl.gz) next to the input')
 
     args = parser.parse_args()
+    if args.rpm <= 0:
+        parser.error("--rpm must be greater than 0")
+    if args.chunk_tokens < 1:
+        parser.error("--chunk-tokens must be at least 1")
+    if args.overlap < 0:
+        parser.error("--overlap must not be negative")
 
     # Get API key
     api_key = args.api_key or os.environ.get('ANTHROPIC_API_KEY')
@@ -149,15 +441,51 @@ def main():
     # Extract frontmatter
     frontmatter, body = extract_frontmatter(content)
 
+    # Clean the recognizer's words instead of the rendered markdown body
+    if args.words:
+        words_path = sidecar_path(input_path)
+        if not words_path.exists():
+            print(f"Error: No word sidecar next to the input: {words_path}")
+            sys.exit(1)
+        body = sidecar_text(words_path)
+
     # Clean
-    cleaned_body = clean_with_claude(body, api_key)
+    cache = None
+    if not args.no_cache:
+        from llm_cache import ChunkCache
+        cache = ChunkCache()
+
+    output_path = Path(args.output)
+    signature = run_signature('mdclean_claude', PROMPT_VERSION, CLAUDE_MODEL, body,
+                              args.chunk_tokens, args.overlap)
+    journal = ChunkJournal(output_path, signature, header=frontmatter + '\n' if frontmatter else '',
+                           resume=args.resume)
+
+    try:
+        if args.batch:
+            cleaned_body = clean_with_claude_batch(body, api_key, base_url=args.base_url, cache=cache,
+                                                   chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap,
+                                                   journal=journal)
+        else:
+            cleaned_body = clean_with_claude(body, api_key, concurrency=args.concurrency,
+                                             requests_per_minute=args.rpm, base_url=args.base_url,
+                                             cache=cache, chunk_tokens=args.chunk_tokens,
+                                             overlap_tokens=args.overlap, journal=journal)
+    except BaseException:
+        journal.close()
+        print(f"\nInterrupted - partial output in {args.output}, rerun with --resume to continue")
+        raise
+    finally:
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
 
     # Recombine
     final_content = frontmatter + '\n' + cleaned_body if frontmatter else cleaned_body
 
     # Write output
-    output_path = Path(args.output)
     output_path.write_text(final_content)
+    journal.finish()
 
     print(f"\n✅ Cleaned transcript saved to: {args.output}")
     print(f"\nStats:")
@@ -12,8 +12,14 @@ Usage:
     # Specify a model explicitly
     python3 mdclean_simple.py input.md output.md --model qwen2.5:0.5b
 
+    # Keep 4 chunks in flight (set OLLAMA_NUM_PARALLEL=4 on the server)
+    python3 mdclean_simple.py input.md output.md --concurrency 4
+
     # List available models
     python3 mdclean_simple.py --list-models
+
+    # Benchmark installed models on this machine (used by auto-selection)
+    python3 mdclean_simple.py --calibrate
 """
 
 import re
@@ -23,6 +29,13 @@ from typing import Tuple, List
 import argparse
 import subprocess
 import json
+import asyncio
+import difflib
+import time
+
+from chunker import Chunk, chunk_text
+from journal import ChunkJournal, run_signature
+from transcript_sidecar import sidecar_path, sidecar_text
 
 
 def list_ollama_models() -> List[dict]:
@@ -51,16 +64,125 @@ def list_ollama_models() -> List[dict]:
         return []
 
 
-def choose_best_model() -> str:
+# Fixed calibration input and the cleaned text a good model should produce
+CALIBRATION_TRANSCRIPT = (
+    "so today we are going to talk about community and why it matters "
+    "i think most of us have felt lonely at some point in our lives "
+    "what does it mean to belong to a group of people who know you "
+    "my grandmother used to say that a meal shared is a meal doubled"
+)
+CALIBRATION_REFERENCE = (
+    "So today we are going to talk about community and why it matters. "
+    "I think most of us have felt lonely at some point in our lives. "
+    "What does it mean to belong to a group of people who know you? "
+    "My grandmother used to say that a meal shared is a meal doubled."
+)
+
+DEFAULT_MIN_QUALITY = 0.8
+
+
+def _quality_score(output: str, reference: str = CALIBRATION_REFERENCE) -> float:
+    """
+    Score output against the reference, 0-1.
+
+    Half of the score is content preservation (same words in the same order),
+    half is formatting (sentence punctuation and capitalized words), so an
+    unchanged transcript scores about 0.5 and a hallucinated one near 0.
+    """
+    def ratio(a, b):
+        return difflib.SequenceMatcher(None, a, b).ratio() if a or b else 1.0
+
+    words = lambda t: re.findall(r"[\w']+", t.lower())
+    marks = lambda t: [tok for tok in re.findall(r"[\w']+|[.,?!]", t) if not tok[0].islower() and not tok[0].isdigit()]
+    return 0.5 * ratio(words(reference), words(output)) + 0.5 * ratio(marks(reference), marks(output))
+
+
+def calibrate_model(name: str) -> dict:
+    """
+    Benchmark one model through the local Ollama API.
+
+    Runs the fixed calibration prompt from a cold start and returns
+    tokens_per_sec, load_seconds, memory_bytes and quality.
+    """
+    import ollama
+
+    # Unload first so load time is measured from cold
+    ollama.generate(model=name, prompt='', keep_alive=0)
+
+    response = ollama.generate(
+        model=name,
+        prompt=build_prompt(CALIBRATION_TRANSCRIPT),
+        options={'temperature': 0.0, 'num_predict': 256},
+        keep_alive='30s',
+    )
+
+    memory = 0
+    for running in ollama.ps()['models']:
+        if running['model'] == name or running.get('name') == name:
+            memory = running['size']
+
+    # Free the memory before the next model is loaded
+    ollama.generate(model=name, prompt='', keep_alive=0)
+
+    eval_seconds = (response['eval_duration'] or 0) / 1e9
+    return {
+        'tokens_per_sec': (response['eval_count'] or 0) / eval_seconds if eval_seconds else 0.0,
+        'load_seconds': (response['load_duration'] or 0) / 1e9,
+        'memory_bytes': memory,
+        'quality': round(_quality_score(response['response']), 3),
+    }
+
+
+def calibrate_models() -> dict:
+    """Calibrate every installed model and store the results for this host."""
+    from calibration import save_result
+
+    results = {}
+    models = list_ollama_models()
+    print(f"Calibrating {len(models)} models (one short prompt each)...")
+    for model in models:
+        name = model['name']
+        print(f"  {name:<25}", end=' ', flush=True)
+        try:
+            result = calibrate_model(name)
+        except Exception as e:
+            print(f"✗ (error: {e})")
+            continue
+        save_result('ollama', name, result)
+        results[name] = result
+        print(f"{result['tokens_per_sec']:6.1f} tok/s, load {result['load_seconds']:.1f}s, "
+              f"{result['memory_bytes'] / 1e9:.2f} GB, quality {result['quality']:.2f}")
+    return results
+
+
+def choose_best_model(min_quality: float = DEFAULT_MIN_QUALITY) -> str:
     """
     Choose the best available model for current system.
-    Prioritizes smaller models for 8GB RAM systems.
+
+    Uses calibration results for this host when available: the fastest
+    installed model whose quality score meets min_quality. Otherwise
+    prioritizes smaller models for 8GB RAM systems.
     """
     models = list_ollama_models()
     if not models:
         print("Error: No Ollama models found. Run: ollama pull qwen2.5:0.5b")
         sys.exit(1)
 
+    from calibration import load_section
+
+    calibrated = load_section('ollama')
+    installed = {m['name'] for m in models}
+    candidates = [
+        (result['tokens_per_sec'], name) for name, result in calibrated.items()
+        if name in installed and result.get('quality', 0) >= min_quality
+    ]
+    if candidates:
+        return max(candidates)[1]
+    if calibrated:
+        print(f"Warning: no calibrated model reaches quality {min_quality}; falling back to smallest model")
+    else:
+        print("Tip: run with --calibrate to pick models by measured speed")
+
     # Prioritize by size (smaller = better for RAM-constrained systems)
     size_priority = {
         'MB': 0,  # Prefer MB models
@@ -95,12 +217,147 @@ def extract_frontmatter(content: str) -> Tuple[str, str]:
     return frontmatter, body
 
 
-def clean_with_ollama(text: str, model: str = 'qwen2.5-coder:3b') -> str:
+# Bump when build_prompt changes so cached chunks are not reused
+PROMPT_VERSION = "1"
+# The tools share backends but not prompts, so cache entries carry the tool name
+CACHE_VERSION = f"mdclean_simple:{PROMPT_VERSION}"
+
+
+def build_prompt(chunk: str, context: str = '') -> str:
+    """Build the cleaning prompt for one chunk (context is the end of the previous chunk)."""
+    context_block = ''
+    if context:
+        context_block = f"""Preceding text (for context only - do NOT include it in your output):
+{context}
+
+"""
+    return f"""Clean up this transcript by:
+1. Adding proper punctuation (periods, commas, question marks, etc.)
+2. Adding proper capitalization
+3. Fixing obvious transcription errors
+4. Organizing into natural paragraphs (add blank lines between paragraphs)
+5. DO NOT summarize or remove content - preserve everything
+
+{context_block}Transcript:
+{chunk}
+
+Cleaned version:"""
+
+
+OLLAMA_OPTIONS = {
+    'temperature': 0.2,  # Low for consistency
+    'num_predict': 4096,  # Allow longer output
+}
+
+
+async def _stream_chunk(client, model: str, chunk: Chunk, keep_alive: str) -> Tuple[str, dict]:
+    """
+    Stream one chunk through Ollama.
+
+    Returns (cleaned text, stats) where stats has ttft (seconds to first token),
+    tokens and tokens_per_sec.
+    """
+    start = time.perf_counter()
+    first_token = None
+    pieces = []
+    final = {}
+
+    stream = await client.generate(
+        model=model,
+        prompt=build_prompt(chunk.text, chunk.context),
+        options=OLLAMA_OPTIONS,
+        keep_alive=keep_alive,
+        stream=True,
+    )
+    async for part in stream:
+        if part.get('response'):
+            if first_token is None:
+                first_token = time.perf_counter()
+            pieces.append(part['response'])
+        if part.get('done'):
+            final = part
+
+    elapsed = time.perf_counter() - start
+    ttft = (first_token - start) if first_token is not None else elapsed
+
+    # Prefer Ollama's own generation counters; fall back to streamed pieces
+    tokens = final.get('eval_count') or len(pieces)
+    eval_seconds = (final.get('eval_duration') or 0) / 1e9
+    if not eval_seconds:
+        eval_seconds = max(elapsed - ttft, 1e-9)
+
+    return ''.join(pieces).strip(), {
+        'ttft': ttft,
+        'tokens': tokens,
+        'tokens_per_sec': tokens / eval_seconds if eval_seconds else 0.0,
+    }
+
+
+async def _clean_chunks_async(chunks: List[Chunk], model: str, concurrency: int, keep_alive: str,
+                              cache=None, journal=None) -> List[str]:
+    """Clean chunks with at most `concurrency` requests in flight, preserving order."""
+    import ollama
+
+    client = ollama.AsyncClient()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(chunks)
+    results: List[str] = [''] * total
+
+    async def worker(i: int, chunk: Chunk):
+        if journal is not None and i in journal.done:
+            results[i] = journal.done[i]
+            return
+
+        if cache is not None:
+            cached = cache.get('ollama', model, CACHE_VERSION, OLLAMA_OPTIONS['temperature'], chunk.key)
+            if cached is not None:
+                results[i] = cached
+                if journal is not None:
+                    journal.record(i, cached)
+                print(f"  Chunk {i+1}/{total} ✓ (cached)")
+                return
+
+        async with semaphore:
+            try:
+                cleaned, stats = await _stream_chunk(client, model, chunk, keep_alive)
+                results[i] = cleaned
+                if journal is not None:
+                    journal.record(i, cleaned)
+                if cache is not None:
+                    cache.put('ollama', model, CACHE_VERSION, OLLAMA_OPTIONS['temperature'], chunk.key, cleaned)
+                print(f"  Chunk {i+1}/{total} ✓ "
+                      f"(ttft {stats['ttft']:.2f}s, {stats['tokens']} tokens, "
+                      f"{stats['tokens_per_sec']:.1f} tok/s)")
+            except Exception as e:
+                print(f"  Chunk {i+1}/{total} ✗ (error: {e})")
+                results[i] = chunk.text  # Keep original on error
+
+    await asyncio.gather(*(worker(i, chunk) for i, chunk in enumerate(chunks)))
+    return results
+
+
+def clean_with_ollama(text: str, model: str = 'qwen2.5-coder:3b',
+                      concurrency: int = 2, keep_alive: str = '10m', cache=None,
+                      chunk_tokens: int = 500, overlap_tokens: int = 0, journal=None) -> str:
     """
     Clean transcription using Ollama.
 
     Uses qwen2.5-coder:3b by default (already installed).
     Can switch to llama3.2:3b when download completes.
+
+    Chunks are streamed with up to `concurrency` requests in flight (the Ollama
+    server must allow it, see OLLAMA_NUM_PARALLEL). keep_alive keeps the model
+    loaded between requests. Output is reassembled in the original chunk order.
+
+    If cache (an llm_cache.ChunkCache) is given, unchanged chunks are served
+    from it and only new or changed chunks are sent to Ollama.
+
+    Text is split by chunker.chunk_text into ~chunk_tokens pieces at sentence
+    or line boundaries; overlap_tokens of the previous chunk are passed along
+    as read-only context.
+
+    If journal (a journal.ChunkJournal) is given, completed chunks are
+    recorded as they finish and chunks already in it are skipped.
     """
     try:
         import ollama
@@ -109,63 +366,13 @@ def clean_with_ollama(text: str, model: str = 'qwen2.5-coder:3b') -> str:
         sys.exit(1)
 
     # Split into chunks (avoid token limits)
-    lines = text.strip().split('\n')
-    chunks = []
-    current_chunk = []
-    current_length = 0
-
-    for line in lines:
-        line_length = len(line)
-        if current_length + line_length > 2000:  # ~500 tokens
-            if current_chunk:
-                chunks.append('\n'.join(current_chunk))
-            current_chunk = [line]
-            current_length = line_length
-        else:
-            current_chunk.append(line)
-            current_length += line_length
-
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
-
-    # Process each chunk
-    cleaned_chunks = []
-    total = len(chunks)
+    chunks = chunk_text(text, target_tokens=chunk_tokens, overlap_tokens=overlap_tokens)
 
-    print(f"Processing {total} chunks with Ollama ({model})...")
+    print(f"Processing {len(chunks)} chunks with Ollama ({model}, concurrency {concurrency})...")
 
-    for i, chunk in enumerate(chunks):
-        print(f"  Chunk {i+1}/{total}...", end=' ', flush=True)
-
-        prompt = f"""Clean up this transcript by:
-1. Adding proper punctuation (periods, commas, question marks, etc.)
-2. Adding proper capitalization
-3. Fixing obvious transcription errors
-4. Organizing into natural paragraphs (add blank lines between paragraphs)
-5. DO NOT summarize or remove content - preserve everything
-
-Transcript:
-{chunk}
-
-Cleaned version:"""
-
-        try:
-            response = ollama.generate(
-                model=model,
-                prompt=prompt,
-                options={
-                    'temperature': 0.2,  # Low for consistency
-                    'num_predict': 4096,  # Allow longer output
-                }
-            )
-
-            cleaned = response['response'].strip()
-            cleaned_chunks.append(cleaned)
-            print("✓")
-
-        except Exception as e:
-            print(f"✗ (error: {e})")
-            cleaned_chunks.append(chunk)  # Keep original on error
+    start = time.perf_counter()
+    cleaned_chunks = asyncio.run(_clean_chunks_async(chunks, model, concurrency, keep_alive, cache, journal))
+    print(f"Done in {time.perf_counter() - start:.1f}s")
 
     return '\n\n'.join(cleaned_chunks)
 
@@ -181,8 +388,37 @@ def main():
                         help='Ollama model to use (auto-selects best if not specified)')
     parser.add_argument('--list-models', action='store_true',
                         help='List available Ollama models and exit')
+    parser.add_argument('--calibrate', action='store_true',
+                        help='Benchmark installed models on this host and exit')
+    parser.add_argument('--min-quality', type=float, default=DEFAULT_MIN_QUALITY,
+                        help=f'Quality floor (0-1) for auto-selection (default: {DEFAULT_MIN_QUALITY})')
+    parser.add_argument('--concurrency', type=int, default=2,
+                        help='Chunks to keep in flight at once (default: 2)')
+    parser.add_argument('--keep-alive', type=str, default='10m',
+                        help='How long Ollama keeps the model loaded between requests (default: 10m)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write the cleaned-chunk cache')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run from its journal')
+    parser.add_argument('--chunk-tokens', type=int, default=500,
+                        help='Target chunk size in tokens (default: 500)')
+    parser.add_argument('--overlap', type=int, default=0,
+                        help='Tokens of the previous chunk to pass as context (default: 0)')
+    parser.add_argument('--words', action='store_true',
+                        help='Take the text from the word sidecar (.words.jsonl.gz) next to the input')
 
     args = parser.parse_args()
+    if args.chunk_tokens < 1:
+        parser.error("--chunk-tokens must be at least 1")
+    if args.overlap < 0:
+        parser.error("--overlap must not be negative")
+
+    # Handle --calibrate
+    if args.calibrate:
+        if not calibrate_models():
+            sys.exit(1)
+        print(f"\nBest choice: {choose_best_model(args.min_quality)}")
+        sys.exit(0)
 
     # Handle --list-models
     if args.list_models:
@@ -192,25 +428,32 @@ def main():
             print("Download a model with: ollama pull qwen2.5:0.5b")
             sys.exit(1)
 
+        from calibration import load_section
+        calibrated = load_section('ollama')
+
         print("\nAvailable Ollama models:")
-        print("-" * 50)
+        print("-" * 70)
         for model in models:
-            print(f"  {model['name']:<25} {model['size']}")
-        print("-" * 50)
+            result = calibrated.get(model['name'])
+            measured = ''
+            if result:
+                measured = f"{result['tokens_per_sec']:6.1f} tok/s  quality {result['quality']:.2f}"
+            print(f"  {model['name']:<25} {model['size']:<10} {measured}")
+        print("-" * 70)
         print(f"\nRecommended for 8GB RAM: Models under 500MB")
-        print(f"Best choice: {choose_best_model()}")
+        print(f"Best choice: {choose_best_model(args.min_quality)}")
         sys.exit(0)
 
     # Validate required arguments
     if not args.input or not args.output:
-        parser.error("input and output are required (unless using --list-models)")
+        parser.error("input and output are required (unless using --list-models or --calibrate)")
 
     # Choose model
     if args.model:
         model = args.model
         print(f"Using specified model: {model}")
     else:
-        model = choose_best_model()
+        model = choose_best_model(args.min_quality)
         print(f"Auto-selected model: {model}")
 
     # Read input
@@ -225,15 +468,46 @@ def main():
     # Extract frontmatter
     frontmatter, body = extract_frontmatter(content)
 
+    # Clean the recognizer's words instead of the rendered markdown body
+    if args.words:
+        words_path = sidecar_path(input_path)
+        if not words_path.exists():
+            print(f"Error: No word sidecar next to the input: {words_path}")
+            sys.exit(1)
+        body = sidecar_text(words_path)
+
     # Clean
-    cleaned_body = clean_with_ollama(body, model=model)
+    cache = None
+    if not args.no_cache:
+        from llm_cache import ChunkCache
+        cache = ChunkCache()
+
+    output_path = Path(args.output)
+    signature = run_signature('mdclean_simple', PROMPT_VERSION, model, body,
+                              args.chunk_tokens, args.overlap)
+    journal = ChunkJournal(output_path, signature, header=frontmatter + '\n' if frontmatter else '',
+                           resume=args.resume)
+
+    try:
+        cleaned_body = clean_with_ollama(body, model=model, concurrency=args.concurrency,
+                                         keep_alive=args.keep_alive, cache=cache,
+                                         chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap,
+                                         journal=journal)
+    except BaseException:
+        journal.close()
+        print(f"\nInterrupted - partial output in {args.output}, rerun with --resume to continue")
+        raise
+    finally:
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
 
     # Recombine
     final_content = frontmatter + '\n' + cleaned_body if frontmatter else cleaned_body
 
     # Write output
-    output_path = Path(args.output)
     output_path.write_text(final_content)
+    journal.finish()
 
     print(f"\n✅ Cleaned transcript saved to: {args.output}")
     print(f"\nStats:")
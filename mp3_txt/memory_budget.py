@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+memory_budget - Admit batch jobs only while they fit in a memory budget
+
+Memory, not CPU, is what limits us on 8GB machines: four large-model jobs
+started by `batch --concurrency 4` push the system into swap. The governor
+estimates each job's footprint before it starts:
+
+  - model weights (Whisper size tier, or the Vosk model directory size)
+  - decoded PCM (one window when Whisper streams, else the whole file as
+    float32 at 16 kHz)
+  - segment/word lists (proportional to duration)
+
+A job is admitted while the process RSS (or the sum of running estimates,
+whichever is larger) plus its estimate stays under the budget and the system
+still has that much memory available. Otherwise it waits for running jobs to
+finish (backpressure). A Whisper job that cannot fit even with nothing else
+running drops to the next smaller model tier.
+
+Usage:
+    governor = MemoryGovernor(parse_size("6G"))
+    model_size = governor.acquire(job_id, "whisper", "medium", duration)
+    try:
+        ...transcribe with model_size...
+    finally:
+        governor.release(job_id)
+"""
+
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+# Approximate resident size of faster-whisper models on CPU with int8 weights (MB)
+WHISPER_MODEL_MB = {
+    'tiny': 150,
+    'base': 250,
+    'small': 600,
+    'medium': 1500,
+    'large': 3000,
+    'large-v2': 3000,
+    'large-v3': 3000,
+}
+WHISPER_TIERS = ['large', 'medium', 'small', 'base', 'tiny']
+# Hosts calibrated to float32 weights (`transcribe_enhanced.py calibrate`) hold larger models
+WHISPER_COMPUTE_FACTOR = {'int8': 1.0, 'int8_float32': 1.0, 'float16': 1.6, 'float32': 2.5}
+
+# Vosk loads roughly its on-disk size into memory, plus decoder state
+VOSK_OVERHEAD = 1.2
+VOSK_DEFAULT_MB = 3000  # vosk-model-en-us-0.22 when the directory cannot be measured
+
+# Whisper: float32 PCM at 16 kHz (64 KB/s) plus mel features and decoder buffers
+WHISPER_MB_PER_SECOND = 0.15
+# Word dicts with timings (~2.5 words/s at a few hundred bytes each)
+SEGMENTS_MB_PER_SECOND = 0.002
+# Interpreter, ffmpeg pipes and everything else per job
+JOB_OVERHEAD_MB = 100
+
+# Keep this much memory free for the rest of the system
+SYSTEM_RESERVE_MB = 512
+
+POLL_SECONDS = 1.0
+
+
+def parse_size(value: str) -> float:
+    """Parse '6G', '4096M', '512MB' or a plain number of MB into MB."""
+    text = value.strip().upper().rstrip('B')
+    units = {'K': 1 / 1024, 'M': 1, 'G': 1024, 'T': 1024 * 1024}
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def audio_duration(path: Path) -> float:
+    """Duration in seconds from ffprobe (0.0 if unknown)."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", str(path)],
+            capture_output=True, text=True,
+        )
+        return float(json.loads(result.stdout)['format']['duration'])
+    except Exception:
+        return 0.0
+
+
+def _dir_size_mb(path: Path) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def _whisper_compute_type(model: str) -> str:
+    from calibration import load_section
+    return load_section('whisper').get(model, {}).get('compute_type', 'int8')
+
+
+def estimate_job_mb(engine: str, model: Optional[str], duration: float, window_seconds: float = 0.0) -> float:
+    """
+    Estimated peak memory (MB) of transcribing `duration` seconds with engine/model.
+
+    window_seconds is the Whisper streaming window (0 = whole file decoded at once).
+    """
+    if engine == 'whisper':
+        model_mb = WHISPER_MODEL_MB.get(model or 'base', WHISPER_MODEL_MB['large']) \
+            * WHISPER_COMPUTE_FACTOR.get(_whisper_compute_type(model or 'base'), 1.0)
+        buffered = min(duration, window_seconds) if window_seconds else duration
+        buffers_mb = buffered * WHISPER_MB_PER_SECOND
+    elif engine == 'hybrid':
+        # Default Vosk model plus Whisper (model) on short spans
+        vosk_path = Path.home() / ".cache" / "vosk-model-en-us-0.22"
+        model_mb = (_dir_size_mb(vosk_path) * VOSK_OVERHEAD if vosk_path.exists() else VOSK_DEFAULT_MB) \
+            + WHISPER_MODEL_MB.get(model or 'small', WHISPER_MODEL_MB['large'])
+        buffers_mb = 0.0
+    else:
+        model_path = Path(model) if model else Path.home() / ".cache" / "vosk-model-en-us-0.22"
+        model_mb = _dir_size_mb(model_path) * VOSK_OVERHEAD if model_path.exists() else VOSK_DEFAULT_MB
+        buffers_mb = 0.0  # Vosk streams PCM in 0.25s chunks
+    return model_mb + buffers_mb + duration * SEGMENTS_MB_PER_SECOND + JOB_OVERHEAD_MB
+
+
+def smaller_tier(model: str) -> Optional[str]:
+    """Next smaller Whisper size, or None at the bottom (or for unknown models)."""
+    base = 'large' if model.startswith('large') else model
+    if base not in WHISPER_TIERS:
+        return None
+    i = WHISPER_TIERS.index(base)
+    return WHISPER_TIERS[i + 1] if i + 1 < len(WHISPER_TIERS) else None
+
+
+def process_rss_mb() -> float:
+    """Resident memory of this process in MB (0.0 if it cannot be read)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def available_mb() -> Optional[float]:
+    """Memory the system can hand out without swapping, in MB (None if unknown)."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemoryGovernor:
+    """Gate job starts on a memory budget shared by all worker threads."""
+
+    def __init__(self, budget_mb: float, log=print):
+        self.budget_mb = budget_mb
+        self.log = log
+        self.running: Dict[str, float] = {}
+        self.baseline_mb = process_rss_mb()  # Interpreter and libraries before any job
+        self.cond = threading.Condition()
+
+    def _used_mb(self) -> float:
+        # Reservations cover jobs that have started but not yet grown; RSS
+        # catches jobs that outgrew their estimate. With nothing running, RSS
+        # may still hold freed memory the allocator has not returned, so it
+        # is not counted.
+        reserved = self.baseline_mb + sum(self.running.values())
+        return max(process_rss_mb(), reserved) if self.running else reserved
+
+    def _fits(self, estimate_mb: float) -> bool:
+        if self._used_mb() + estimate_mb > self.budget_mb:
+            return False
+        available = available_mb()
+        return available is None or available - estimate_mb >= SYSTEM_RESERVE_MB
+
+    def acquire(self, job_id: str, engine: str, model: Optional[str], duration: float,
+                window_seconds: float = 0.0) -> Optional[str]:
+        """
+        Block until the job fits, then reserve its estimate.
+
+        Returns the model to use, which for Whisper may be a smaller tier than
+        requested if the job could not fit even on an otherwise idle worker.
+        """
+        with self.cond:
+            while True:
+                estimate = estimate_job_mb(engine, model, duration, window_seconds)
+                if self._fits(estimate):
+                    break
+                if not self.running:
+                    # Nothing to wait for: shrink the model, or run anyway
+                    smaller = smaller_tier(model or 'base') if engine in ('whisper', 'hybrid') else None
+                    if smaller is None:
+                        self.log(f"Warning: {job_id} needs ~{estimate:.0f} MB, over the "
+                                 f"{self.budget_mb:.0f} MB budget; running it alone")
+                        break
+                    self.log(f"{job_id}: Whisper {model or 'base'} (~{estimate:.0f} MB) does not fit, "
+                             f"dropping to {smaller}")
+                    model = smaller
+                    continue
+                self.cond.wait(timeout=POLL_SECONDS)
+
+            self.running[job_id] = estimate
+            return model
+
+    def release(self, job_id: str):
+        """Return a finished job's reservation and wake waiting jobs."""
+        with self.cond:
+            self.running.pop(job_id, None)
+            self.cond.notify_all()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+punctuate - Fast rule-based punctuation and casing for raw transcripts
+
+A deterministic, CPU-only alternative to LLM cleaning. Restores sentence
+boundaries, capitalization and common punctuation from:
+
+  - Pauses between words (when Vosk word timings are available):
+    long gap -> sentence end, short gap -> comma, very long gap -> paragraph
+  - Discourse markers that usually open a sentence in speech
+    ("so", "now", "okay", "well", ...)
+  - Question openers ("what", "why", "do you", ...) -> question mark
+  - Casing rules for "I", sentence starts and common proper nouns
+
+Runs in linear time with no model to load, so a full transcript takes
+milliseconds. It will not fix misrecognized words; use the LLM modes for that.
+
+Usage:
+    from punctuate import punctuate_text, punctuate_words
+    punctuate_text("so today we are going to talk about grace what is grace")
+    punctuate_words(vosk_words)   # list of {word, start, end}
+"""
+
+import re
+from typing import List, Optional
+
+# Pause thresholds in seconds
+COMMA_PAUSE = 0.35
+SENTENCE_PAUSE = 0.7
+PARAGRAPH_PAUSE = 2.0
+
+MIN_SENTENCE_WORDS = 3
+MAX_SENTENCE_WORDS = 25
+PARAGRAPH_SENTENCES = 5
+
+# Words that open a new sentence once the current one has at least this many words
+SENTENCE_STARTERS = {
+    'so': 6, 'now': 8, 'well': 8, 'okay': 4, 'ok': 4, 'alright': 4,
+    'anyway': 4, 'but': 12, 'and': 20, 'then': 15,
+    'what': 8, 'why': 8, 'how': 8,
+}
+# Previous words that mean the starter is not opening a sentence
+STARTER_BLOCKED_AFTER = {
+    'as', 'very', 'pretty', 'not', 'just', 'and', 'or', 'think', 'even', 'is', 'was',
+    'do', 'did', 'right', 'until', 'by', 'than', 'know', 'about', 'of', 'see', 'tell',
+    'that', 'matter', 'for', 'exactly', 'understand', 'wonder', 'ask', 'asked', 'show',
+    'learn', 'remember', 'believe', 'mean', 'care', 'decide', 'from', 'on', 'to',
+}
+# Next words that mean the starter is not opening a sentence
+STARTER_BLOCKED_BEFORE = {
+    'so': {'much', 'many', 'that', 'far', 'long', 'good', 'well', 'to'},
+    'now': {'that', 'on'},
+    'well': {'being', 'known'},
+    'then': {'again'},
+}
+
+# Subjects that may open a new sentence when the current one is overlong
+SUBJECTS = {'i', 'we', 'you', 'they', 'he', 'she', 'it\'s', 'there\'s', 'this', 'that\'s', 'there'}
+
+INTRO_WORDS = {'well', 'okay', 'ok', 'yes', 'yeah', 'no', 'alright', 'now', 'anyway'}
+
+QUESTION_OPENERS = {
+    'what', 'why', 'how', 'who', 'where', 'which', 'whose',
+    'do', 'does', 'did', 'can', 'could', 'would', 'will', 'should', 'shall',
+    'is', 'are', 'was', 'were', "isn't", "aren't", "don't", "doesn't", "didn't",
+    "can't", "won't", "wouldn't", 'have', 'has',
+}
+
+PROPER_NOUNS = {
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+    'january', 'february', 'march', 'april', 'june', 'july', 'august',
+    'september', 'october', 'november', 'december',
+    'god', 'jesus', 'christ', 'lord', 'bible', 'christian', 'christians',
+    'english', 'america', 'american', 'africa', 'african', 'afrikaans',
+}
+
+_TIMESTAMP_LINE = re.compile(r'^(\*\*\([^)]*\)\*\*\s*|\[[0-9:.]+\]\s*)(.*)$')
+_TIME_RANGE = re.compile(r'^\*\*\((?P<start>[0-9:.]+)\s*-\s*(?P<end>[0-9:.]+)\)\*\*')
+_END_PUNCT = ('.', '?', '!')
+
+
+def _case_word(word: str) -> str:
+    lw = word.lower()
+    if lw == 'i' or lw.startswith("i'"):
+        return 'I' + word[1:]
+    if lw.strip(',') in PROPER_NOUNS:
+        return word[:1].upper() + word[1:]
+    return word
+
+
+def _format_sentence(words: List[str]) -> str:
+    """Apply casing, internal commas and end punctuation to one sentence."""
+    words = [_case_word(w) for w in words]
+    first = words[0].lower().rstrip(',')
+
+    if len(words) > 1 and first in INTRO_WORDS and not words[0].endswith(','):
+        words[0] += ','
+    for i in range(3, len(words)):
+        if words[i].lower() == 'but' and not words[i - 1].endswith(','):
+            words[i - 1] += ','
+
+    words[0] = words[0][:1].upper() + words[0][1:]
+    if words[-1].endswith(','):
+        words[-1] = words[-1][:-1]
+    if not words[-1].endswith(_END_PUNCT):
+        question = first in QUESTION_OPENERS and len(words) <= 20
+        words[-1] += '?' if question else '.'
+    return ' '.join(words)
+
+
+def _opens_sentence(words: List[str], i: int, current: List[str]) -> bool:
+    """True if words[i] should start a new sentence."""
+    lw = words[i].lower()
+    prev = current[-1].lower().rstrip(',') if current else ''
+    nxt = words[i + 1].lower() if i + 1 < len(words) else ''
+
+    min_words = SENTENCE_STARTERS.get(lw)
+    if min_words is not None and len(current) >= min_words:
+        if prev not in STARTER_BLOCKED_AFTER and nxt not in STARTER_BLOCKED_BEFORE.get(lw, ()):
+            return True
+    if lw in SUBJECTS:
+        if len(current) >= MAX_SENTENCE_WORDS:
+            return True
+        # "what is grace | i think ..." - a new subject ends a short wh-question
+        if (len(current) >= 3 and current[0].lower() in ('what', 'why', 'how', 'who', 'where')
+                and prev not in STARTER_BLOCKED_AFTER):
+            return True
+    return False
+
+
+def punctuate_tokens(words: List[str], pauses: Optional[List[Optional[float]]] = None) -> List[str]:
+    """
+    Punctuate a word sequence.
+
+    Args:
+        words: words in order (raw Vosk output is lowercase with no punctuation)
+        pauses: optional silence after each word in seconds (None where unknown)
+
+    Returns list of paragraphs.
+    """
+    paragraphs = []
+    sentences = []
+    current: List[str] = []
+
+    def close_sentence():
+        nonlocal current
+        if current:
+            sentences.append(_format_sentence(current))
+            current = []
+
+    def close_paragraph():
+        nonlocal sentences
+        close_sentence()
+        if sentences:
+            paragraphs.append(' '.join(sentences))
+            sentences = []
+
+    for i, word in enumerate(words):
+        if current and _opens_sentence(words, i, current):
+            close_sentence()
+            if pauses is None and len(sentences) >= PARAGRAPH_SENTENCES:
+                close_paragraph()
+
+        current.append(word)
+
+        # Existing punctuation (e.g. Whisper output) is kept as a boundary
+        if word.endswith(_END_PUNCT):
+            close_sentence()
+            continue
+
+        pause = pauses[i] if pauses is not None else None
+        if pause is None:
+            continue
+        if pause >= PARAGRAPH_PAUSE:
+            close_paragraph()
+        elif pause >= SENTENCE_PAUSE and len(current) >= MIN_SENTENCE_WORDS:
+            close_sentence()
+        elif pause >= COMMA_PAUSE and len(current) >= 2 and not word.endswith(','):
+            current[-1] = word + ','
+
+    close_paragraph()
+    return paragraphs
+
+
+def punctuate_words(segments: List[dict]) -> str:
+    """Punctuate Vosk/Whisper word dicts ({word, start, end}) using pause lengths."""
+    words = [s['word'] for s in segments if s.get('word')]
+    timed = [s for s in segments if s.get('word')]
+    pauses: List[Optional[float]] = [
+        max(0.0, timed[i + 1]['start'] - timed[i]['end']) for i in range(len(timed) - 1)
+    ]
+    pauses.append(None)
+    return '\n\n'.join(punctuate_tokens(words, pauses))
+
+
+def _punctuate_timed_lines(lines: List[tuple]) -> List[str]:
+    """
+    Punctuate consecutive timestamped lines as one stream, keeping each line's prefix.
+
+    lines are (prefix, words, start, end). The pause after a line is the gap
+    to the next line's start when both carry `**(start - end)**` times;
+    otherwise the line is treated as ending on a sentence pause. A sentence
+    runs on into the next line when the gap between them is short.
+    """
+    words: List[str] = []
+    pauses: List[Optional[float]] = []
+    for i, (_, body, _, end) in enumerate(lines):
+        next_start = lines[i + 1][2] if i + 1 < len(lines) else None
+        pause = SENTENCE_PAUSE
+        if end is not None and next_start is not None:
+            pause = max(0.0, next_start - end)
+        words.extend(body)
+        pauses.extend([None] * (len(body) - 1) + [pause])
+
+    # Punctuation never adds or drops words, so the lines are cut back out by count
+    tokens = ' '.join(punctuate_tokens(words, pauses)).split()
+    out, pos = [], 0
+    for prefix, body, _, _ in lines:
+        out.append(prefix + ' '.join(tokens[pos:pos + len(body)]))
+        pos += len(body)
+    return out
+
+
+def punctuate_text(text: str) -> str:
+    """
+    Punctuate a markdown transcript body without word timings.
+
+    Timestamped lines (as written by the transcribers) keep their prefix;
+    the gap between one `**(start - end)**` line's end and the next line's
+    start is the pause after its last word, and lines without an end time
+    are treated as ending on a pause. Untimestamped text is treated as one
+    stream (window line breaks are not real pauses) and re-paragraphed.
+    Headings and list items pass through unchanged.
+    """
+    from structure import parse_timestamp
+
+    out = []
+    stream: List[str] = []
+    timed: List[tuple] = []
+
+    def flush():
+        if stream:
+            out.extend(punctuate_tokens(stream))
+            stream.clear()
+        if timed:
+            out.extend(_punctuate_timed_lines(timed))
+            timed.clear()
+
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith('#') or stripped.startswith('- ') or stripped.startswith('*('):
+            flush()
+            out.append(stripped)
+            continue
+        match = _TIMESTAMP_LINE.match(stripped)
+        if match:
+            if stream:
+                flush()
+            prefix, body = match.groups()
+            words = body.split()
+            if words:
+                times = _TIME_RANGE.match(stripped)
+                start, end = ((parse_timestamp(times.group('start')), parse_timestamp(times.group('end')))
+                              if times else (None, None))
+                timed.append((prefix, words, start, end))
+            else:
+                flush()
+                out.append(stripped)
+            continue
+        if timed:
+            flush()
+        stream.extend(stripped.split())
+
+    flush()
+    return '\n\n'.join(out)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+structure - Lightweight paragraph, heading and list segmenter
+
+Built-in replacement for unstructured.partition.text in mdclean's fast mode.
+Returns elements with the same shape mdclean uses from Unstructured (a
+`category` of Title, ListItem or NarrativeText and str() giving the text) but
+imports nothing heavy and runs in milliseconds.
+
+When the transcript has timestamps, the silence between one window's end and
+the next window's start is recorded as pause_before so callers can start a new
+paragraph on long pauses.
+
+Usage:
+    from structure import partition_text
+    for elem in partition_text(text):
+        print(elem.category, str(elem))
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Silence (seconds) between timestamp windows that starts a new paragraph
+PARAGRAPH_PAUSE = 3.0
+
+TITLE_MAX_WORDS = 10
+
+_LIST_ITEM = re.compile(r'^\s*(?:[-*•●▪–]|\d{1,3}[.)]|[a-zA-Z][.)])\s+(.*)$')
+_HEADING = re.compile(r'^\s*#{1,6}\s+(.*)$')
+_TIMESTAMP = re.compile(r'^\*\*\((?P<start>[0-9:.]+)\s*-\s*(?P<end>[0-9:.]+)\)\*\*')
+_BRACKET_TIMESTAMP = re.compile(r'^\[(?P<start>[0-9:.]+)\]')
+
+
+@dataclass
+class Element:
+    """One structural element (mirrors the parts of unstructured's Element mdclean uses)."""
+    category: str
+    text: str
+    pause_before: float = 0.0
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def parse_timestamp(value: str) -> float:
+    """Parse HH:MM:SS.mmm / MM:SS.mmm into seconds."""
+    seconds = 0.0
+    for part in value.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _is_title(text: str) -> bool:
+    """Short, capitalized line without sentence punctuation."""
+    words = text.split()
+    if not words or len(words) > TITLE_MAX_WORDS:
+        return False
+    if text[-1] in '.,;:!?"\'':
+        return False
+    if not any(c.isalpha() for c in text):
+        return False
+    return text[0].isupper()
+
+
+def partition_text(text: str, paragraph_pause: float = PARAGRAPH_PAUSE) -> List[Element]:
+    """
+    Split text into Title, ListItem and NarrativeText elements.
+
+    Paragraphs are separated by blank lines; each line of a list or a
+    timestamped transcript is its own element.
+    """
+    elements = []
+    last_end: Optional[float] = None
+
+    for paragraph in re.split(r'\n\s*\n', text):
+        lines = [line.strip() for line in paragraph.split('\n') if line.strip()]
+        if not lines:
+            continue
+
+        # Lines that are individually structured (list items, headings, timestamps)
+        # become separate elements; plain wrapped lines are joined
+        if all(_LIST_ITEM.match(l) or _HEADING.match(l) or _TIMESTAMP.match(l) or _BRACKET_TIMESTAMP.match(l)
+               for l in lines):
+            units = lines
+        else:
+            units = [' '.join(lines)]
+
+        for unit in units:
+            pause = 0.0
+            ts = _TIMESTAMP.match(unit)
+            if ts:
+                start = parse_timestamp(ts.group('start'))
+                if last_end is not None:
+                    pause = max(0.0, start - last_end)
+                last_end = parse_timestamp(ts.group('end'))
+            else:
+                # [HH:MM:SS] windows carry no end time, so no pause is known
+                ts = _BRACKET_TIMESTAMP.match(unit)
+
+            heading = _HEADING.match(unit)
+            list_item = _LIST_ITEM.match(unit)
+            if heading:
+                elements.append(Element('Title', heading.group(1).strip(), pause))
+            elif list_item and not ts:
+                elements.append(Element('ListItem', list_item.group(1).strip(), pause))
+            elif not ts and _is_title(unit):
+                elements.append(Element('Title', unit, pause))
+            else:
+                elements.append(Element('NarrativeText', unit, pause))
+
+    return elements
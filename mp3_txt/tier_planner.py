@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+tier_planner - Split a batch between a large and a small model to meet a deadline
+
+Given a deadline ("finish this folder in 2 hours"), the planner decides per
+file whether it gets the large (accurate, slow) or the small (fast) model:
+
+  1. Every file starts on the small model; if even that cannot finish in
+     time, the deadline is reported as out of reach.
+  2. The time left over is spent upgrading files to the large model, worst
+     audio first (lowest estimated signal-to-noise ratio), because noisy
+     recordings gain the most from the bigger model.
+
+Costs are duration x real-time factor (RTF) per model, spread over the
+concurrent workers. RTFs start from this host's calibration (`evaluate`
+results) or defaults, and are replaced by measured RTFs as files finish. The
+plan is redone every time a worker picks up its next file, so a slow start
+moves later files to the small model and a fast one upgrades more of them.
+
+Usage:
+    planner = TierPlanner(deadline_seconds, concurrency, rtf_large, rtf_small)
+    planner.add(path, duration, snr_db)
+    tier = planner.start(path)        # 'large' or 'small', planned now
+    ...
+    planner.finish(path, elapsed)
+"""
+
+import array
+import math
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+LARGE, SMALL = 'large', 'small'
+
+# Fallback RTFs for Vosk on a laptop CPU when the host was never calibrated
+DEFAULT_RTF = {LARGE: 0.4, SMALL: 0.1}
+
+# Calibrated and measured RTFs are blended; measurements win as they pile up
+PRIOR_SECONDS = 300.0  # the calibrated RTF counts like this much measured audio
+
+# SNR is estimated from a few short excerpts rather than the whole file
+SNR_EXCERPTS = 3
+SNR_EXCERPT_SECONDS = 10.0
+SNR_FRAME_SAMPLES = 320  # 20 ms at 16 kHz
+
+
+def parse_duration(value: str) -> float:
+    """Parse '2h', '90m', '1h30m', '45s' or plain seconds into seconds."""
+    text = value.strip().lower()
+    if re.fullmatch(r'\d+(\.\d+)?', text):
+        return float(text)
+    parts = re.findall(r'(\d+(?:\.\d+)?)\s*([hms])', text)
+    if not parts or ''.join(n + u for n, u in parts) != re.sub(r'\s+', '', text):
+        raise ValueError(f"Invalid duration: {value!r} (use e.g. 2h, 90m, 1h30m)")
+    return sum(float(n) * {'h': 3600, 'm': 60, 's': 1}[u] for n, u in parts)
+
+
+def calibrated_rtf(model_path: Path) -> Optional[float]:
+    """RTF stored by `transcribe_enhanced.py evaluate` for this Vosk model, if any."""
+    from calibration import load_section
+    from evaluation import parse_config
+
+    default_model = Path.home() / ".cache" / "vosk-model-en-us-0.22"
+    for name, result in load_section('transcription').items():
+        config = parse_config(name)
+        if config['engine'] != 'vosk':
+            continue
+        path = Path(config['model']) if config['model'] else default_model
+        if path.resolve() == Path(model_path).resolve():
+            return result.get('rtf')
+    return None
+
+
+def estimate_snr(path: Path, duration: float) -> float:
+    """
+    Rough signal-to-noise ratio in dB from a few excerpts of the file.
+
+    Compares loud frames (speech, 90th percentile of 20 ms frame energy) with
+    quiet ones (noise floor, 10th percentile). Clean studio speech lands well
+    above 30 dB; phone recordings of a hall are often under 15.
+    """
+    energies = []
+    offsets = [duration * (i + 1) / (SNR_EXCERPTS + 1) for i in range(SNR_EXCERPTS)] if duration else [0.0]
+    for offset in offsets:
+        start = max(0.0, offset - SNR_EXCERPT_SECONDS / 2)
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-ss", f"{start:.2f}", "-t", str(SNR_EXCERPT_SECONDS),
+             "-i", str(path), "-ac", "1", "-ar", "16000", "-f", "s16le", "-acodec", "pcm_s16le", "-"],
+            capture_output=True,
+        )
+        samples = array.array('h')
+        samples.frombytes(result.stdout[:len(result.stdout) // 2 * 2])
+        for i in range(0, len(samples) - SNR_FRAME_SAMPLES + 1, SNR_FRAME_SAMPLES):
+            frame = samples[i:i + SNR_FRAME_SAMPLES]
+            energies.append(sum(s * s for s in frame) / SNR_FRAME_SAMPLES)
+
+    if not energies:
+        return 0.0
+    energies.sort()
+    speech = energies[int(len(energies) * 0.9)]
+    noise = energies[int(len(energies) * 0.1)]
+    return 10 * math.log10((speech + 1.0) / (noise + 1.0))
+
+
+class TierPlanner:
+    """Thread-safe per-file large/small model assignment against a deadline."""
+
+    def __init__(self, deadline_seconds: float, concurrency: int,
+                 rtf_large: Optional[float] = None, rtf_small: Optional[float] = None):
+        self.deadline = time.monotonic() + deadline_seconds
+        self.concurrency = max(1, concurrency)
+        self.prior = {LARGE: rtf_large or DEFAULT_RTF[LARGE], SMALL: rtf_small or DEFAULT_RTF[SMALL]}
+        self.measured = {LARGE: [0.0, 0.0], SMALL: [0.0, 0.0]}  # [elapsed, audio seconds]
+        self.files: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def add(self, path: Path, duration: float, snr_db: float):
+        self.files[str(path)] = {'duration': duration, 'snr': snr_db, 'tier': None, 'started': None}
+
+    def rtf(self, tier: str) -> float:
+        """Calibrated RTF blended with what this run has measured so far."""
+        elapsed, audio = self.measured[tier]
+        return (self.prior[tier] * PRIOR_SECONDS + elapsed) / (PRIOR_SECONDS + audio)
+
+    def _plan(self) -> Dict[str, str]:
+        """Tier for every file not started yet, given the time left."""
+        now = time.monotonic()
+        rtf_large, rtf_small = self.rtf(LARGE), self.rtf(SMALL)
+
+        # Worker-seconds left, minus what running files still need
+        capacity = (self.deadline - now) * self.concurrency
+        for f in self.files.values():
+            if f['started'] is not None and 'elapsed' not in f:
+                expected = f['duration'] * self.rtf(f['tier'])
+                capacity -= max(0.0, expected - (now - f['started']))
+
+        waiting = [(p, f) for p, f in self.files.items() if f['started'] is None]
+        capacity -= sum(f['duration'] * rtf_small for _, f in waiting)
+
+        plan = {p: SMALL for p, _ in waiting}
+        for p, f in sorted(waiting, key=lambda item: item[1]['snr']):
+            extra = f['duration'] * (rtf_large - rtf_small)
+            if extra <= capacity:
+                plan[p] = LARGE
+                capacity -= extra
+        return plan
+
+    def summary(self) -> dict:
+        """Planned tier counts and whether everything fits before the deadline."""
+        with self.lock:
+            plan = self._plan()
+            small_cost = sum(f['duration'] * self.rtf(SMALL) for f in self.files.values() if f['started'] is None)
+            fits = small_cost <= (self.deadline - time.monotonic()) * self.concurrency
+        return {LARGE: sum(1 for t in plan.values() if t == LARGE),
+                SMALL: sum(1 for t in plan.values() if t == SMALL), 'fits': fits}
+
+    def start(self, path: Path) -> str:
+        """Re-plan with the latest measurements and return this file's tier."""
+        with self.lock:
+            tier = self._plan().get(str(path), SMALL)
+            f = self.files[str(path)]
+            f['tier'] = tier
+            f['started'] = time.monotonic()
+            return tier
+
+    def finish(self, path: Path, elapsed: Optional[float]):
+        """Record how long the file took (None if it failed), improving the RTF for its tier."""
+        with self.lock:
+            f = self.files[str(path)]
+            f['elapsed'] = elapsed
+            if elapsed is not None and f['duration']:
+                self.measured[f['tier']][0] += elapsed
+                self.measured[f['tier']][1] += f['duration']
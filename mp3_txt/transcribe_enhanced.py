@@ -14,26 +14,75 @@ Usage:
   # Auto-detect and use best engine
   python transcribe_enhanced.py single input.mp3 --engine auto --outdir ./out
 
-  # Batch processing
+  # Vosk draft, Whisper only where Vosk was unsure
+  python transcribe_enhanced.py single input.mp3 --engine hybrid --outdir ./out
+
+  # Batch processing (re-run to resume; `jobs` shows the ledger)
   python transcribe_enhanced.py batch /path/to/files --engine whisper --outdir ./out
+  python transcribe_enhanced.py jobs --outdir ./out
+
+  # On a workstation in use: low priority, CPUs 2-7, fewer jobs while it is busy
+  python transcribe_enhanced.py batch /path/to/files --outdir ./out --concurrency 4 --background --cpus 2-7
+
+  # Word error rate vs. speed and memory of several configs (talk.mp3 + talk.txt references)
+  python transcribe_enhanced.py evaluate ./eval_set --config vosk --config whisper:base --max-wer 0.15
+
+  # Fastest Whisper compute type / thread count for this machine (stored per host)
+  python transcribe_enhanced.py calibrate sample.mp3 --model base --model small
+
+  # How long would a batch take, and at what concurrency? (nothing is transcribed)
+  python transcribe_enhanced.py plan /path/to/files --engine whisper --model small
+
+  # Rebuild transcripts from their saved word timings (no transcription)
+  python transcribe_enhanced.py render ./out --timestamps
+
+  # Full-text index with word timings, then search it
+  python transcribe_enhanced.py index /path/to/files --engine vosk
+  python transcribe_enhanced.py search "living into community"
 """
 from pathlib import Path
+import bisect
 import subprocess
 import json
+import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Optional, List, Tuple
 import typer
 from rich.progress import Progress
 from rich.console import Console
+import chrome_trace
+from transcript_sidecar import copy_sidecar, sidecar_path, write_sidecar
 
 app = typer.Typer()
 console = Console()
 
+SAMPLE_RATE = 16000
+
+
+def pcm_stream(audio_path: Path) -> subprocess.Popen:
+    """Spawn ffmpeg decoding audio_path to raw 16 kHz mono s16le PCM on stdout."""
+    return subprocess.Popen([
+        "ffmpeg",
+        "-hide_banner", "-loglevel", "warning",
+        "-i", str(audio_path),
+        "-ac", "1",
+        "-ar", str(SAMPLE_RATE),
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-"
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
 # ============================================================================
 # VOSK ENGINE
 # ============================================================================
 
+# Recognizer chunks (0.25 s each) per "recognize" trace span
+TRACE_GROUP_CHUNKS = 40
+
+
 def transcribe_vosk(
     mp3_path: Path,
     model_path: Optional[Path] = None,
@@ -59,20 +108,13 @@ def transcribe_vosk(
         sys.exit(1)
 
     console.print(f"[blue]Loading Vosk model from {model_path}...[/blue]")
-    model = Model(str(model_path))
+    with chrome_trace.span("load model", "vosk", path=str(model_path)):
+        model = Model(str(model_path))
 
     # Stream through ffmpeg
     console.print("[blue]Starting ffmpeg stream...[/blue]")
-    proc = subprocess.Popen([
-        "ffmpeg",
-        "-hide_banner", "-loglevel", "warning",
-        "-i", str(mp3_path),
-        "-ac", "1",
-        "-ar", "16000",
-        "-f", "s16le",
-        "-acodec", "pcm_s16le",
-        "-"
-    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with chrome_trace.span("spawn decoder", "ffmpeg"):
+        proc = pcm_stream(mp3_path)
 
     rec = KaldiRecognizer(model, 16000)
     rec.SetWords(True)
@@ -80,18 +122,44 @@ def transcribe_vosk(
     segments = []
     CHUNK_BYTES = 4000 * 2  # ~0.25s per chunk
 
+    # Tracing: one "recognize" span per TRACE_GROUP_CHUNKS chunks, with the
+    # time spent waiting on the pipe vs. inside the recognizer
+    tracing = chrome_trace.enabled()
+    group_start, group_cpu, read_ns, accept_ns, group_chunks = chrome_trace.now_us(), time.thread_time_ns(), 0, 0, 0
+
     while True:
+        t_read = time.perf_counter_ns()
         chunk = proc.stdout.read(CHUNK_BYTES)
         if not chunk:
             break
 
-        if rec.AcceptWaveform(chunk):
-            res = json.loads(rec.Result())
+        t_accept = time.perf_counter_ns()
+        final_available = rec.AcceptWaveform(chunk)
+        if tracing:
+            read_ns += t_accept - t_read
+            accept_ns += time.perf_counter_ns() - t_accept
+            group_chunks += 1
+            if group_chunks >= TRACE_GROUP_CHUNKS:
+                chrome_trace.complete("recognize", group_start, chrome_trace.now_us(), "vosk",
+                                      chunks=group_chunks, read_ms=read_ns / 1e6, accept_ms=accept_ns / 1e6,
+                                      cpu_ms=(time.thread_time_ns() - group_cpu) / 1e6)
+                group_start, group_cpu, read_ns, accept_ns, group_chunks = \
+                    chrome_trace.now_us(), time.thread_time_ns(), 0, 0, 0
+
+        if final_available:
+            with chrome_trace.span("parse result", "vosk"):
+                res = json.loads(rec.Result())
             if 'result' in res and res['result']:
                 segments.extend(res['result'])
 
+    if tracing and group_chunks:
+        chrome_trace.complete("recognize", group_start, chrome_trace.now_us(), "vosk",
+                              chunks=group_chunks, read_ms=read_ns / 1e6, accept_ms=accept_ns / 1e6,
+                              cpu_ms=(time.thread_time_ns() - group_cpu) / 1e6)
+
     # Get final result
-    final_res = json.loads(rec.FinalResult())
+    with chrome_trace.span("parse result", "vosk", final=True):
+        final_res = json.loads(rec.FinalResult())
     if 'result' in final_res and final_res['result']:
         segments.extend(final_res['result'])
 
@@ -104,11 +172,132 @@ def transcribe_vosk(
 # WHISPER ENGINE
 # ============================================================================
 
+# Whisper is fed from the ffmpeg PCM stream in windows of this many seconds,
+# overlapping so words cut at a window edge are heard whole in the next one
+WHISPER_WINDOW_SECONDS = 60.0
+WHISPER_OVERLAP_SECONDS = 4.0
+# Shorter windows would step back over the overlap instead of forward
+MIN_WHISPER_WINDOW_SECONDS = 2 * WHISPER_OVERLAP_SECONDS
+
+# int8 weights keep the models small enough for 8GB machines; `calibrate`
+# measures which compute type and thread count is fastest on each host
+WHISPER_COMPUTE_TYPE = "int8"
+WHISPER_COMPUTE_TYPES = ["int8", "int8_float32", "float32"]
+# int8 is kept unless another compute type is at least this much faster
+WHISPER_INT8_PREFERENCE = 0.05
+
+
+def whisper_settings(
+    model_size: str,
+    compute_type: Optional[str] = None,
+    cpu_threads: Optional[int] = None,
+    max_threads: Optional[int] = None,
+) -> Tuple[str, int]:
+    """
+    Compute type and CPU thread count to load model_size with on this host.
+
+    Explicit arguments win, then this host's `calibrate` result for the model
+    size, then int8 with CTranslate2's default threads (0). max_threads caps
+    the count when several jobs share the CPU.
+    """
+    from calibration import load_section
+
+    calibrated = load_section('whisper').get(model_size, {})
+    compute_type = compute_type or calibrated.get('compute_type', WHISPER_COMPUTE_TYPE)
+    threads = cpu_threads if cpu_threads is not None else calibrated.get('cpu_threads', 0)
+    if max_threads:
+        threads = min(threads or max_threads, max_threads)
+    return compute_type, threads
+
+
+def check_whisper_window(window_seconds: float):
+    """Exit with an error unless window_seconds is 0 (whole file) or at least MIN_WHISPER_WINDOW_SECONDS."""
+    if window_seconds and window_seconds < MIN_WHISPER_WINDOW_SECONDS:
+        console.print(f"[red]Error: --whisper-window must be 0 (whole file) or at least "
+                      f"{MIN_WHISPER_WINDOW_SECONDS:g} seconds[/red]")
+        sys.exit(1)
+
+
+def iter_whisper_windows(
+    model,
+    audio_path: Path,
+    language: Optional[str] = None,
+    window_seconds: float = WHISPER_WINDOW_SECONDS,
+    overlap_seconds: float = WHISPER_OVERLAP_SECONDS,
+):
+    """
+    Transcribe audio_path window by window from the ffmpeg PCM stream.
+
+    Only one window of samples is held in memory. Each word is emitted by
+    exactly one window: the boundary between two windows is the middle of
+    their overlap, and a word belongs to the window it starts in.
+
+    Yields lists of {word, start, end} with absolute timestamps.
+    """
+    import numpy as np
+
+    if window_seconds < 2 * overlap_seconds:
+        raise ValueError(f"Whisper window of {window_seconds:g}s is too short for a {overlap_seconds:g}s overlap")
+
+    proc = pcm_stream(audio_path)
+    overlap_samples = int(overlap_seconds * SAMPLE_RATE)
+    step_bytes = int((window_seconds - overlap_seconds) * SAMPLE_RATE) * 2
+    tail = np.zeros(0, dtype=np.float32)
+    offset = 0.0     # absolute time of the current window's first sample
+    boundary = 0.0   # words starting before this came from the previous window
+
+    try:
+        data = proc.stdout.read(int(window_seconds * SAMPLE_RATE) * 2)
+        while data:
+            samples = np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0
+            window = np.concatenate([tail, samples])
+            next_data = proc.stdout.read(step_bytes)
+            window_end = offset + len(window) / SAMPLE_RATE
+            cut = window_end - overlap_seconds / 2 if next_data else float("inf")
+
+            segments_iter, info = model.transcribe(
+                window,
+                language=language,
+                word_timestamps=True,
+                vad_filter=True,  # Voice activity detection for better accuracy
+            )
+
+            words = []
+            for seg in segments_iter:
+                for word in seg.words or []:
+                    start = offset + word.start
+                    if boundary <= start < cut:
+                        words.append({
+                            'word': word.word.strip(),
+                            'start': start,
+                            'end': offset + word.end
+                        })
+
+            # Keep the language detected on the first window with speech
+            if language is None and words:
+                language = info.language
+                console.print(f"[yellow]Detected language: {info.language} (probability: {info.language_probability:.2f})[/yellow]")
+
+            yield words
+
+            boundary = cut
+            tail = window[-overlap_samples:] if overlap_samples else window[:0]
+            offset = window_end - len(tail) / SAMPLE_RATE
+            data = next_data
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
 def transcribe_whisper(
     audio_path: Path,
     language: Optional[str] = None,
     model_size: str = "base",
-    timestamps: bool = False
+    timestamps: bool = False,
+    window_seconds: float = WHISPER_WINDOW_SECONDS,
+    compute_type: Optional[str] = None,
+    cpu_threads: Optional[int] = None
 ) -> List[dict]:
     """
     Transcribe using faster-whisper (multilingual, optimized, accurate).
@@ -118,6 +307,11 @@ def transcribe_whisper(
         language: Language code (en, af, nl, etc.) or None for auto-detect
         model_size: tiny, base, small, medium, large (larger = better quality but slower)
         timestamps: Whether to include word-level timestamps
+        window_seconds: Stream the audio in windows of this length (bounded
+            memory, first words within seconds); 0 decodes the whole file first
+        compute_type: CTranslate2 weight type (int8, int8_float32, float32, ...);
+            None uses this host's calibrated setting
+        cpu_threads: Threads for CTranslate2; None uses the calibrated count
 
     Returns list of segments with {text, start, end} fields.
     """
@@ -127,12 +321,24 @@ def transcribe_whisper(
         console.print("[red]Error: faster-whisper not installed. Run: pip install faster-whisper[/red]")
         sys.exit(1)
 
-    console.print(f"[blue]Loading Whisper model ({model_size})...[/blue]")
+    compute_type, cpu_threads = whisper_settings(model_size, compute_type, cpu_threads)
+    console.print(f"[blue]Loading Whisper model ({model_size}, {compute_type}, "
+                  f"{cpu_threads or 'default'} threads)...[/blue]")
     # Use CPU for 8GB RAM systems
-    model = WhisperModel(model_size, device="cpu", compute_type="int8")
+    model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
 
     console.print(f"[blue]Transcribing with Whisper (language: {language or 'auto-detect'})...[/blue]")
 
+    if window_seconds:
+        # Windowed words are needed to de-duplicate the overlaps, so the
+        # output is word-level either way
+        segments = []
+        for words in iter_whisper_windows(model, audio_path, language, window_seconds):
+            segments.extend(words)
+            if words:
+                console.print(f"[dim]  {format_timestamp(words[-1]['end'])} {len(segments)} words[/dim]")
+        return segments
+
     # Transcribe
     segments_iter, info = model.transcribe(
         str(audio_path),
@@ -166,6 +372,136 @@ def transcribe_whisper(
     return segments
 
 
+# ============================================================================
+# HYBRID ENGINE (Vosk draft, Whisper on low-confidence spans)
+# ============================================================================
+
+# Vosk words whose rolling mean confidence falls below this are re-decoded
+HYBRID_CONFIDENCE = 0.8
+HYBRID_CONTEXT_WORDS = 5      # words in the rolling confidence mean
+HYBRID_PAD_SECONDS = 0.5      # audio added around each span
+HYBRID_MERGE_GAP = 1.5        # spans closer than this are decoded together
+HYBRID_MIN_SPAN = 3.0         # Whisper needs some context to do well
+
+
+def low_confidence_spans(
+    words: List[dict],
+    threshold: float = HYBRID_CONFIDENCE,
+    context: int = HYBRID_CONTEXT_WORDS,
+) -> List[Tuple[float, float]]:
+    """
+    Find (start, end) time ranges where Vosk was unsure.
+
+    A word is flagged when the mean `conf` of the words around it is below
+    threshold. Flagged runs are padded, widened to HYBRID_MIN_SPAN and merged
+    when they are close together.
+    """
+    confs = [w.get('conf', 1.0) for w in words]
+    half = context // 2
+    spans: List[Tuple[float, float]] = []
+    for i, w in enumerate(words):
+        around = confs[max(0, i - half):i + half + 1]
+        if sum(around) / len(around) >= threshold:
+            continue
+        start = max(0.0, w['start'] - HYBRID_PAD_SECONDS)
+        end = w['end'] + HYBRID_PAD_SECONDS
+        if spans and start - spans[-1][1] <= HYBRID_MERGE_GAP:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+
+    widened: List[Tuple[float, float]] = []
+    for start, end in spans:
+        if end - start < HYBRID_MIN_SPAN:
+            middle = (start + end) / 2
+            start, end = max(0.0, middle - HYBRID_MIN_SPAN / 2), middle + HYBRID_MIN_SPAN / 2
+        if widened and start <= widened[-1][1]:
+            widened[-1] = (widened[-1][0], max(widened[-1][1], end))
+        else:
+            widened.append((start, end))
+    return widened
+
+
+def read_pcm_range(audio_path: Path, start: float, duration: float):
+    """Decode duration seconds from start as float32 samples (16 kHz mono)."""
+    import numpy as np
+
+    result = subprocess.run([
+        "ffmpeg",
+        "-hide_banner", "-loglevel", "warning",
+        "-ss", f"{start:.3f}", "-t", f"{duration:.3f}",
+        "-i", str(audio_path),
+        "-ac", "1",
+        "-ar", str(SAMPLE_RATE),
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-"
+    ], capture_output=True)
+    data = result.stdout[:len(result.stdout) // 2 * 2]
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def transcribe_hybrid(
+    audio_path: Path,
+    vosk_model_path: Optional[Path] = None,
+    whisper_size: str = "small",
+    language: Optional[str] = "en",
+    threshold: float = HYBRID_CONFIDENCE,
+    compute_type: Optional[str] = None,
+) -> List[dict]:
+    """
+    Transcribe with Vosk, then re-decode only its low-confidence spans with Whisper.
+
+    Vosk words inside a re-decoded span are replaced by Whisper's words for
+    that span; all timestamps are absolute. Returns {word, start, end} dicts.
+    """
+    words = transcribe_vosk(audio_path, vosk_model_path)
+    spans = low_confidence_spans(words, threshold)
+    if not spans:
+        console.print("[green]No low-confidence spans, keeping the Vosk transcript[/green]")
+        return words
+
+    total = words[-1]['end'] if words else 0.0
+    span_seconds = sum(end - start for start, end in spans)
+    console.print(f"[yellow]{len(spans)} low-confidence spans ({span_seconds:.0f}s of {total:.0f}s), "
+                  f"re-decoding with Whisper {whisper_size}[/yellow]")
+
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError:
+        console.print("[red]Error: faster-whisper not installed. Run: pip install faster-whisper[/red]")
+        sys.exit(1)
+    compute_type, cpu_threads = whisper_settings(whisper_size, compute_type)
+    model = WhisperModel(whisper_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    replacements = []
+    for start, end in spans:
+        audio = read_pcm_range(audio_path, start, end - start)
+        if not len(audio):
+            continue
+        segments_iter, _ = model.transcribe(audio, language=language, word_timestamps=True)
+        for seg in segments_iter:
+            for word in seg.words or []:
+                replacements.append({
+                    'word': word.word.strip(),
+                    'start': start + word.start,
+                    'end': start + word.end,
+                })
+
+    # Drop Vosk words whose midpoint falls inside a re-decoded span (spans
+    # are sorted and disjoint, so only the last one starting before it counts)
+    span_starts = [start for start, _ in spans]
+
+    def in_span(w):
+        middle = (w['start'] + w['end']) / 2
+        i = bisect.bisect_right(span_starts, middle) - 1
+        return i >= 0 and middle < spans[i][1]
+
+    merged = [w for w in words if not in_span(w)] + replacements
+    merged.sort(key=lambda w: w['start'])
+    return merged
+
+
 # ============================================================================
 # OUTPUT FORMATTING
 # ============================================================================
@@ -239,16 +575,21 @@ def segments_to_markdown(
 def single(
     input_file: Path = typer.Argument(..., help="Audio file to transcribe"),
     outdir: Path = typer.Option("./transcriptions", help="Output directory"),
-    engine: str = typer.Option("auto", help="Engine: vosk, whisper, or auto"),
+    engine: str = typer.Option("auto", help="Engine: vosk, whisper, hybrid, or auto"),
     language: Optional[str] = typer.Option(None, help="Language code (e.g., en, af, nl) - Whisper only"),
-    model: Optional[str] = typer.Option(None, help="Model: Vosk path or Whisper size (tiny/base/small/medium/large)"),
+    model: Optional[str] = typer.Option(None, help="Model: Vosk path or Whisper size (tiny/base/small/medium/large; hybrid: Whisper size)"),
     timestamps: bool = typer.Option(False, help="Include timestamps in output"),
+    index_db: Optional[Path] = typer.Option(None, help="Also add word timings to this search index"),
+    whisper_window: float = typer.Option(WHISPER_WINDOW_SECONDS, help="Seconds of audio per Whisper window (0 = decode whole file)"),
+    compute_type: Optional[str] = typer.Option(None, help="Whisper weight type: int8, int8_float32, float32 (default: calibrated for this host, else int8)"),
+    sidecar: bool = typer.Option(True, help="Also save word timings next to the transcript (for render)"),
 ):
     """Transcribe a single audio file."""
 
     if not input_file.exists():
         console.print(f"[red]Error: File not found: {input_file}[/red]")
         sys.exit(1)
+    check_whisper_window(whisper_window)
 
     outdir.mkdir(parents=True, exist_ok=True)
 
@@ -267,15 +608,25 @@ def single(
     if engine == "vosk":
         model_path = Path(model) if model else None
         segments = transcribe_vosk(input_file, model_path, timestamps)
+    elif engine == "hybrid":
+        segments = transcribe_hybrid(input_file, None, model or "small", language or "en",
+                                     compute_type=compute_type)
     elif engine == "whisper":
         model_size = model or "base"
-        segments = transcribe_whisper(input_file, language, model_size, timestamps)
+        # Word timings are needed for the index and the sidecar even without timestamps in the output
+        segments = transcribe_whisper(input_file, language, model_size, timestamps or index_db is not None or sidecar,
+                                      window_seconds=whisper_window, compute_type=compute_type)
     else:
         console.print(f"[red]Error: Unknown engine: {engine}[/red]")
         sys.exit(1)
 
+    if index_db is not None:
+        add_to_index(index_db, input_file, segments, engine)
+
     # Format output
     output_file = outdir / f"{input_file.stem}.md"
+    if sidecar:
+        write_sidecar(sidecar_path(output_file), segments, input_file.name, engine=engine, model=model)
     markdown = segments_to_markdown(
         segments,
         input_file.name,
@@ -292,71 +643,797 @@ def single(
 def batch(
     input_dir: Path = typer.Argument(..., help="Directory containing audio files"),
     outdir: Path = typer.Option("./transcriptions", help="Output directory"),
-    engine: str = typer.Option("auto", help="Engine: vosk, whisper, or auto"),
+    engine: str = typer.Option("auto", help="Engine: vosk, whisper, hybrid, or auto"),
     language: Optional[str] = typer.Option(None, help="Language code - Whisper only"),
     model: Optional[str] = typer.Option(None, help="Model path or size"),
     timestamps: bool = typer.Option(False, help="Include timestamps"),
+    whisper_window: float = typer.Option(WHISPER_WINDOW_SECONDS, help="Seconds of audio per Whisper window (0 = decode whole file)"),
     concurrency: int = typer.Option(1, help="Number of files to process in parallel"),
+    index_db: Optional[Path] = typer.Option(None, help="Also add word timings to this search index"),
+    max_memory: Optional[str] = typer.Option(None, help="Memory budget for parallel jobs, e.g. 6G or 4096M"),
+    recursive: bool = typer.Option(False, help="Also transcribe files in subdirectories"),
+    ledger: Optional[Path] = typer.Option(None, help="Job ledger database (default: <outdir>/.batch_ledger.db)"),
+    retries: int = typer.Option(2, help="Times to retry a failed file before giving up"),
+    retry_failed: bool = typer.Option(False, help="Also retry files that used up their retries in earlier runs"),
+    worker: bool = typer.Option(False, help="Share the work with other hosts/processes running --worker on the same folders"),
+    lease_ttl: float = typer.Option(600, help="Seconds before a silent worker's files are reclaimed (--worker)"),
+    trace: Optional[Path] = typer.Option(None, help="Write a Chrome trace (timeline of every worker) to this file"),
+    dedupe: bool = typer.Option(False, help="Reuse the transcript of an earlier copy of the same recording (acoustic fingerprint)"),
+    fingerprint_db: Optional[Path] = typer.Option(None, help="Fingerprint index for --dedupe (default: ~/.cache/mp3_txt/fingerprints.db)"),
+    sidecar: bool = typer.Option(True, help="Also save word timings next to each transcript (for render)"),
+    background: bool = typer.Option(False, help="Low CPU/I/O priority, and fewer jobs while the machine is busy"),
+    cpus: Optional[str] = typer.Option(None, help="CPUs to run on in --background mode, e.g. 2-7 or 0,2,4 (default: all)"),
 ):
-    """Transcribe multiple audio files in a directory."""
+    """
+    Transcribe multiple audio files in a directory.
+
+    Every file is recorded in a job ledger, so re-running the same command
+    resumes: finished files are skipped and failed ones are retried.
+
+    With --worker, any number of hosts can run the same command against a
+    shared input and output directory; files are claimed through lease files
+    in <outdir>/.leases and each host keeps its own ledger.
+
+    With --trace, every stage of every file is written to a Chrome trace
+    (open it in https://ui.perfetto.dev).
+
+    With --dedupe, files are fingerprinted first; a re-encoded or renamed
+    copy of a recording transcribed before gets a copy of that transcript.
+
+    With --background, the batch runs at nice 19 and the lowest I/O
+    priority (ffmpeg children included), optionally pinned to --cpus, and
+    starts a new file only while the load average leaves CPUs idle, up to
+    --concurrency files at once.
+    """
+    from job_ledger import LEDGER_NAME, JobLedger, file_hash, iter_audio_files
+    from worker_lease import LeaseDir, atomic_write_text
 
     if not input_dir.exists():
         console.print(f"[red]Error: Directory not found: {input_dir}[/red]")
         sys.exit(1)
+    check_whisper_window(whisper_window)
 
-    # Find audio files
-    audio_files = []
-    for ext in ['*.mp3', '*.m4a', '*.wav', '*.flac']:
-        audio_files.extend(input_dir.glob(ext))
-
-    if not audio_files:
+    outdir.mkdir(parents=True, exist_ok=True)
+    if trace is not None:
+        chrome_trace.enable()
+    leases = None
+    if worker:
+        from calibration import host_id
+        # SQLite locking is not reliable on network filesystems, so each host
+        # records its own jobs; lease files do the coordination
+        ledger = ledger or outdir / ".ledgers" / f"{host_id()}.db"
+        leases = LeaseDir(outdir / ".leases", ttl=lease_ttl)
+        console.print(f"[blue]Worker {leases.owner}[/blue]")
+    ledger_db = JobLedger(ledger or outdir / LEDGER_NAME)
+    max_attempts = retries + 1
+    if retry_failed:
+        console.print(f"[blue]Retrying {ledger_db.reset_failed()} failed files[/blue]")
+
+    # Find audio files (streamed into the ledger, never held as one list)
+    scanned = ledger_db.discover(iter_audio_files(input_dir, recursive=recursive), input_dir)
+    if not scanned:
         console.print(f"[yellow]No audio files found in {input_dir}[/yellow]")
         sys.exit(0)
 
-    console.print(f"[blue]Found {len(audio_files)} audio files[/blue]")
-    outdir.mkdir(parents=True, exist_ok=True)
+    console.print(f"[blue]Found {scanned} audio files, {ledger_db.count_pending(max_attempts, input_dir, recursive)} to transcribe[/blue]")
+
+    governor = None
+    if max_memory:
+        from memory_budget import MemoryGovernor, parse_size
+        governor = MemoryGovernor(parse_size(max_memory), log=lambda msg: console.print(f"[yellow]{msg}[/yellow]"))
+        console.print(f"[blue]Memory budget: {governor.budget_mb:.0f} MB[/blue]")
+
+    cores = os.cpu_count() or 1
+    load_governor = None
+    if background:
+        from background import LoadGovernor, enter_background, parse_cpu_set
+        # Before any worker thread or ffmpeg starts, so they all inherit it
+        try:
+            allowed_cpus = enter_background(parse_cpu_set(cpus) if cpus else None,
+                                            log=lambda msg: console.print(f"[yellow]{msg}[/yellow]"))
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            sys.exit(1)
+        cores = len(allowed_cpus)
+        console.print(f"[blue]Background mode: {cores} CPUs, low CPU and I/O priority, "
+                      f"up to {concurrency} jobs while the load allows[/blue]")
+    elif cpus:
+        console.print("[yellow]--cpus only applies with --background[/yellow]")
+
+    thread_cap = max(1, cores // concurrency) if concurrency > 1 or background else None
+
+    if background:
+        whisper_jobs = engine == "whisper" or (engine == "auto" and language and language != "en")
+        load_governor = LoadGovernor(concurrency, cores, threads_per_job=thread_cap if whisper_jobs else 1,
+                                     log=lambda msg: console.print(f"[blue]{msg}[/blue]"))
+
+    fingerprints = None
+    if dedupe:
+        import threading
+        from fingerprint import DEFAULT_FINGERPRINT_PATH, FingerprintIndex, fingerprint_file
+        fingerprints = FingerprintIndex(fingerprint_db or DEFAULT_FINGERPRINT_PATH)
+        dedupe_lock = threading.Lock()
+        in_progress = {}  # path -> Event set once its transcript is written (or it failed)
+
+    def find_duplicate(audio_file: Path):
+        """
+        Fingerprint audio_file and look for an earlier copy.
+
+        Returns (match, fingerprint): match is set when its transcript can be
+        reused. Otherwise this file is registered as in progress, so copies
+        running in parallel wait for its transcript instead of redoing it.
+        """
+        with chrome_trace.span("fingerprint", "dedupe"):
+            fp = fingerprint_file(audio_file)
+        while True:
+            with dedupe_lock:
+                match = fingerprints.find_match(*fp, exclude=audio_file)
+                pending = None
+                if match and match['duplicate']:
+                    if match['transcript'] and Path(match['transcript']).exists():
+                        return match, fp
+                    pending = in_progress.get(match['path'])
+                if pending is None:
+                    if match:
+                        console.print(f"[yellow]{audio_file.name} shares {match['coverage']:.0%} of its audio with "
+                                      f"{Path(match['path']).name}, transcribing it anyway[/yellow]")
+                    fingerprints.add(audio_file, *fp)
+                    in_progress[str(audio_file.resolve())] = threading.Event()
+                    return None, fp
+            with chrome_trace.span("duplicate wait", "dedupe"):
+                pending.wait()
+
+    def process_file(job: dict):
+        audio_file = Path(job['path'])
+        # Subdirectories are mirrored so equal names do not collide; the path
+        # under input_dir comes from discovery, since audio_file is resolved
+        # and a symlink may point outside input_dir
+        relative = Path(job['relative'])
+        output_file = outdir / relative.parent / f"{relative.stem}.md"
+
+        lease = None
+        if leases is not None:
+            def done_elsewhere():
+                try:
+                    return output_file.stat().st_mtime >= audio_file.stat().st_mtime
+                except FileNotFoundError:
+                    return False
+
+            if done_elsewhere():
+                ledger_db.claimed_elsewhere(str(audio_file), output=str(output_file))
+                return (audio_file.name, None, None)
+            with chrome_trace.span("lease claim", "worker"):
+                lease = leases.claim(relative.as_posix())
+            if lease is None:
+                ledger_db.claimed_elsewhere(str(audio_file), holder=leases.holder(relative.as_posix()))
+                return (audio_file.name, None, None)
+            if done_elsewhere():  # Finished by another worker just before we claimed it
+                lease.release()
+                ledger_db.claimed_elsewhere(str(audio_file), output=str(output_file))
+                return (audio_file.name, None, None)
+
+        try:
+            with chrome_trace.span("file", "batch", path=str(relative)):
+                if lease is None:
+                    return transcribe_job(audio_file, output_file)
+                with lease.keep_alive():
+                    return transcribe_job(audio_file, output_file)
+        finally:
+            if lease is not None:
+                lease.release()
+
+    def transcribe_job(audio_file: Path, output_file: Path):
+        from memory_budget import audio_duration
+
+        # Determine engine
+        selected_engine = engine
+        if selected_engine == "auto":
+            selected_engine = "whisper" if language and language != "en" else "vosk"
+        job_model = {"vosk": model, "hybrid": model or "small"}.get(selected_engine, model or "base")
+        ledger_db.start(str(audio_file), selected_engine, job_model)
+        with chrome_trace.span("probe", "ffprobe"):
+            duration = audio_duration(audio_file)
+
+        # A copy of this recording was transcribed already: copy its transcript
+        fp = None
+        if fingerprints is not None:
+            try:
+                match, fp = find_duplicate(audio_file)
+            except Exception as e:
+                console.print(f"[yellow]Could not fingerprint {audio_file.name} ({e}), transcribing it[/yellow]")
+                match = None
+            if match is not None:
+                try:
+                    markdown = Path(match['transcript']).read_text(encoding='utf-8')
+                    markdown = markdown.replace(f"source: {Path(match['path']).name}\n",
+                                                f"source: {audio_file.name}\nduplicate_of: {Path(match['path']).name}\n", 1)
+                    output_file.parent.mkdir(parents=True, exist_ok=True)
+                    if sidecar:
+                        copy_sidecar(Path(match['transcript']), output_file, audio_file.name)
+                    atomic_write_text(output_file, markdown)
+                    fingerprints.add(audio_file, *fp, output_file)
+                except Exception as e:
+                    ledger_db.fail(str(audio_file), str(e))
+                    return (audio_file.name, False, str(e))
+                console.print(f"[green]{audio_file.name}: duplicate of {Path(match['path']).name} "
+                              f"({match['coverage']:.0%} match), transcript reused[/green]")
+                ledger_db.finish(str(audio_file), str(output_file), duration=duration,
+                                 hash=file_hash(audio_file), model="duplicate")
+                return (audio_file.name, True, None)
 
-    # Process in parallel
-    with Progress() as progress:
-        task = progress.add_task(f"[blue]Transcribing...", total=len(audio_files))
+        # Inside the try, so a failed admission still releases the governors
+        # and wakes copies waiting on this file
+        try:
+            # In --background mode, wait for idle CPUs
+            if load_governor is not None:
+                with chrome_trace.span("load wait", "batch"):
+                    load_governor.acquire(str(audio_file))
 
-        def process_file(audio_file: Path):
-            # Determine engine
-            selected_engine = engine
-            if selected_engine == "auto":
-                selected_engine = "whisper" if language and language != "en" else "vosk"
+            # Wait until the job fits in the memory budget (may pick a smaller Whisper model)
+            if governor is not None:
+                with chrome_trace.span("memory wait", "batch"):
+                    job_model = governor.acquire(str(audio_file), selected_engine, job_model, duration,
+                                                 window_seconds=whisper_window)
 
             # Transcribe
-            try:
+            with chrome_trace.span("transcribe", selected_engine, model=job_model, duration=duration):
                 if selected_engine == "vosk":
-                    model_path = Path(model) if model else None
+                    model_path = Path(job_model) if job_model else None
                     segments = transcribe_vosk(audio_file, model_path, timestamps)
+                elif selected_engine == "hybrid":
+                    segments = transcribe_hybrid(audio_file, None, job_model, language or "en")
                 else:
-                    model_size = model or "base"
-                    segments = transcribe_whisper(audio_file, language, model_size, timestamps)
-
-                # Save
-                output_file = outdir / f"{audio_file.stem}.md"
+                    # Parallel jobs share the cores instead of each taking the calibrated count
+                    _, threads = whisper_settings(job_model, max_threads=thread_cap)
+                    word_timings = timestamps or index_db is not None or sidecar
+                    segments = transcribe_whisper(audio_file, language, job_model, word_timings,
+                                                  window_seconds=whisper_window, cpu_threads=threads)
+
+            if index_db is not None:
+                with chrome_trace.span("index", "io"):
+                    add_to_index(index_db, audio_file, segments, selected_engine)
+
+            # Save (written to a temporary file and renamed, so never seen half-written)
+            with chrome_trace.span("write", "io"):
+                output_file.parent.mkdir(parents=True, exist_ok=True)
+                if sidecar:
+                    write_sidecar(sidecar_path(output_file), segments, audio_file.name,
+                                  engine=selected_engine, model=job_model)
                 markdown = segments_to_markdown(segments, audio_file.name, timestamps)
-                output_file.write_text(markdown)
+                atomic_write_text(output_file, markdown)
+
+            if fp is not None:
+                fingerprints.add(audio_file, *fp, output_file)
+            ledger_db.finish(str(audio_file), str(output_file), duration=duration,
+                        hash=file_hash(audio_file), model=job_model)
+            return (audio_file.name, True, None)
+        except Exception as e:
+            ledger_db.fail(str(audio_file), str(e))
+            return (audio_file.name, False, str(e))
+        finally:
+            if governor is not None:
+                governor.release(str(audio_file))
+            if load_governor is not None:
+                load_governor.release(str(audio_file))
+            if fp is not None:
+                # Copies waiting on this file look again (and redo it themselves if it failed)
+                with dedupe_lock:
+                    in_progress.pop(str(audio_file.resolve())).set()
+
+    # Process in parallel; failed files go round again until they run out of attempts
+    success_count = 0
+    skipped_count = 0
+    try:
+        while True:
+            if not ledger_db.count_pending(max_attempts, input_dir, recursive):
+                # Workers wait for files claimed by others: they either finish
+                # or their lease expires and the file is taken over here
+                claimed = ledger_db.summary().get('claimed', 0)
+                if not claimed:
+                    break
+                console.print(f"[blue]Waiting for {claimed} files claimed by other workers...[/blue]")
+                time.sleep(min(lease_ttl / 3, 60))
+                ledger_db.requeue_claimed()
+                continue
+            with Progress() as progress:
+                task = progress.add_task(f"[blue]Transcribing...", total=ledger_db.count_pending(max_attempts, input_dir, recursive))
+
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    # Keep a bounded number of jobs queued instead of one future per file
+                    in_flight = set()
+                    pending_jobs = ledger_db.iter_pending(max_attempts, input_dir, recursive)
+                    while True:
+                        for job in pending_jobs:
+                            in_flight.add(executor.submit(process_file, job))
+                            if len(in_flight) >= concurrency * 2:
+                                break
+                        if not in_flight:
+                            break
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            filename, success, error = future.result()
+                            if success:
+                                success_count += 1
+                            elif success is None:
+                                skipped_count += 1  # Done or claimed by another worker
+                            else:
+                                console.print(f"[red]Failed: {filename} - {error}[/red]")
+                            progress.advance(task)
+    finally:
+        counts = ledger_db.summary()
+        ledger_db.close()
+        if fingerprints is not None:
+            fingerprints.close()
+        if trace is not None:
+            chrome_trace.write(trace)
+
+    console.print(f"[green]✅ Completed: {success_count} files this run[/green]")
+    if worker:
+        console.print(f"   Left to other workers: {skipped_count} files")
+    console.print(f"   Ledger: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, "
+                  f"{counts.get('pending', 0) + counts.get('running', 0)} not finished")
 
-                return (audio_file.name, True, None)
-            except Exception as e:
-                return (audio_file.name, False, str(e))
 
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = [executor.submit(process_file, f) for f in audio_files]
+@app.command()
+def jobs(
+    outdir: Path = typer.Option("./transcriptions", help="Output directory of the batch"),
+    ledger: Optional[Path] = typer.Option(None, help="Job ledger database (default: <outdir>/.batch_ledger.db)"),
+):
+    """Show the status of batch jobs recorded in the ledger."""
+    from job_ledger import LEDGER_NAME, JobLedger
+
+    path = ledger or outdir / LEDGER_NAME
+    if not path.exists():
+        console.print(f"[yellow]No ledger at {path}[/yellow]")
+        sys.exit(0)
+
+    ledger_db = JobLedger(path)
+    try:
+        for status, count in sorted(ledger_db.summary().items()):
+            console.print(f"  {status:8s} {count}")
+        failures = ledger_db.failures()
+        if failures:
+            console.print("\n[red]Recent failures:[/red]")
+            for f in failures:
+                console.print(f"  {f['path']} (attempts: {f['attempts']}): {f['error']}")
+    finally:
+        ledger_db.close()
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+@app.command()
+def evaluate(
+    input_dir: Path = typer.Argument(..., help="Audio files with reference transcripts next to them (talk.mp3 + talk.txt)"),
+    config: Optional[List[str]] = typer.Option(None, help="engine:model[:compute_type], repeatable (default: vosk, whisper:tiny/base/small)"),
+    language: Optional[str] = typer.Option(None, help="Language code - Whisper only"),
+    max_wer: Optional[float] = typer.Option(None, help="Accuracy bar, e.g. 0.15: recommend the fastest config at or under it"),
+    report: Optional[Path] = typer.Option(None, help="Also write the results as a Markdown table to this file"),
+    keep_outputs: Optional[Path] = typer.Option(None, help="Keep each config's transcripts under this directory"),
+):
+    """
+    Measure word error rate, real-time factor and peak memory of each config.
+
+    Every file is transcribed in a fresh process per config. Configs that no
+    other config beats on all three measures (the Pareto front) are starred;
+    results are also stored in this host's calibration file.
+    """
+    import tempfile
+    import evaluation
+    from calibration import save_result
+    from job_ledger import iter_audio_files
+    from memory_budget import audio_duration
+
+    if not input_dir.is_dir():
+        console.print(f"[red]Error: Directory not found: {input_dir}[/red]")
+        sys.exit(1)
+
+    samples = []
+    for audio in sorted(iter_audio_files(input_dir)):
+        reference = evaluation.find_reference(audio)
+        if reference is None:
+            console.print(f"[yellow]No reference transcript for {audio.name}, skipping[/yellow]")
+            continue
+        samples.append((audio, evaluation.transcript_words(reference.read_text(encoding='utf-8')),
+                        audio_duration(audio)))
+    if not samples:
+        console.print(f"[red]Error: No audio files with reference transcripts in {input_dir}[/red]")
+        sys.exit(1)
+
+    ref_words = sum(len(words) for _, words, _ in samples)
+    audio_seconds = sum(duration for _, _, duration in samples)
+    console.print(f"[blue]{len(samples)} files, {format_timestamp(audio_seconds)} of audio, {ref_words} reference words[/blue]")
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for spec in config or evaluation.DEFAULT_CONFIGS:
+            cfg = evaluation.parse_config(spec)
+            outdir = (keep_outputs or Path(scratch)) / spec.replace(':', '_').replace('/', '_')
+            outdir.mkdir(parents=True, exist_ok=True)
+            console.print(f"[blue]Evaluating {spec}...[/blue]")
+
+            errors = 0
+            elapsed = 0.0
+            peak_mb = 0.0
+            failed = None
+            for audio, reference, _ in samples:
+                try:
+                    output, seconds, rss_mb = evaluation.run_config(Path(__file__).resolve(), cfg, audio, outdir, language)
+                except RuntimeError as e:
+                    failed = f"{audio.name}: {e}"
+                    break
+                hypothesis = evaluation.transcript_words(output.read_text(encoding='utf-8'))
+                file_errors = evaluation.word_errors(reference, hypothesis)
+                console.print(f"[dim]  {audio.name}: WER {file_errors / max(len(reference), 1):.1%}, "
+                              f"{seconds:.1f}s, {rss_mb:.0f} MB[/dim]")
+                errors += file_errors
+                elapsed += seconds
+                peak_mb = max(peak_mb, rss_mb)
+
+            if failed:
+                console.print(f"[red]  {spec} failed - {failed}[/red]")
+                continue
+            result = {
+                'name': spec,
+                'wer': errors / max(ref_words, 1),
+                'rtf': elapsed / audio_seconds if audio_seconds else float('inf'),
+                'peak_mb': peak_mb,
+            }
+            results.append(result)
+            save_result('transcription', spec, dict(result, files=len(samples), audio_seconds=audio_seconds))
+
+    if not results:
+        console.print("[red]Error: Every config failed[/red]")
+        sys.exit(1)
+
+    front = evaluation.pareto_front(results)
+    lines = ["| Config | WER | RTF | Peak memory | Pareto |", "|---|---:|---:|---:|:---:|"]
+    console.print(f"\n  {'config':<40} {'WER':>7} {'RTF':>7} {'peak MB':>8}")
+    for r in sorted(results, key=lambda r: (r['rtf'], r['wer'])):
+        star = '*' if r in front else ' '
+        console.print(f"{star} {r['name']:<40} {r['wer']:>7.1%} {r['rtf']:>7.3f} {r['peak_mb']:>8.0f}")
+        lines.append(f"| {r['name']} | {r['wer']:.1%} | {r['rtf']:.3f} | {r['peak_mb']:.0f} MB | {'✓' if r in front else ''} |")
+    console.print("[dim]* Pareto front: no other config is at least as good on WER, RTF and memory[/dim]")
+
+    if max_wer is not None:
+        passing = [r for r in results if r['wer'] <= max_wer]
+        if passing:
+            best = min(passing, key=lambda r: (r['rtf'], r['peak_mb']))
+            console.print(f"[green]Fastest config with WER <= {max_wer:.1%}: {best['name']} "
+                          f"(WER {best['wer']:.1%}, RTF {best['rtf']:.3f}, {best['peak_mb']:.0f} MB)[/green]")
+        else:
+            console.print(f"[yellow]No config reaches WER <= {max_wer:.1%}[/yellow]")
+
+    if report is not None:
+        report.write_text(f"# Transcription Evaluation\n\n{len(samples)} files, "
+                          f"{format_timestamp(audio_seconds)} of audio, {ref_words} reference words\n\n"
+                          + '\n'.join(lines) + '\n')
+        console.print(f"[green]Report written to {report}[/green]")
 
-            success_count = 0
-            for future in as_completed(futures):
-                filename, success, error = future.result()
-                if success:
-                    success_count += 1
+
+def calibrate_whisper_model(audio, model_size: str, language: str) -> List[dict]:
+    """
+    Time every compute type and thread count for one model size on audio.
+
+    Returns one {compute_type, cpu_threads, rtf, load_seconds} per setting
+    that CTranslate2 supports on this CPU.
+    """
+    from faster_whisper import WhisperModel
+
+    cores = os.cpu_count() or 1
+    thread_counts = sorted({n for n in (1, 2, 4, 8, cores // 2, cores) if 1 <= n <= cores})
+    duration = len(audio) / SAMPLE_RATE
+    results = []
+    for compute_type in WHISPER_COMPUTE_TYPES:
+        for threads in thread_counts:
+            start = time.perf_counter()
+            try:
+                model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+            except ValueError as e:  # Compute type not supported on this CPU
+                console.print(f"  {compute_type:<13} not supported ({e})")
+                break
+            load_seconds = time.perf_counter() - start
+
+            # Warm up on a few seconds, then time the whole fixture
+            list(model.transcribe(audio[:5 * SAMPLE_RATE], language=language)[0])
+            start = time.perf_counter()
+            list(model.transcribe(audio, language=language)[0])
+            rtf = (time.perf_counter() - start) / duration
+            del model
+
+            console.print(f"  {compute_type:<13} {threads:>2} threads  RTF {rtf:.3f}  (load {load_seconds:.1f}s)")
+            results.append({'compute_type': compute_type, 'cpu_threads': threads,
+                            'rtf': round(rtf, 4), 'load_seconds': round(load_seconds, 2)})
+    return results
+
+
+@app.command()
+def calibrate(
+    sample: Path = typer.Argument(..., help="Speech recording to benchmark on (only the first --seconds are used)"),
+    model: List[str] = typer.Option(["base"], help="Whisper size(s) to calibrate, repeatable"),
+    seconds: float = typer.Option(30.0, help="Length of the benchmark excerpt"),
+    language: str = typer.Option("en", help="Language of the sample (skips detection while timing)"),
+):
+    """
+    Find the fastest Whisper compute type and thread count for this host.
+
+    Each model size is benchmarked with int8, int8_float32 and float32 at
+    several thread counts; the winner is stored in this host's calibration
+    file and used by every Whisper transcription from then on.
+    """
+    import numpy as np
+    from calibration import host_id, save_result
+
+    if not sample.exists():
+        console.print(f"[red]Error: File not found: {sample}[/red]")
+        sys.exit(1)
+
+    proc = pcm_stream(sample)
+    data = proc.stdout.read(int(seconds * SAMPLE_RATE) * 2)
+    proc.kill()
+    proc.wait()
+    audio = np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0
+    if len(audio) < 5 * SAMPLE_RATE:
+        console.print(f"[red]Error: {sample} is too short to benchmark (need at least 5 seconds)[/red]")
+        sys.exit(1)
+
+    for model_size in model:
+        console.print(f"[blue]Calibrating Whisper {model_size} on {len(audio) / SAMPLE_RATE:.0f}s of {sample.name}...[/blue]")
+        results = calibrate_whisper_model(audio, model_size, language)
+        if not results:
+            console.print(f"[red]No compute type worked for {model_size}[/red]")
+            continue
+
+        # Smaller int8 weights win unless something else is clearly faster
+        best = min(results, key=lambda r: r['rtf'])
+        int8 = [r for r in results if r['compute_type'] == "int8"]
+        if int8:
+            best_int8 = min(int8, key=lambda r: r['rtf'])
+            if best_int8['rtf'] <= best['rtf'] * (1 + WHISPER_INT8_PREFERENCE):
+                best = best_int8
+        save_result('whisper', model_size, dict(best, results=results))
+        console.print(f"[green]✅ {host_id()} / {model_size}: {best['compute_type']}, {best['cpu_threads']} threads "
+                      f"(RTF {best['rtf']:.3f})[/green]")
+
+
+@app.command()
+def plan(
+    input_dir: Path = typer.Argument(..., help="Directory containing audio files"),
+    engine: str = typer.Option("auto", help="Engine: vosk, whisper, hybrid, or auto"),
+    language: Optional[str] = typer.Option(None, help="Language code - Whisper only"),
+    model: Optional[str] = typer.Option(None, help="Model path or size"),
+    concurrency: Optional[int] = typer.Option(None, help="Concurrency you intend to use (default: compare all)"),
+    max_memory: Optional[str] = typer.Option(None, help="Memory budget, e.g. 6G (default: what the system has available)"),
+    whisper_window: float = typer.Option(WHISPER_WINDOW_SECONDS, help="Seconds of audio per Whisper window (0 = decode whole file)"),
+    recursive: bool = typer.Option(False, help="Also count files in subdirectories"),
+):
+    """
+    Estimate how long a batch will take and how much memory it needs, without transcribing.
+
+    Reads every file's duration and combines it with this host's calibrated
+    speed for the engine/model (run `evaluate` or `calibrate` first for
+    trustworthy numbers), then compares concurrency settings by wall time,
+    CPU-hours and peak memory.
+    """
+    from batch_plan import engine_speed, recommend, simulate
+    from clip_concat import GROUP_CLIPS, probe_inputs
+    from job_ledger import iter_audio_files
+    from memory_budget import SYSTEM_RESERVE_MB, audio_duration, available_mb, estimate_job_mb, parse_size
+
+    if not input_dir.exists():
+        console.print(f"[red]Error: Directory not found: {input_dir}[/red]")
+        sys.exit(1)
+    check_whisper_window(whisper_window)
+    if concurrency is not None and concurrency < 1:
+        console.print("[red]Error: --concurrency must be at least 1[/red]")
+        sys.exit(1)
+
+    selected_engine = engine
+    if selected_engine == "auto":
+        selected_engine = "whisper" if language and language != "en" else "vosk"
+    job_model = {"vosk": model, "hybrid": model or "small"}.get(selected_engine, model or "base")
+
+    files = sorted(iter_audio_files(input_dir, recursive=recursive))
+    if not files:
+        console.print(f"[yellow]No audio files found in {input_dir}[/yellow]")
+        sys.exit(0)
+
+    # One ffmpeg listing per GROUP_CLIPS files; ffprobe only where ffmpeg guesses
+    console.print(f"[blue]Reading durations of {len(files)} files...[/blue]")
+    groups = [files[i:i + GROUP_CLIPS] for i in range(0, len(files), GROUP_CLIPS)]
+    with ThreadPoolExecutor(max_workers=min(8, len(groups))) as executor:
+        info = [i for group in executor.map(probe_inputs, groups) for i in group]
+    durations = []
+    unreadable = 0
+    for f, i in zip(files, info):
+        duration = i['duration'] if i['duration'] is not None else audio_duration(f)
+        if duration > 0:
+            durations.append(duration)
+        else:
+            unreadable += 1
+    if not durations:
+        console.print("[red]Error: Could not read the duration of any file[/red]")
+        sys.exit(1)
+
+    total = sum(durations)
+    console.print(f"[blue]{len(durations)} files, {format_timestamp(total)} of audio "
+                  f"(longest {format_timestamp(max(durations))})"
+                  + (f", {unreadable} unreadable files left out" if unreadable else "") + "[/blue]")
+
+    speed = engine_speed(selected_engine, job_model)
+    label = f"{selected_engine} {job_model}" if job_model else selected_engine
+    console.print(f"[blue]{label}: RTF {speed['rtf']:.3f} at {speed['threads']} threads "
+                  f"({speed['source']})[/blue]")
+    if speed['source'] == 'default guess':
+        console.print("[yellow]No calibration for this engine/model on this host: run `evaluate` or "
+                      "`calibrate` for a better estimate[/yellow]")
+
+    def job_mb(duration):
+        estimate = estimate_job_mb(selected_engine, job_model, duration, window_seconds=whisper_window)
+        return max(estimate, speed['peak_mb'] or 0.0)
+
+    if max_memory:
+        memory_mb = parse_size(max_memory)
+    else:
+        available = available_mb()
+        memory_mb = available - SYSTEM_RESERVE_MB if available is not None else None
+
+    cores = os.cpu_count() or 1
+    levels = range(1, max(1, min(cores, len(durations), 16)) + 1)
+    if concurrency is not None and concurrency not in levels:
+        levels = list(levels) + [concurrency]
+    rows = [simulate(durations, c, speed, cores, job_mb) for c in levels]
+    best = recommend(rows, memory_mb)
+
+    def hours(seconds):
+        return f"{seconds / 3600:.1f} h" if seconds >= 3600 else f"{seconds / 60:.0f} min"
+
+    console.print(f"\n  {'concurrency':>11} {'threads':>7} {'wall time':>10} {'CPU-hours':>9} {'peak memory':>12}")
+    for r in rows:
+        fits = memory_mb is None or r['peak_mb'] <= memory_mb
+        mark = '*' if r is best else ' '
+        line = (f"{mark} {r['concurrency']:>11} {r['threads']:>7} {hours(r['wall']):>10} "
+                f"{r['cpu_hours']:>9.2f} {r['peak_mb'] / 1024:>9.1f} GB")
+        console.print(line if fits else f"[dim]{line}  (over memory)[/dim]")
+    if memory_mb is not None:
+        console.print(f"[dim]Memory limit: {memory_mb / 1024:.1f} GB "
+                      f"({'--max-memory' if max_memory else 'available now, minus a reserve'})[/dim]")
+
+    if best is None:
+        console.print("[red]Not even one job at a time fits in memory: pick a smaller model "
+                      "or raise --max-memory[/red]")
+    else:
+        console.print(f"[green]Recommended: --concurrency {best['concurrency']} "
+                      f"(about {hours(best['wall'])}, {best['cpu_hours']:.2f} CPU-hours, "
+                      f"peak ~{best['peak_mb'] / 1024:.1f} GB)[/green]")
+    if concurrency is not None:
+        chosen = next(r for r in rows if r['concurrency'] == concurrency)
+        if memory_mb is not None and chosen['peak_mb'] > memory_mb:
+            console.print(f"[yellow]--concurrency {concurrency} needs ~{chosen['peak_mb'] / 1024:.1f} GB: "
+                          f"add --max-memory to batch so jobs wait instead of swapping[/yellow]")
+        else:
+            console.print(f"[blue]--concurrency {concurrency}: about {hours(chosen['wall'])}[/blue]")
+
+
+@app.command()
+def render(
+    paths: List[Path] = typer.Argument(..., help="Transcripts, word sidecars or directories of them"),
+    outdir: Optional[Path] = typer.Option(None, help="Write the markdown here instead of next to each sidecar"),
+    timestamps: bool = typer.Option(False, help="Include timestamps in output"),
+):
+    """Rebuild markdown transcripts from their word sidecars, without transcribing again."""
+    from transcript_sidecar import find_sidecars, iter_words, read_header, transcript_path
+
+    if outdir is not None:
+        outdir.mkdir(parents=True, exist_ok=True)
+    rendered = 0
+    for words_path in find_sidecars(paths):
+        if not words_path.exists():
+            console.print(f"[yellow]No word sidecar: {words_path}[/yellow]")
+            continue
+        header = read_header(words_path)
+        output_file = transcript_path(words_path)
+        if outdir is not None:
+            output_file = outdir / output_file.name
+        output_file.write_text(segments_to_markdown(list(iter_words(words_path)), header['source'], timestamps))
+        rendered += 1
+    console.print(f"[green]✅ Rendered {rendered} transcripts[/green]")
+
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+def add_to_index(db_path: Path, audio_path: Path, segments: List[dict], engine: str):
+    """Store word timings for audio_path in the full-text search index."""
+    import transcript_index
+
+    conn = transcript_index.open_index(db_path)
+    try:
+        transcript_index.add_transcript(conn, audio_path, segments, engine=engine)
+    finally:
+        conn.close()
+
+
+@app.command()
+def index(
+    input_path: Path = typer.Argument(..., help="Audio file or directory to index"),
+    db: Optional[Path] = typer.Option(None, help="Index database (default: ~/.cache/mp3_txt/transcripts.db)"),
+    engine: str = typer.Option("auto", help="Engine: vosk, whisper, hybrid, or auto"),
+    language: Optional[str] = typer.Option(None, help="Language code - Whisper only"),
+    model: Optional[str] = typer.Option(None, help="Model path or size"),
+):
+    """Transcribe audio files that are not yet indexed and add their word timings to the search index."""
+    import transcript_index
+
+    db_path = db or transcript_index.DEFAULT_INDEX_PATH
+
+    if not input_path.exists():
+        console.print(f"[red]Error: Not found: {input_path}[/red]")
+        sys.exit(1)
+
+    if input_path.is_dir():
+        audio_files = []
+        for ext in ['*.mp3', '*.m4a', '*.wav', '*.flac']:
+            audio_files.extend(input_path.glob(ext))
+    else:
+        audio_files = [input_path]
+
+    conn = transcript_index.open_index(db_path)
+    try:
+        pending = [f for f in sorted(audio_files) if not transcript_index.is_indexed(conn, f)]
+        console.print(f"[blue]{len(audio_files) - len(pending)} already indexed, {len(pending)} to index[/blue]")
+
+        selected_engine = engine
+        if selected_engine == "auto":
+            selected_engine = "whisper" if language and language != "en" else "vosk"
+
+        for audio_file in pending:
+            try:
+                if selected_engine == "vosk":
+                    segments = transcribe_vosk(audio_file, Path(model) if model else None)
+                elif selected_engine == "hybrid":
+                    segments = transcribe_hybrid(audio_file, None, model or "small", language or "en")
                 else:
-                    console.print(f"[red]Failed: {filename} - {error}[/red]")
-                progress.advance(task)
+                    segments = transcribe_whisper(audio_file, language, model or "base", timestamps=True)
+                rows = transcript_index.add_transcript(conn, audio_file, segments, engine=selected_engine)
+                console.print(f"[green]✅ Indexed {audio_file.name} ({len(segments)} words, {rows} windows)[/green]")
+            except Exception as e:
+                console.print(f"[red]Failed: {audio_file.name} - {e}[/red]")
+    finally:
+        conn.close()
 
-    console.print(f"[green]✅ Completed: {success_count}/{len(audio_files)} files[/green]")
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Word or phrase to find"),
+    db: Optional[Path] = typer.Option(None, help="Index database (default: ~/.cache/mp3_txt/transcripts.db)"),
+    limit: int = typer.Option(20, help="Maximum number of hits"),
+):
+    """Search the transcript index and print file plus offset of each hit."""
+    import transcript_index
+
+    db_path = db or transcript_index.DEFAULT_INDEX_PATH
+    if not Path(db_path).exists():
+        console.print(f"[red]Error: Index not found: {db_path}[/red]")
+        sys.exit(1)
+
+    conn = transcript_index.open_index(db_path)
+    try:
+        hits = transcript_index.search(conn, query, limit=limit)
+    finally:
+        conn.close()
+
+    if not hits:
+        console.print(f"[yellow]No matches for: {query}[/yellow]")
+        return
+
+    for hit in hits:
+        offset = format_timestamp(hit['offset_ms'] / 1000)
+        console.print(f"[green]{hit['path']}[/green] @ {offset} ({hit['offset_ms']} ms)")
+        console.print(f"    {hit['text']}")
 
 
 if __name__ == "__main__":
@@ -4,21 +4,32 @@ Streaming MP3 -> timestamped Markdown using Vosk (minimal memory).
 Usage:
   python transcribe_vosk_stream.py single input.mp3 --outdir ./out
   python transcribe_vosk_stream.py batch /path/to/mp3_dir --outdir ./out --concurrency 1
+  python transcribe_vosk_stream.py batch /path/to/mp3_dir --outdir ./out --deadline 2h
+  python transcribe_vosk_stream.py batch /path/to/memos --outdir ./out --concat-clips --concurrency 4
+  python transcribe_vosk_stream.py pipeline input.mp3 --outdir ./out --cleaned-outdir ./cleaned_output
+  python transcribe_vosk_stream.py render ./out --timestamps
 """
 from pathlib import Path
 import subprocess
 import json
+import queue
 import sys
+import time
+from typing import List, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import typer
 from vosk import Model, KaldiRecognizer
 from rich.progress import Progress
+import chrome_trace
+from transcript_sidecar import sidecar_path, write_sidecar
 
 app = typer.Typer()
 
 # Adjust to where you unpack the Vosk model
 # Using large model (vosk-model-en-us-0.22) for better accuracy
 DEFAULT_MODEL_PATH = Path.home() / ".cache" / "vosk-model-en-us-0.22"
+# Fast model used for part of the batch when a --deadline is set
+DEFAULT_SMALL_MODEL_PATH = Path.home() / ".cache" / "vosk-model-small-en-us-0.15"
 
 # ffmpeg parameters to output raw PCM 16bit LE mono 16kHz
 FFMPEG_CMD = [
@@ -56,34 +67,56 @@ def ffmpeg_stream(mp3_path: Path):
         "-"
     ]
     print(f"Starting ffmpeg...")
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with chrome_trace.span("spawn decoder", "ffmpeg", path=path_str):
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-    # Check if process started successfully
-    import time
-    time.sleep(0.1)
-    if proc.poll() is not None:
-        stderr = proc.stderr.read().decode('utf-8')
-        raise RuntimeError(f"ffmpeg failed to start: {stderr}")
+        # Check if process started successfully
+        time.sleep(0.1)
+        if proc.poll() is not None:
+            stderr = proc.stderr.read().decode('utf-8')
+            raise RuntimeError(f"ffmpeg failed to start: {stderr}")
 
     return proc
 
-def transcribe_stream(model: Model, mp3_path: Path):
+# Recognizer chunks (0.25 s each) per "recognize" trace span
+TRACE_GROUP_CHUNKS = 40
+
+def iter_words(model: Model, mp3_path: Path):
     """
     Stream audio through ffmpeg into Vosk recognizer.
-    Returns list of (start, end, text) lines grouped by window.
+    Yields lists of word dicts ({word, start, end, conf}) as Vosk finalizes them.
     """
-    proc = ffmpeg_stream(mp3_path)
+    yield from iter_pcm_words(model, ffmpeg_stream(mp3_path))
+
+def iter_pcm_words(model: Model, proc):
+    """Feed the 16 kHz PCM output of an ffmpeg process to a new Vosk recognizer (see iter_words)."""
     if proc.stdout is None:
         raise RuntimeError("ffmpeg stdout not available")
     rec = KaldiRecognizer(model, 16000)  # Integer sample rate
     rec.SetWords(True)
-    segments = []
+    total_words = 0
     CHUNK_BYTES = 4000 * 2  # 4000 samples * 2 bytes/sample ~ 4000/16000 = 0.25s per chunk
     chunks_read = 0
     bytes_read = 0
 
+    # Tracing: pipe reads and recognizer calls are grouped into one span per
+    # TRACE_GROUP_CHUNKS chunks; cpu_ms well below the span length means the
+    # thread was waiting (on the pipe or the GIL)
+    tracing = chrome_trace.enabled()
+    group = {}
+
+    def end_group():
+        if tracing and group.get('chunks'):
+            chrome_trace.complete("recognize", group['start'], chrome_trace.now_us(), "vosk",
+                                  chunks=group['chunks'], read_ms=group['read'] / 1e6,
+                                  accept_ms=group['accept'] / 1e6,
+                                  cpu_ms=(time.thread_time_ns() - group['cpu']) / 1e6)
+        group.update(start=chrome_trace.now_us(), cpu=time.thread_time_ns(), read=0, accept=0, chunks=0)
+
+    end_group()
     try:
         while True:
+            t_read = time.perf_counter_ns()
             chunk = proc.stdout.read(CHUNK_BYTES)
             if not chunk:
                 break
@@ -91,22 +124,36 @@ def transcribe_stream(model: Model, mp3_path: Path):
             chunks_read += 1
             bytes_read += len(chunk)
 
-            if rec.AcceptWaveform(chunk):
-                res = json.loads(rec.Result())
+            t_accept = time.perf_counter_ns()
+            final_available = rec.AcceptWaveform(chunk)
+            if tracing:
+                group['read'] += t_accept - t_read
+                group['accept'] += time.perf_counter_ns() - t_accept
+                group['chunks'] += 1
+                if group['chunks'] >= TRACE_GROUP_CHUNKS:
+                    end_group()
+
+            if final_available:
+                with chrome_trace.span("parse result", "vosk"):
+                    res = json.loads(rec.Result())
                 if 'result' in res and res['result']:
                     print(f"  Speech in chunk {chunks_read}: {len(res['result'])} words")
-                    segments.extend(res['result'])
+                    total_words += len(res['result'])
+                    yield res['result']
             else:
                 # partial result available via rec.PartialResult() if desired
                 pass
 
         # Get final result
-        final = json.loads(rec.FinalResult())
+        end_group()
+        with chrome_trace.span("parse result", "vosk", final=True):
+            final = json.loads(rec.FinalResult())
         if 'result' in final and final['result']:
             print(f"  Final result: {len(final['result'])} words")
-            segments.extend(final['result'])
+            total_words += len(final['result'])
+            yield final['result']
 
-        print(f"Total: {chunks_read} chunks, {bytes_read:,} bytes, {len(segments)} words")
+        print(f"Total: {chunks_read} chunks, {bytes_read:,} bytes, {total_words} words")
 
     except Exception as e:
         print(f"Error during transcription: {e}")
@@ -126,26 +173,44 @@ def transcribe_stream(model: Model, mp3_path: Path):
         except Exception as ex:
             print(f"Error closing ffmpeg: {ex}")
 
-    # Group words into ~10s blocks (configurable)
+def transcribe_words(model: Model, mp3_path: Path):
+    """
+    Stream audio through ffmpeg into Vosk recognizer.
+    Returns list of word dicts ({word, start, end, conf}) as produced by Vosk.
+    """
+    segments = []
+    for words in iter_words(model, mp3_path):
+        segments.extend(words)
+    return segments
+
+def iter_windows(word_batches, window: float = 10.0):
+    """Group words from an iterable of word lists into (start, end, text) lines as each window closes."""
+    current = None
+    for batch in word_batches:
+        for w in batch:
+            if current is not None and w['start'] - current[0] <= window:
+                current[1] = w['end']
+                current[2].append(w['word'])
+                continue
+            if current is not None:
+                yield (current[0], current[1], " ".join(current[2]))
+            current = [w['start'], w['end'], [w['word']]]
+    if current is not None:
+        yield (current[0], current[1], " ".join(current[2]))
+
+def group_words(segments, window: float = 10.0):
+    """Group words into ~10s (start, end, text) lines."""
     if not segments:
         print("  WARNING: No segments detected")
         return []
-    lines = []
-    window = 10.0
-    current_start = segments[0]['start']
-    current_end = segments[0]['end']
-    current_text = [segments[0]['word']]
-    for w in segments[1:]:
-        if w['start'] - current_start <= window:
-            current_end = w['end']
-            current_text.append(w['word'])
-        else:
-            lines.append((current_start, current_end, " ".join(current_text)))
-            current_start = w['start']
-            current_end = w['end']
-            current_text = [w['word']]
-    lines.append((current_start, current_end, " ".join(current_text)))
-    return lines
+    return list(iter_windows([segments], window))
+
+def transcribe_stream(model: Model, mp3_path: Path):
+    """
+    Stream audio through ffmpeg into Vosk recognizer.
+    Returns list of (start, end, text) lines grouped by window.
+    """
+    return group_words(transcribe_words(model, mp3_path))
 
 def format_timestamp(t: float) -> str:
     hrs = int(t // 3600)
@@ -172,78 +237,86 @@ def extract_metadata(audio_path: Path) -> dict:
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode == 0:
             data = json.loads(result.stdout)
-            tags = data.get('format', {}).get('tags', {})
-
-            # Normalize tag keys (ffprobe can return different cases)
-            normalized_tags = {}
-            for k, v in tags.items():
-                normalized_tags[k.lower()] = v
-
-            return {
-                'title': normalized_tags.get('title', ''),
-                'artist': normalized_tags.get('artist', normalized_tags.get('author', '')),
-                'album': normalized_tags.get('album', normalized_tags.get('album_artist', '')),
-                'date': normalized_tags.get('date', normalized_tags.get('year', '')),
-                'genre': normalized_tags.get('genre', ''),
-                'comment': normalized_tags.get('comment', ''),
-                'track': normalized_tags.get('track', ''),
-            }
+            return metadata_from_tags(data.get('format', {}).get('tags', {}))
     except Exception as e:
         print(f"Warning: Could not extract metadata: {e}")
 
     return {}
 
-def write_markdown(out_path: Path, src_audio: Path, lines, metadata=None, include_timestamps=False):
+def metadata_from_tags(tags: dict) -> dict:
+    """Map ffmpeg/ffprobe format tags to the metadata fields used in the frontmatter."""
+    # Normalize tag keys (ffprobe can return different cases)
+    normalized_tags = {}
+    for k, v in tags.items():
+        normalized_tags[k.lower()] = v
+
+    return {
+        'title': normalized_tags.get('title', ''),
+        'artist': normalized_tags.get('artist', normalized_tags.get('author', '')),
+        'album': normalized_tags.get('album', normalized_tags.get('album_artist', '')),
+        'date': normalized_tags.get('date', normalized_tags.get('year', '')),
+        'genre': normalized_tags.get('genre', ''),
+        'comment': normalized_tags.get('comment', ''),
+        'track': normalized_tags.get('track', ''),
+    }
+
+def write_frontmatter(f, src_audio: Path, metadata=None):
     """
-    Write transcription to markdown with enhanced frontmatter.
+    Write the frontmatter block to an open file.
     Metadata dict can include: title, artist, album, date, genre, comment, track
     """
-    with out_path.open("w", encoding="utf-8") as f:
-        # Write frontmatter
-        f.write("---\n")
-        f.write(f"source: {src_audio.name}\n")
-
-        if metadata:
-            # Author with wikilink if available
-            author = metadata.get('artist', '')
-            if author:
-                f.write(f"author: [[{author}]]\n")
-            else:
-                f.write("author:\n")
+    f.write("---\n")
+    f.write(f"source: {src_audio.name}\n")
 
-            # Book title (album) with wikilink if available
-            book_title = metadata.get('album', '')
-            if book_title:
-                f.write(f"book title: [[{book_title}]]\n")
-            else:
-                f.write("book title:\n")
+    if metadata:
+        # Author with wikilink if available
+        author = metadata.get('artist', '')
+        if author:
+            f.write(f"author: [[{author}]]\n")
+        else:
+            f.write("author:\n")
 
-            # Title (if different from filename)
-            title = metadata.get('title', '')
-            if title:
-                f.write(f"title: {title}\n")
+        # Book title (album) with wikilink if available
+        book_title = metadata.get('album', '')
+        if book_title:
+            f.write(f"book title: [[{book_title}]]\n")
+        else:
+            f.write("book title:\n")
 
-            # Date/Year
-            date = metadata.get('date', '')
-            if date:
-                f.write(f"date: {date}\n")
+        # Title (if different from filename)
+        title = metadata.get('title', '')
+        if title:
+            f.write(f"title: {title}\n")
 
-            # Genre
-            genre = metadata.get('genre', '')
-            if genre:
-                f.write(f"genre: {genre}\n")
+        # Date/Year
+        date = metadata.get('date', '')
+        if date:
+            f.write(f"date: {date}\n")
 
-            # Track number
-            track = metadata.get('track', '')
-            if track:
-                f.write(f"track: {track}\n")
+        # Genre
+        genre = metadata.get('genre', '')
+        if genre:
+            f.write(f"genre: {genre}\n")
 
-        else:
-            # No metadata, use simple format with empty fields for manual filling
-            f.write("author:\n")
-            f.write("book title:\n")
+        # Track number
+        track = metadata.get('track', '')
+        if track:
+            f.write(f"track: {track}\n")
+
+    else:
+        # No metadata, use simple format with empty fields for manual filling
+        f.write("author:\n")
+        f.write("book title:\n")
+
+    f.write("---\n\n")
 
-        f.write("---\n\n")
+def write_markdown(out_path: Path, src_audio: Path, lines, metadata=None, include_timestamps=False):
+    """
+    Write transcription to markdown with enhanced frontmatter.
+    Metadata dict can include: title, artist, album, date, genre, comment, track
+    """
+    with out_path.open("w", encoding="utf-8") as f:
+        write_frontmatter(f, src_audio, metadata)
 
         if not lines:
             f.write("*(no speech detected)*\n")
@@ -263,7 +336,9 @@ def single(
     input: Path = typer.Argument(...),
     outdir: Path = typer.Option(Path(".")),
     model: Path = typer.Option(DEFAULT_MODEL_PATH, "--model", help="Path to Vosk model directory"),
-    timestamps: bool = typer.Option(False, "--timestamps", help="Include timestamps in output")
+    timestamps: bool = typer.Option(False, "--timestamps", help="Include timestamps in output"),
+    index_db: Optional[Path] = typer.Option(None, "--index-db", help="Also add word timings to this search index"),
+    sidecar: bool = typer.Option(True, "--sidecar/--no-sidecar", help="Also save word timings next to the transcript (for render)")
 ):
     # Clean input path - remove any newlines from terminal wrapping
     input_str = str(input).replace('\n', '').replace('\r', '').strip()
@@ -283,9 +358,7 @@ def single(
 
     # Transcribe
     vosk_model = Model(str(model_path))
-    lines = transcribe_stream(vosk_model, input)
-    out_md = outdir / (input.stem + ".md")
-    write_markdown(out_md, input, lines, metadata=metadata, include_timestamps=timestamps)
+    out_md = process_file(vosk_model, input, outdir, timestamps, index_db=index_db, metadata=metadata, sidecar=sidecar)
     typer.echo(f"Wrote {out_md}")
 
 @app.command()
@@ -294,8 +367,50 @@ def batch(
     outdir: Path = typer.Option(Path("./out")),
     concurrency: int = typer.Option(1),
     model: Path = typer.Option(DEFAULT_MODEL_PATH, "--model", help="Path to Vosk model directory"),
-    timestamps: bool = typer.Option(False, "--timestamps", help="Include timestamps in output")
+    timestamps: bool = typer.Option(False, "--timestamps", help="Include timestamps in output"),
+    index_db: Optional[Path] = typer.Option(None, "--index-db", help="Also add word timings to this search index"),
+    trace: Optional[Path] = typer.Option(None, "--trace", help="Write a Chrome trace (timeline of every worker) to this file"),
+    deadline: Optional[str] = typer.Option(None, "--deadline", help="Finish within this time (e.g. 2h, 90m): files that do not fit on --model use --small-model"),
+    small_model: Path = typer.Option(DEFAULT_SMALL_MODEL_PATH, "--small-model", help="Fast Vosk model for --deadline"),
+    concat_clips: bool = typer.Option(False, "--concat-clips", help="Decode short clips back to back in shared ffmpeg/recognizer sessions (for folders of voice memos)"),
+    sidecar: bool = typer.Option(True, "--sidecar/--no-sidecar", help="Also save word timings next to each transcript (for render)"),
+    background: bool = typer.Option(False, "--background", help="Low CPU/I/O priority, and fewer jobs while the machine is busy"),
+    cpus: Optional[str] = typer.Option(None, "--cpus", help="CPUs to run on in --background mode, e.g. 2-7 or 0,2,4 (default: all)")
 ):
+    """
+    Transcribe every mp3 in a folder.
+
+    With --deadline, each file gets --model (large) or --small-model when a
+    worker picks it up: as many files as fit get the large model, noisiest
+    audio first, and the plan is redone as measured speeds come in.
+
+    With --concat-clips, clips shorter than a minute are decoded in groups
+    by one ffmpeg process and one recognizer each, separated by silence, and
+    split back into one markdown file per clip.
+
+    With --background, the batch runs at nice 19 and the lowest I/O
+    priority (ffmpeg included), optionally pinned to --cpus, and starts a
+    new file only while the load average leaves CPUs idle.
+    """
+    if trace is not None:
+        chrome_trace.enable()
+    if concat_clips and deadline is not None:
+        typer.echo("--concat-clips and --deadline cannot be combined.")
+        raise typer.Exit(code=1)
+
+    load_governor = None
+    if background:
+        from background import LoadGovernor, enter_background, parse_cpu_set
+        # Before any worker thread or ffmpeg starts, so they all inherit it
+        try:
+            allowed_cpus = enter_background(parse_cpu_set(cpus) if cpus else None, log=typer.echo)
+        except ValueError as e:
+            typer.echo(str(e))
+            raise typer.Exit(code=1)
+        load_governor = LoadGovernor(concurrency, len(allowed_cpus), log=typer.echo)
+        typer.echo(f"Background mode: {len(allowed_cpus)} CPUs, low CPU and I/O priority, "
+                   f"up to {concurrency} jobs while the load allows")
+
     # Clean input path - remove any newlines from terminal wrapping
     indir_str = str(indir).replace('\n', '').replace('\r', '').strip()
     indir = Path(indir_str)
@@ -310,28 +425,397 @@ def batch(
         typer.echo("No mp3 files found.")
         raise typer.Exit()
     vosk_model = Model(str(model_path))
+
+    planner = None
+    if deadline is not None:
+        planner, small_vosk_model = plan_tiers(files, model_path, small_model, deadline, concurrency)
+
+    # Work items: single files, or lists of (clip, probe info) for the fast path
+    jobs = list(files)
+    metadata = {}
+    if concat_clips:
+        jobs, metadata = plan_clip_groups(files, concurrency)
+
+    def run_job(job):
+        if load_governor is None:
+            return run_files(job)
+        load_governor.acquire(str(id(job)))
+        try:
+            return run_files(job)
+        finally:
+            load_governor.release(str(id(job)))
+
+    def run_files(job):
+        if isinstance(job, list):
+            return process_clips(vosk_model, job, outdir, timestamps, index_db, sidecar=sidecar)
+        return run_file(job)
+
+    def run_file(f):
+        if planner is None:
+            return process_file(vosk_model, f, outdir, timestamps, index_db, metadata=metadata.get(f), sidecar=sidecar)
+        # The tier is decided when a worker picks the file up, with the latest speeds
+        tier = planner.start(f)
+        started = time.perf_counter()
+        try:
+            out = process_file(vosk_model if tier == "large" else small_vosk_model(), f,
+                               outdir, timestamps, index_db, sidecar=sidecar)
+        except Exception:
+            planner.finish(f, None)
+            raise
+        planner.finish(f, time.perf_counter() - started)
+        print(f"{f.name}: {tier} model ({planner.rtf(tier):.2f}x real time so far)")
+        return out
+
     with Progress() as progress:
         task = progress.add_task("[green]Transcribing...", total=len(files))
         with ThreadPoolExecutor(max_workers=concurrency) as ex:
-            futures = {ex.submit(process_file, vosk_model, f, outdir, timestamps): f for f in files}
+            futures = {ex.submit(run_job, job): job for job in jobs}
             for fut in as_completed(futures):
-                f = futures[fut]
+                job = futures[fut]
+                size = len(job) if isinstance(job, list) else 1
                 try:
                     md = fut.result()
-                    progress.update(task, advance=1)
+                    progress.update(task, advance=size)
                 except Exception as e:
-                    typer.echo(f"Failed {f}: {e}")
-                    progress.update(task, advance=1)
+                    typer.echo(f"Failed {job}: {e}")
+                    progress.update(task, advance=size)
+    if trace is not None:
+        chrome_trace.write(trace)
 
-def process_file(model, mp3_path: Path, outdir: Path, include_timestamps: bool = False):
-    # Extract metadata
-    metadata = extract_metadata(mp3_path)
+def plan_clip_groups(files, concurrency: int):
+    """
+    List every file's duration and tags (GROUP_CLIPS per ffmpeg call) and
+    group the short clips for process_clips.
 
-    # Transcribe
-    lines = transcribe_stream(model, mp3_path)
-    out_md = outdir / (mp3_path.stem + ".md")
-    write_markdown(out_md, mp3_path, lines, metadata=metadata, include_timestamps=include_timestamps)
-    return out_md
+    Returns the work items (clip groups, then the remaining files on their
+    own) and the metadata found for each file.
+    """
+    from clip_concat import SHORT_CLIP_SECONDS, group_clips, probe_inputs
+
+    typer.echo(f"Listing {len(files)} files...")
+    with chrome_trace.span("list clips", "ffmpeg", files=len(files)):
+        info = probe_inputs(files)
+    metadata = {f: metadata_from_tags(i['tags']) for f, i in zip(files, info) if i['duration'] is not None}
+    short = [(f, i) for f, i in zip(files, info)
+             if i['duration'] is not None and i['duration'] <= SHORT_CLIP_SECONDS]
+    long_files = [f for f, i in zip(files, info)
+                  if i['duration'] is None or i['duration'] > SHORT_CLIP_SECONDS]
+    groups = group_clips(short, concurrency)
+    typer.echo(f"{len(short)} short clips in {len(groups)} groups, {len(long_files)} files on their own")
+    return groups + long_files, metadata
+
+def process_clips(model, clips, outdir: Path, include_timestamps: bool = False,
+                  index_db: Optional[Path] = None, sidecar: bool = True):
+    """
+    Transcribe a group of short clips ((path, probe info) pairs) in one
+    ffmpeg concat pipeline and one recognizer, then write one markdown file
+    per clip. If the shared decode fails, the clips are transcribed one by one.
+    """
+    from clip_concat import concat_command, slot_samples, split_words
+
+    paths = [p for p, _ in clips]
+    slots = [slot_samples(i['duration']) for _, i in clips]
+    with chrome_trace.span("clip group", "batch", clips=len(clips)):
+        try:
+            with chrome_trace.span("spawn decoder", "ffmpeg", clips=len(clips)):
+                proc = subprocess.Popen(concat_command(paths, slots), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            words = [w for batch in iter_pcm_words(model, proc) for w in batch]
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with code {proc.returncode}")
+        except Exception as e:
+            print(f"Shared decode of {len(clips)} clips failed ({e}), transcribing them one by one")
+            outputs = []
+            for path, info in clips:
+                try:
+                    outputs.append(process_file(model, path, outdir, include_timestamps, index_db,
+                                                metadata=metadata_from_tags(info['tags']), sidecar=sidecar))
+                except Exception as e:
+                    print(f"Failed {path}: {e}")
+            return outputs
+
+        outputs = []
+        for (path, info), clip_words in zip(clips, split_words(words, slots)):
+            if index_db is not None:
+                import transcript_index
+                with chrome_trace.span("index", "io"):
+                    conn = transcript_index.open_index(index_db)
+                    try:
+                        transcript_index.add_transcript(conn, path, clip_words, engine="vosk")
+                    finally:
+                        conn.close()
+            out_md = outdir / (path.stem + ".md")
+            metadata = metadata_from_tags(info['tags'])
+            with chrome_trace.span("write", "io"):
+                if sidecar:
+                    write_sidecar(sidecar_path(out_md), clip_words, path.name, engine="vosk", metadata=metadata)
+                write_markdown(out_md, path, group_words(clip_words),
+                               metadata=metadata, include_timestamps=include_timestamps)
+            outputs.append(out_md)
+        return outputs
+
+def plan_tiers(files, model_path: Path, small_model_path: Path, deadline: str, concurrency: int):
+    """
+    Probe every file's duration and SNR and set up the deadline planner.
+
+    Returns the planner and a function loading the small model on first use.
+    """
+    import threading
+    from memory_budget import audio_duration
+    from tier_planner import TierPlanner, calibrated_rtf, estimate_snr, parse_duration
+
+    try:
+        deadline_seconds = parse_duration(deadline)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(code=1)
+    if not small_model_path.exists():
+        typer.echo(f"Small Vosk model not found at {small_model_path}. Download it or set --small-model.")
+        raise typer.Exit(code=1)
+
+    # The deadline counts from now, so probing is part of the budget
+    planner = TierPlanner(deadline_seconds, concurrency, calibrated_rtf(model_path), calibrated_rtf(small_model_path))
+
+    def probe(f):
+        duration = audio_duration(f)
+        return f, duration, estimate_snr(f, duration)
+
+    typer.echo(f"Estimating duration and audio quality of {len(files)} files...")
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for f, duration, snr in ex.map(probe, files):
+            planner.add(f, duration, snr)
+
+    summary = planner.summary()
+    typer.echo(f"Plan for {deadline}: {summary['large']} files on the large model, {summary['small']} on the small "
+               f"(RTF {planner.rtf('large'):.2f} / {planner.rtf('small'):.2f})")
+    if not summary['fits']:
+        typer.echo("Warning: even the small model alone is not expected to finish before the deadline")
+
+    lock = threading.Lock()
+    loaded = []
+
+    def small_vosk_model():
+        with lock:
+            if not loaded:
+                loaded.append(Model(str(small_model_path)))
+            return loaded[0]
+
+    return planner, small_vosk_model
+
+def process_file(model, mp3_path: Path, outdir: Path, include_timestamps: bool = False,
+                 index_db: Optional[Path] = None, metadata=None, sidecar: bool = True):
+    with chrome_trace.span("file", "batch", path=str(mp3_path)):
+        # Extract metadata
+        if metadata is None:
+            with chrome_trace.span("probe", "ffprobe"):
+                metadata = extract_metadata(mp3_path)
+
+        # Transcribe
+        words = transcribe_words(model, mp3_path)
+        if index_db is not None:
+            import transcript_index
+            with chrome_trace.span("index", "io"):
+                conn = transcript_index.open_index(index_db)
+                try:
+                    transcript_index.add_transcript(conn, mp3_path, words, engine="vosk")
+                finally:
+                    conn.close()
+        lines = group_words(words)
+        out_md = outdir / (mp3_path.stem + ".md")
+        with chrome_trace.span("write", "io"):
+            if sidecar:
+                write_sidecar(sidecar_path(out_md), words, mp3_path.name, engine="vosk", metadata=metadata)
+            write_markdown(out_md, mp3_path, lines, metadata=metadata, include_timestamps=include_timestamps)
+        return out_md
+
+# Windows waiting between the recognizer and the cleaner; when full, the
+# recognizer blocks until the cleaner catches up
+PIPELINE_QUEUE_SIZE = 4
+
+def _produce_chunks(model, mp3_path: Path, chunk_tokens: int, overlap_tokens: int, q: "queue.Queue",
+                    words: list, stats: dict):
+    """
+    Recognizer stage: push ~chunk_tokens of finished windows onto q, then None.
+
+    Like chunker.chunk_text, each chunk after the first carries the last
+    overlap_tokens of the previous one as context.
+    """
+    from chunker import Chunk, estimate_tokens, tail_context
+
+    def batches():
+        for batch in iter_words(model, mp3_path):
+            words.extend(batch)
+            yield batch
+
+    def put(item):
+        waited = time.perf_counter()
+        q.put(item)
+        stats['recognizer_blocked'] += time.perf_counter() - waited
+
+    previous = ''
+
+    def chunk(pending: list) -> Chunk:
+        nonlocal previous
+        text = "\n".join(pending)
+        context = tail_context(previous, overlap_tokens) if previous and overlap_tokens else ''
+        previous = text
+        return Chunk(text, context)
+
+    try:
+        pending = []
+        for _, _, text in iter_windows(batches()):
+            pending.append(text)
+            if estimate_tokens(" ".join(pending)) >= chunk_tokens:
+                put(chunk(pending))
+                pending = []
+        if pending:
+            put(chunk(pending))
+        stats['recognizer_done'] = time.perf_counter()
+        put(None)
+    except BaseException as e:
+        q.put(e)
+
+async def _consume_chunks(q: "queue.Queue", llm_model: str, keep_alive: str, cache, out, stats: dict):
+    """Cleaning stage: clean chunks from q in order and append them to out."""
+    import asyncio
+    import ollama
+    from mdclean_simple import CACHE_VERSION, OLLAMA_OPTIONS, _stream_chunk
+
+    client = ollama.AsyncClient()
+    first = True
+    while True:
+        waited = time.perf_counter()
+        chunk = await asyncio.to_thread(q.get)
+        stats['cleaner_idle'] += time.perf_counter() - waited
+        if chunk is None:
+            return
+        if isinstance(chunk, BaseException):
+            raise chunk
+
+        stats['chunks'] += 1
+        cleaned = None
+        if cache is not None:
+            cleaned = cache.get('ollama', llm_model, CACHE_VERSION, OLLAMA_OPTIONS['temperature'], chunk.key)
+        if cleaned is None:
+            try:
+                cleaned, chunk_stats = await _stream_chunk(client, llm_model, chunk, keep_alive)
+                if cache is not None:
+                    cache.put('ollama', llm_model, CACHE_VERSION, OLLAMA_OPTIONS['temperature'], chunk.key, cleaned)
+                print(f"  Cleaned chunk {stats['chunks']} ({chunk_stats['tokens_per_sec']:.1f} tok/s, "
+                      f"{q.qsize()} waiting)")
+            except Exception as e:
+                print(f"  Chunk {stats['chunks']} ✗ (error: {e}), keeping original text")
+                cleaned = chunk.text
+        else:
+            print(f"  Cleaned chunk {stats['chunks']} (cached)")
+
+        # Append as we go so the cleaned transcript can be read while it grows
+        out.write(("" if first else "\n\n") + cleaned)
+        out.flush()
+        first = False
+
+@app.command()
+def pipeline(
+    input: Path = typer.Argument(...),
+    outdir: Path = typer.Option(Path("."), help="Directory for the raw transcript"),
+    cleaned_outdir: Path = typer.Option(Path("./cleaned_output"), "--cleaned-outdir", help="Directory for the cleaned transcript"),
+    model: Path = typer.Option(DEFAULT_MODEL_PATH, "--model", help="Path to Vosk model directory"),
+    llm_model: Optional[str] = typer.Option(None, "--llm-model", help="Ollama model for cleaning (default: auto-select)"),
+    chunk_tokens: int = typer.Option(500, "--chunk-tokens", help="Approximate tokens of transcript per cleaning request"),
+    overlap: int = typer.Option(0, "--overlap", help="Tokens of the previous chunk to pass as context"),
+    queue_size: int = typer.Option(PIPELINE_QUEUE_SIZE, "--queue-size", help="Chunks buffered between recognizer and cleaner"),
+    keep_alive: str = typer.Option("10m", "--keep-alive", help="How long Ollama keeps the model loaded"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Do not read or write the cleaned-chunk cache"),
+    timestamps: bool = typer.Option(False, "--timestamps", help="Include timestamps in the raw transcript"),
+    index_db: Optional[Path] = typer.Option(None, "--index-db", help="Also add word timings to this search index"),
+    sidecar: bool = typer.Option(True, "--sidecar/--no-sidecar", help="Also save word timings next to the raw transcript (for render)")
+):
+    """Transcribe and clean at the same time: finished windows are cleaned while the rest is still being recognized."""
+    import asyncio
+    import threading
+    import mdclean_simple
+
+    input = Path(str(input).replace('\n', '').replace('\r', '').strip())
+    model_path = Path(model)
+    if not model_path.exists():
+        typer.echo(f"Vosk model not found at {model_path}. Download and set model path.")
+        raise typer.Exit(code=1)
+    outdir.mkdir(parents=True, exist_ok=True)
+    cleaned_outdir.mkdir(parents=True, exist_ok=True)
+
+    llm_model = llm_model or mdclean_simple.choose_best_model()
+    metadata = extract_metadata(input)
+    vosk_model = Model(str(model_path))
+
+    cache = None
+    if not no_cache:
+        from llm_cache import ChunkCache
+        cache = ChunkCache()
+
+    q = queue.Queue(maxsize=max(1, queue_size))
+    words = []
+    stats = {'recognizer_blocked': 0.0, 'cleaner_idle': 0.0, 'chunks': 0, 'recognizer_done': None}
+    start = time.perf_counter()
+    producer = threading.Thread(target=_produce_chunks,
+                                args=(vosk_model, input, chunk_tokens, overlap, q, words, stats), daemon=True)
+    producer.start()
+
+    cleaned_md = cleaned_outdir / (input.stem + ".md")
+    try:
+        with cleaned_md.open("w", encoding="utf-8") as out:
+            write_frontmatter(out, input, metadata)
+            asyncio.run(_consume_chunks(q, llm_model, keep_alive, cache, out, stats))
+            out.write("\n")
+    finally:
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+    producer.join()
+    elapsed = time.perf_counter() - start
+
+    # Raw transcript and index from the same recognition pass
+    if index_db is not None:
+        import transcript_index
+        conn = transcript_index.open_index(index_db)
+        try:
+            transcript_index.add_transcript(conn, input, words, engine="vosk")
+        finally:
+            conn.close()
+    raw_md = outdir / (input.stem + ".md")
+    if sidecar:
+        write_sidecar(sidecar_path(raw_md), words, input.name, engine="vosk", metadata=metadata)
+    write_markdown(raw_md, input, group_words(words), metadata=metadata, include_timestamps=timestamps)
+
+    recognized = stats['recognizer_done'] - start
+    typer.echo(f"Wrote {raw_md}")
+    typer.echo(f"Wrote {cleaned_md}")
+    typer.echo(f"Total {elapsed:.1f}s: recognition finished after {recognized:.1f}s, "
+               f"cleaning {elapsed - recognized:.1f}s behind "
+               f"(recognizer waited {stats['recognizer_blocked']:.1f}s on a full queue, "
+               f"cleaner idle {stats['cleaner_idle']:.1f}s)")
+
+@app.command()
+def render(
+    paths: List[Path] = typer.Argument(..., help="Transcripts, word sidecars or directories of them"),
+    outdir: Optional[Path] = typer.Option(None, "--outdir", help="Write the markdown here instead of next to each sidecar"),
+    timestamps: bool = typer.Option(False, "--timestamps", help="Include timestamps in output")
+):
+    """Rebuild markdown transcripts from their word sidecars, without the audio or a model."""
+    from transcript_sidecar import find_sidecars, iter_words, read_header, transcript_path
+
+    if outdir is not None:
+        outdir.mkdir(parents=True, exist_ok=True)
+    for words_path in find_sidecars(paths):
+        if not words_path.exists():
+            typer.echo(f"No word sidecar: {words_path}")
+            continue
+        header = read_header(words_path)
+        out_md = transcript_path(words_path)
+        if outdir is not None:
+            out_md = outdir / out_md.name
+        lines = iter_windows([iter_words(words_path)]) if header['words'] else []
+        write_markdown(out_md, Path(header['source']), lines, metadata=header['metadata'] or None,
+                       include_timestamps=timestamps)
+        typer.echo(f"Wrote {out_md}")
 
 if __name__ == "__main__":
     app()
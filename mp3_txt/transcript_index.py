@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+transcript_index - SQLite FTS5 full-text index over transcripts with word timings
+
+Stores word-level timings from transcribe_stream / transcribe_whisper output so a
+phrase can be located (file + offset in milliseconds) without rescanning markdown.
+
+Each transcript is stored as a series of time windows. Every window row holds the
+window text (full-text indexed) plus the start offset of every word in it, so a
+search hit can be narrowed down to the exact word where the phrase begins. Each
+window repeats the last INDEX_OVERLAP_WORDS words of the previous one, so a
+phrase said across a window boundary is still found.
+
+The index is updated incrementally: files whose size and mtime have not changed
+since they were indexed are skipped. A file's window rows are listed in
+file_windows, so re-indexing it deletes them by rowid instead of scanning the
+FTS table (its columns other than text cannot be searched by value).
+
+Usage (from the transcription CLIs):
+    python3 transcribe_enhanced.py index ./audio_folder --db transcripts.db
+    python3 transcribe_enhanced.py search "living into community" --db transcripts.db
+"""
+
+import re
+import sqlite3
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_INDEX_PATH = Path.home() / ".cache" / "mp3_txt" / "transcripts.db"
+
+# Words are grouped into windows of this many seconds per FTS row
+INDEX_WINDOW_SECONDS = 30.0
+# Words of the previous window repeated at the start of the next
+INDEX_OVERLAP_WORDS = 10
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    engine TEXT,
+    words INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS windows USING fts5(
+    text,
+    file_id UNINDEXED,
+    start_ms UNINDEXED,
+    end_ms UNINDEXED,
+    word_starts UNINDEXED
+);
+CREATE TABLE IF NOT EXISTS file_windows (
+    file_id INTEGER NOT NULL,
+    window_rowid INTEGER NOT NULL,
+    PRIMARY KEY (file_id, window_rowid)
+) WITHOUT ROWID;
+"""
+
+
+def open_index(db_path: Path = DEFAULT_INDEX_PATH) -> sqlite3.Connection:
+    """Open (and create if needed) the transcript index database."""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.executescript(SCHEMA)
+    if 'windows' in tables and 'file_windows' not in tables:
+        # Index written before file_windows existed: one scan to build it
+        with conn:
+            conn.execute("INSERT INTO file_windows (file_id, window_rowid) SELECT file_id, rowid FROM windows")
+    return conn
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase tokens the same way FTS5's default tokenizer does."""
+    return [t.lower() for t in _TOKEN_RE.findall(text)]
+
+
+def _file_stat(audio_path: Path):
+    st = audio_path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def is_indexed(conn: sqlite3.Connection, audio_path: Path) -> bool:
+    """True if audio_path is in the index and unchanged since it was indexed."""
+    audio_path = Path(audio_path).resolve()
+    row = conn.execute(
+        "SELECT size, mtime_ns FROM files WHERE path = ?", (str(audio_path),)
+    ).fetchone()
+    if row is None or not audio_path.exists():
+        return False
+    return tuple(row) == _file_stat(audio_path)
+
+
+def add_transcript(
+    conn: sqlite3.Connection,
+    audio_path: Path,
+    words: List[dict],
+    engine: str = "vosk",
+    window_seconds: float = INDEX_WINDOW_SECONDS,
+) -> int:
+    """
+    Add (or replace) the transcript of audio_path in the index.
+
+    Args:
+        words: list of {word, start, end} dicts as returned by the transcribers
+        engine: name of the engine that produced the words
+
+    Returns the number of window rows written.
+    """
+    audio_path = Path(audio_path).resolve()
+    size, mtime_ns = _file_stat(audio_path)
+
+    with conn:
+        row = conn.execute(
+            "SELECT id FROM files WHERE path = ?", (str(audio_path),)
+        ).fetchone()
+        if row:
+            file_id = row[0]
+            conn.execute(
+                "DELETE FROM windows WHERE rowid IN (SELECT window_rowid FROM file_windows WHERE file_id = ?)",
+                (file_id,),
+            )
+            conn.execute("DELETE FROM file_windows WHERE file_id = ?", (file_id,))
+            conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ?, engine = ?, words = ? WHERE id = ?",
+                (size, mtime_ns, engine, len(words), file_id),
+            )
+        else:
+            cur = conn.execute(
+                "INSERT INTO files (path, size, mtime_ns, engine, words) VALUES (?, ?, ?, ?, ?)",
+                (str(audio_path), size, mtime_ns, engine, len(words)),
+            )
+            file_id = cur.lastrowid
+
+        rows = []
+        current = []
+        window_start = None  # start of the window's first word after the overlap
+        for w in words:
+            text = str(w.get('word', '')).strip()
+            if not text:
+                continue
+            if window_start is not None and w['start'] - window_start > window_seconds:
+                rows.append(current)
+                current = current[-INDEX_OVERLAP_WORDS:]
+                window_start = None
+            if window_start is None:
+                window_start = w['start']
+            # One stored token per start offset, even for words like "New York"
+            for part in text.split():
+                current.append({'word': part, 'start': w['start'], 'end': w['end']})
+        if window_start is not None:
+            rows.append(current)
+
+        # Rowids are assigned here so file_windows can list them
+        first = conn.execute("SELECT COALESCE(MAX(rowid), 0) + 1 FROM windows").fetchone()[0]
+        rowids = range(first, first + len(rows))
+        conn.executemany(
+            "INSERT INTO windows (rowid, text, file_id, start_ms, end_ms, word_starts) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    rowid,
+                    " ".join(w['word'] for w in window),
+                    file_id,
+                    int(round(window[0]['start'] * 1000)),
+                    int(round(window[-1]['end'] * 1000)),
+                    " ".join(str(int(round(w['start'] * 1000))) for w in window),
+                )
+                for rowid, window in zip(rowids, rows)
+            ],
+        )
+        conn.executemany("INSERT INTO file_windows (file_id, window_rowid) VALUES (?, ?)",
+                         [(file_id, rowid) for rowid in rowids])
+
+    return len(rows)
+
+
+def _locate_phrase(text: str, word_starts: str, query_tokens: List[str]) -> Optional[int]:
+    """Return the start offset (ms) of the first word where query_tokens match."""
+    starts = [int(s) for s in word_starts.split()]
+    flat = []  # (token, word index)
+    # Rows indexed before multi-word entries were split can hold more words than starts
+    for i, word in enumerate(text.split(" ")[:len(starts)]):
+        for tok in tokenize(word):
+            flat.append((tok, i))
+
+    n = len(query_tokens)
+    for j in range(len(flat) - n + 1):
+        if all(flat[j + k][0] == query_tokens[k] for k in range(n)):
+            return starts[flat[j][1]]
+    # Fall back to the first occurrence of any query token
+    for tok, i in flat:
+        if tok in query_tokens:
+            return starts[i]
+    return None
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int = 20) -> List[dict]:
+    """
+    Search the index for a phrase.
+
+    Returns list of hits with {path, offset_ms, window_start_ms, window_end_ms, text}.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    fts_query = '"' + " ".join(tokens) + '"'
+
+    cur = conn.execute(
+        """
+        SELECT files.path, windows.text, windows.start_ms, windows.end_ms, windows.word_starts
+        FROM windows JOIN files ON files.id = windows.file_id
+        WHERE windows MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """,
+        # Overlapping windows can both contain the phrase
+        (fts_query, limit * 2),
+    )
+
+    hits = []
+    seen = set()
+    for path, text, start_ms, end_ms, word_starts in cur:
+        offset = _locate_phrase(text, word_starts, tokens)
+        if offset is not None:
+            if (path, offset) in seen:
+                continue
+            seen.add((path, offset))
+        if len(hits) >= limit:
+            break
+        hits.append({
+            'path': path,
+            'offset_ms': offset if offset is not None else start_ms,
+            'window_start_ms': start_ms,
+            'window_end_ms': end_ms,
+            'text': text,
+        })
+    return hits
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+transcript_sidecar - Word timings next to every transcript, so views can be rebuilt without ASR
+
+The markdown a transcriber writes is one rendering of what the recognizer
+produced: timestamps on or off, 10 s or 30 s windows, no confidences. Next
+to each `talk.md` the transcribers also write `talk.words.jsonl.gz`, a
+gzip-compressed JSON Lines file:
+
+    {"format": "mp3_txt-words", "version": 1, "source": "talk.mp3", "engine": "vosk", ...}
+    ["living", 12.31, 12.62, 0.97]
+    ["into", 12.62, 12.80]
+
+The first line is a header (source file, engine, model, the metadata used
+for the frontmatter, word count); every further line is one word as
+[word, start, end] or [word, start, end, confidence]. Times are seconds,
+rounded to milliseconds. Words are read lazily, line by line, so reading
+the header or streaming a long transcript never loads the whole file.
+
+`transcribe_enhanced.py render` and `transcribe_vosk_stream.py render`
+rebuild markdown from it, and the mdclean tools' `--words` option takes the
+text to clean from it instead of from the rendered markdown.
+
+Usage:
+    write_sidecar(sidecar_path(out_md), words, source="talk.mp3", engine="vosk")
+    header = read_header(sidecar_path(out_md))
+    for w in iter_words(sidecar_path(out_md)):    # {word, start, end[, conf]}
+        ...
+"""
+
+import gzip
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+FORMAT = "mp3_txt-words"
+VERSION = 1
+SIDECAR_SUFFIX = ".words.jsonl.gz"
+
+# A pause this long between words starts a new paragraph in sidecar_text
+PARAGRAPH_PAUSE_SECONDS = 2.0
+
+
+def sidecar_path(transcript: Path) -> Path:
+    """Sidecar belonging to a transcript (talk.md -> talk.words.jsonl.gz)."""
+    transcript = Path(transcript)
+    return transcript.with_name(transcript.stem + SIDECAR_SUFFIX)
+
+
+def is_sidecar(path: Path) -> bool:
+    return Path(path).name.endswith(SIDECAR_SUFFIX)
+
+
+def transcript_path(sidecar: Path) -> Path:
+    """Markdown transcript a sidecar belongs to."""
+    sidecar = Path(sidecar)
+    return sidecar.with_name(sidecar.name[:-len(SIDECAR_SUFFIX)] + ".md")
+
+
+def write_sidecar(path: Path, words: Iterable[dict], source: str, engine: Optional[str] = None,
+                  model: Optional[str] = None, metadata: Optional[dict] = None):
+    """Write words ({word, start, end[, conf]}) via a temporary file and rename."""
+    path = Path(path)
+    words = [w for w in words if w.get('word')]
+    header = {'format': FORMAT, 'version': VERSION, 'source': source, 'engine': engine,
+              'model': str(model) if model is not None else None, 'metadata': metadata or {},
+              'words': len(words)}
+    tmp = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+    # mtime=0 keeps the bytes identical for identical words
+    with open(tmp, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+        f.write((json.dumps(header, ensure_ascii=False) + '\n').encode('utf-8'))
+        for w in words:
+            row = [w['word'], round(w.get('start', 0.0), 3), round(w.get('end', 0.0), 3)]
+            if w.get('conf') is not None:
+                row.append(round(w['conf'], 3))
+            f.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+    os.replace(tmp, path)
+
+
+def read_header(path: Path) -> dict:
+    """Header line of a sidecar (only the first line is decompressed)."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+    if header.get('format') != FORMAT:
+        raise ValueError(f"{path} is not a word sidecar")
+    if header.get('version', 0) > VERSION:
+        raise ValueError(f"{path} was written by a newer version (format {header['version']})")
+    return header
+
+
+def iter_words(path: Path) -> Iterator[dict]:
+    """Words of a sidecar as {word, start, end[, conf]}, one line at a time."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        f.readline()  # header
+        for line in f:
+            row = json.loads(line)
+            word = {'word': row[0], 'start': row[1], 'end': row[2]}
+            if len(row) > 3:
+                word['conf'] = row[3]
+            yield word
+
+
+def copy_sidecar(src_transcript: Path, dst_transcript: Path, source: str) -> bool:
+    """Copy the sidecar of one transcript to another with a new source name; False if there is none."""
+    src = sidecar_path(src_transcript)
+    if not src.exists():
+        return False
+    header = read_header(src)
+    write_sidecar(sidecar_path(dst_transcript), iter_words(src), source, header.get('engine'),
+                  header.get('model'), header.get('metadata'))
+    return True
+
+
+def sidecar_text(path: Path, pause: float = PARAGRAPH_PAUSE_SECONDS) -> str:
+    """Plain transcript text from a sidecar, with a paragraph break at every long pause."""
+    paragraphs, current, last_end = [], [], None
+    for w in iter_words(path):
+        if current and last_end is not None and w['start'] - last_end >= pause:
+            paragraphs.append(' '.join(current))
+            current = []
+        current.append(w['word'])
+        last_end = w['end']
+    if current:
+        paragraphs.append(' '.join(current))
+    return '\n\n'.join(paragraphs) + '\n'
+
+
+def find_sidecars(paths: Iterable[Path]) -> Iterator[Path]:
+    """Sidecars named by paths: sidecars themselves, transcripts' sidecars, or all sidecars under directories."""
+    for p in paths:
+        p = Path(p)
+        if p.is_dir():
+            yield from sorted(p.rglob(f"*{SIDECAR_SUFFIX}"))
+        elif is_sidecar(p):
+            yield p
+        else:
+            yield sidecar_path(p)
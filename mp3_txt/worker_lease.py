@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+worker_lease - Claim batch files across hosts with lease files in a shared directory
+
+Several machines that mount the same NAS can run `batch --worker` on the same
+input and output folders. Before transcribing a file a worker creates its
+lease file with O_CREAT|O_EXCL, which only one worker can win:
+
+    <outdir>/.leases/<sha1 of relative path>.lease
+    {"path": ..., "owner": "<host>:<pid>:<token>", "expires": <unix time>}
+
+The owner renews the lease while it works. A lease whose expiry has passed
+belongs to a dead or hung worker and may be broken by anyone: breaking takes a
+short-lived `.break` lock (also O_EXCL) so two workers never take over the
+same lease at once. Hosts' clocks must agree to within a fraction of the TTL.
+
+Outputs are written to a temporary file and renamed into place, so a reader
+(or a worker checking whether a file is done) never sees a partial transcript.
+
+Usage:
+    leases = LeaseDir(outdir / ".leases", ttl=600)
+    lease = leases.claim(relative_path)
+    if lease:
+        with lease.keep_alive():
+            ...work...
+            atomic_write_text(output_file, markdown)
+        lease.release()
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_TTL = 600.0  # seconds
+
+# A .break lock older than this was left by a worker that died mid-takeover
+BREAK_LOCK_STALE = 60.0
+
+
+def worker_id() -> str:
+    """Unique name for this worker process."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def atomic_write_text(path: Path, text: str):
+    """Write text to path via a temporary file and rename, so it appears complete or not at all."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+    with tmp.open('w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class Lease:
+    """A claimed file; renew() before it expires, release() when done."""
+
+    def __init__(self, leases: 'LeaseDir', key: str, path: Path):
+        self.leases = leases
+        self.key = key
+        self.path = path
+
+    def owned(self) -> bool:
+        data = _read_json(self.path)
+        return data is not None and data.get('owner') == self.leases.owner
+
+    def renew(self) -> bool:
+        """Push the expiry forward. Returns False if the lease was lost."""
+        if not self.owned():
+            return False
+        tmp = self.path.with_suffix(f".{os.getpid()}.renew")
+        tmp.write_text(json.dumps(self.leases._content(self.key)))
+        os.replace(tmp, self.path)
+        return True
+
+    def release(self):
+        """Give up the lease (the output file now marks the work as done)."""
+        if self.owned():
+            self.path.unlink(missing_ok=True)
+
+    @contextmanager
+    def keep_alive(self):
+        """Renew the lease in the background for the duration of the block."""
+        stop = threading.Event()
+
+        def renew_loop():
+            while not stop.wait(self.leases.ttl / 3):
+                if not self.renew():
+                    print(f"Warning: lost lease for {self.key}")
+                    return
+
+        thread = threading.Thread(target=renew_loop, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+
+class LeaseDir:
+    """Directory of lease files shared by all workers."""
+
+    def __init__(self, directory: Path, ttl: float = DEFAULT_TTL, owner: Optional[str] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.owner = owner or worker_id()
+
+    def _lease_path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha1(key.encode('utf-8')).hexdigest() + ".lease")
+
+    def _content(self, key: str) -> dict:
+        return {'path': key, 'owner': self.owner, 'expires': time.time() + self.ttl}
+
+    def _create(self, key: str, path: Path) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps(self._content(key)))
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def holder(self, key: str) -> Optional[str]:
+        """Owner of a live lease on key, or None."""
+        data = _read_json(self._lease_path(key))
+        if data and data.get('expires', 0) > time.time():
+            return data.get('owner')
+        return None
+
+    def _is_live(self, path: Path) -> bool:
+        """True if the lease at path has not expired (or is too new to judge)."""
+        data = _read_json(path)
+        if data is not None:
+            return data.get('expires', 0) > time.time()
+        # Empty or half-written: either just created by another worker, or
+        # left by one that died while creating it
+        try:
+            return time.time() - path.stat().st_mtime < self.ttl
+        except FileNotFoundError:
+            return False
+
+    def claim(self, key: str) -> Optional[Lease]:
+        """Take the lease on key if it is free or expired; None if another worker holds it."""
+        path = self._lease_path(key)
+        if self._create(key, path):
+            return Lease(self, key, path)
+        if self._is_live(path):
+            return None  # Held by someone else
+
+        # Expired lease: break it under a takeover lock
+        break_lock = path.with_suffix(".break")
+        try:
+            fd = os.open(break_lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            os.close(fd)
+        except FileExistsError:
+            try:
+                if time.time() - break_lock.stat().st_mtime > BREAK_LOCK_STALE:
+                    break_lock.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+            return None
+        try:
+            # Re-check under the lock: the owner may have renewed, or another
+            # worker may already have taken over
+            if self._is_live(path):
+                return None
+            path.unlink(missing_ok=True)
+            if self._create(key, path):
+                return Lease(self, key, path)
+            return None
+        finally:
+            break_lock.unlink(missing_ok=True)